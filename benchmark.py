@@ -0,0 +1,318 @@
+# Name      : benchmark
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Time and peak memory benchmarks of views, login and scoring, checked against a baseline.
+
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import closing
+from datetime import datetime
+
+import click
+import numpy as np
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DATA_DIR = os.path.join(tempfile.gettempdir(), 'lchapp-benchmark')
+# name: (inspections, assets, sites, field users), seeded with a fixed seed and end date so every run sees the same rows
+DATASETS = {'1k': (1000, 100, 10, 5),
+            '100k': (100000, 5000, 200, 50),
+            '1M': (1000000, 50000, 1000, 200)}
+SEED = 0
+END_DATE = datetime(2026, 10, 1)
+PASSWORD = 'Bench-Pa55word'
+REPEAT = 5
+# fast cases keep repeating until they have run for this long, so their medians are not down to a handful of runs
+MIN_SECONDS = 1.0
+MAX_REPEAT = 500
+SCALAR_SCORES = 10000
+# a case regresses when its median is this fraction slower than the baseline and slower by at least FLOOR_MS,
+# the floor keeps scheduler noise on sub millisecond cases from failing a run
+TOLERANCE = 0.25
+FLOOR_MS = 2.0
+# peak allocation regresses past the same fraction once it is also this much larger, a few KiB of cache churn is not
+FLOOR_KIB = 256
+
+
+class BenchmarkError(Exception):
+    """raised when a benchmarked request does not give the expected status"""
+
+
+def benchmarkapp(database):
+    '''function to build the full app on a database file with metrics off and the login throttle opened up, so
+    repeated logins are timed rather than refused'''
+    import config
+    overrides = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(database)}',
+                 'SECRET_KEY': config.Config.SECRET_KEY or 'benchmark',
+                 'METRICS_ENABLED': False,
+                 'LOGIN_USER_ATTEMPTS': 10 ** 9,
+                 'LOGIN_IP_ATTEMPTS': 10 ** 9}
+    saved = {name: getattr(config.Config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(config.Config, name, value)
+    try:
+        from website import create_app
+        return create_app()
+    finally:
+        # create_app copies the settings in to app.config, put the class back for anything else in the process
+        for name, value in saved.items():
+            setattr(config.Config, name, value)
+
+
+def preparedataset(name, spec, data_dir=DATA_DIR, fresh=False):
+    '''function to return the path of a seeded database for a dataset, seeding it the first time.
+    the seeded file is kept in data_dir and only ever copied, so a 1M run pays for the seed once.'''
+    from website import db
+    from website.seed import seeddatabase
+    inspections, assets, sites, users = spec
+    path = os.path.join(data_dir, f'{name}-{inspections}-{assets}-{sites}-{users}-{SEED}.db')
+    if os.path.exists(path) and not fresh:
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    partial = path + '.partial'
+    for leftover in (partial, partial + '-wal', partial + '-shm'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    app = benchmarkapp(partial)
+    with app.app_context():
+        seeddatabase(inspections, assets, sites, users, seed=SEED, end=END_DATE, password=PASSWORD)
+        db.session.remove()
+        db.engine.dispose()
+    os.replace(partial, path)
+    return path
+
+
+def timecall(call, repeat, min_seconds=MIN_SECONDS):
+    '''function to run call once to warm the caches and then at least repeat times, carrying on up to MAX_REPEAT
+    runs until min_seconds have been spent, returns the timings in ms'''
+    call()
+    timings = []
+    while len(timings) < repeat or (sum(timings) < min_seconds * 1000 and len(timings) < MAX_REPEAT):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def peakallocation(call):
+    '''function to run call once under tracemalloc, returns the peak KiB allocated above what was already held.
+    call should already be warm so the caches it fills once are not counted against it.'''
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        held = tracemalloc.get_traced_memory()[0]
+        call()
+        return round((tracemalloc.get_traced_memory()[1] - held) / 1024, 1)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def summarise(timings):
+    '''function to reduce a list of timings to the median, min and max in ms'''
+    return {'median_ms': round(statistics.median(timings), 3), 'min_ms': round(min(timings), 3),
+            'max_ms': round(max(timings), 3), 'runs': len(timings)}
+
+
+def pagecall(client, method, url, status, data=None):
+    '''function returning a call that makes one request and reads the whole body'''
+    def call():
+        response = client.open(url, method=method, data=data)
+        response.get_data()
+        if response.status_code != status:
+            raise BenchmarkError(f'{method} {url} gave {response.status_code}, expected {status}')
+    return call
+
+
+def loggedin(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'], session['_fresh'] = str(user_id), True
+    return client
+
+
+def login(app, username):
+    '''function returning a call that logs in from a new client each time, so every call checks the password'''
+    def call():
+        pagecall(app.test_client(), 'POST', '/login', 302, {'username': username, 'password': PASSWORD})()
+    return call
+
+
+def endpointcases(app):
+    '''function returning (case name, call) for every timed request'''
+    from website.models import Asset, User
+    users = dict(User.query.with_entities(User.username, User.id).filter(
+        User.username.in_(('admin', 'conteng', 'field0001'))).all())
+    admin, conteng, field = (loggedin(app, users[name]) for name in ('admin', 'conteng', 'field0001'))
+    chain = Asset.query.with_entities(Asset.equip_no).filter_by(equip_class='C5').order_by(Asset.equip_no).first()
+    chaininspection = {'form': 'chain_insp', 'equip_no': str(chain.equip_no), 'condition': '2', 'chain_length': '5.0',
+                       'pitch_length': '100', 'mean_measured_pitch_length': '104', 'pitches_measured': '12'}
+    return [('views.home[ADMIN]', pagecall(admin, 'GET', '/', 200)),
+            ('views.home[CONTENG]', pagecall(conteng, 'GET', '/', 200)),
+            ('views.home[FIELD]', pagecall(field, 'GET', '/', 200)),
+            ('views.assets', pagecall(field, 'GET', '/assets', 200)),
+            ('views.search_assets', pagecall(field, 'GET', '/assets/search?q=lifting+chain+1', 200)),
+            ('views.lookup_assets', pagecall(field, 'GET', '/assets/lookup?class=C5&q=1&per_page=20', 200)),
+            ('views.inspadmin', pagecall(admin, 'GET', '/inspadmin', 200)),
+            ('views.inspection[GET]', pagecall(field, 'GET', '/inspection', 200)),
+            ('views.inspection[POST]', pagecall(field, 'POST', '/inspection', 200, chaininspection)),
+            ('auth.login', login(app, 'field0001'))]
+
+
+def scoringcases(database):
+    '''function returning (case name, call) for the scoring functions over the dataset's own measurements, the scalar
+    functions are timed over up to SCALAR_SCORES chain inspections and batchscore over every inspection'''
+    from website.inspections import batchscore, conditioncheck, lchealthscore, lcpass
+    with closing(sqlite3.connect(database)) as connection:
+        rows = connection.execute('SELECT measure_mean_pitch_length, chain_pitch_length, condition_code '
+                                  'FROM inspection ORDER BY id').fetchall()
+    measured = np.array([row[0] if row[0] is not None else np.nan for row in rows], dtype=float)
+    nominal = np.array([row[1] if row[1] is not None else np.nan for row in rows], dtype=float)
+    conditions = [row[2] for row in rows]
+    chains = [row for row in rows if row[0] is not None][:SCALAR_SCORES]
+
+    def scalar():
+        for measure, pitch, condition in chains:
+            lcpass(conditioncheck(condition), lchealthscore(measure, pitch))
+
+    return [('inspections.scalar', scalar),
+            ('inspections.batchscore', lambda: batchscore(measured, nominal, conditions))]
+
+
+def benchmarkdataset(name, spec, repeat=REPEAT, data_dir=DATA_DIR, fresh=False, progress=None,
+                     min_seconds=MIN_SECONDS):
+    '''function to time every case against a working copy of a seeded dataset, returns {case: summary}'''
+    from website import db
+    from website.migrations import upgrade
+    seeded = preparedataset(name, spec, data_dir, fresh)
+    # the inspection POSTs write to the database, so each run starts from a fresh copy of the seeded file
+    working = os.path.join(data_dir, f'{name}-run.db')
+    shutil.copyfile(seeded, working)
+    app = benchmarkapp(working)
+    results = {}
+    try:
+        with app.app_context():
+            upgrade()
+            db.session.commit()
+            cases = endpointcases(app) + scoringcases(working)
+        # timed outside the app context, each test client request pushes its own so flask_login's user in g is
+        # never shared between the clients of different roles
+        for case, call in cases:
+            results[case] = summarise(timecall(call, repeat, min_seconds))
+            # measured on its own run, tracemalloc slows every allocation so it would skew the timings
+            results[case]['peak_kib'] = peakallocation(call)
+            if progress:
+                progress(name, case, results[case])
+        with app.app_context():
+            db.engine.dispose()
+    finally:
+        for path in (working, working + '-wal', working + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+    return results
+
+
+def runbenchmarks(datasets, repeat=REPEAT, data_dir=DATA_DIR, fresh=False, progress=None,
+                  min_seconds=MIN_SECONDS):
+    '''function to benchmark each named dataset spec, returns the results document'''
+    return {'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'machine': platform.platform(),
+            'repeat': repeat,
+            'datasets': {name: {'spec': dict(zip(('inspections', 'assets', 'sites', 'users'), spec)),
+                                'cases': benchmarkdataset(name, spec, repeat, data_dir, fresh, progress,
+                                                          min_seconds)}
+                         for name, spec in datasets.items()}}
+
+
+def compareresults(results, baseline, tolerance=TOLERANCE, floor_ms=FLOOR_MS, floor_kib=FLOOR_KIB):
+    '''function to compare median times and peak allocations against a baseline, returns a list of regressions as
+    dicts. cases or datasets missing from either side are skipped, a new case has nothing to regress from.'''
+    regressions = []
+    for name, dataset in results['datasets'].items():
+        basecases = baseline.get('datasets', {}).get(name, {}).get('cases', {})
+        for case, summary in dataset['cases'].items():
+            if case not in basecases:
+                continue
+            for metric, floor in (('median_ms', floor_ms), ('peak_kib', floor_kib)):
+                if metric not in summary or metric not in basecases[case]:
+                    continue
+                before, after = basecases[case][metric], summary[metric]
+                if after > before * (1 + tolerance) and after - before >= floor:
+                    regressions.append({'dataset': name, 'case': case, 'metric': metric, 'baseline': before,
+                                        'current': after, 'change': round(after / before - 1, 3) if before else None})
+    return regressions
+
+
+def mergebaseline(results, baseline):
+    '''function to return the baseline with the datasets just run replaced by these results'''
+    merged = dict(baseline, **{key: value for key, value in results.items() if key != 'datasets'})
+    merged['datasets'] = dict(baseline.get('datasets', {}), **results['datasets'])
+    return merged
+
+
+def readjson(path):
+    '''function to read a results or baseline file, a missing file reads as empty'''
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def writejson(path, document):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+@click.command()
+@click.option('--datasets', default=','.join(DATASETS), show_default=True,
+              help=f'Comma separated datasets to run, from {", ".join(DATASETS)}.')
+@click.option('--repeat', default=REPEAT, show_default=True,
+              help='Least timed runs of each case after one warm up run.')
+@click.option('--output', default='benchmark_results.json', show_default=True, help='File the results are written to.')
+@click.option('--baseline', default=BASELINE_FILE, show_default=True, help='Baseline the results are compared with.')
+@click.option('--tolerance', default=TOLERANCE, show_default=True,
+              help='Fraction a median may grow over the baseline before it counts as a regression.')
+@click.option('--update-baseline', is_flag=True, help='Write these results in to the baseline instead of comparing.')
+@click.option('--data-dir', default=DATA_DIR, show_default=True, help='Where seeded datasets are kept between runs.')
+@click.option('--fresh', is_flag=True, help='Reseed the datasets even if they are already in the data dir.')
+def main(datasets, repeat, output, baseline, tolerance, update_baseline, data_dir, fresh):
+    """Benchmark the time and peak memory of the main views, login and scoring against seeded datasets."""
+    names = [name.strip() for name in datasets.split(',') if name.strip()]
+    unknown = [name for name in names if name not in DATASETS]
+    if unknown:
+        raise click.BadParameter(f'unknown datasets {", ".join(unknown)}', param_hint='--datasets')
+    results = runbenchmarks({name: DATASETS[name] for name in names}, repeat, data_dir, fresh,
+                            progress=lambda name, case, summary: click.echo(
+                                f"{name:>5} {case:<28} {summary['median_ms']:>10.2f} ms "
+                                f"{summary['peak_kib']:>10.1f} KiB", err=True))
+    writejson(output, results)
+    click.echo(f'Results written to {output}.')
+
+    if update_baseline:
+        writejson(baseline, mergebaseline(results, readjson(baseline)))
+        click.echo(f'Baseline {baseline} updated.')
+        return
+    regressions = compareresults(results, readjson(baseline), tolerance)
+    for regression in regressions:
+        unit = 'ms' if regression['metric'] == 'median_ms' else 'KiB peak'
+        click.echo(f"PERFORMANCE REGRESSION {regression['dataset']} {regression['case']}: "
+                   f"{regression['current']:.2f} {unit} against a baseline of {regression['baseline']:.2f} {unit}",
+                   err=True)
+    if regressions:
+        sys.exit(1)
+    click.echo('No regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
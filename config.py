@@ -1,7 +1,7 @@
 # Name      : config
 # Author    : Patrick Cronin
 # Date      : 19/07/2025
-# Updated   : 17/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Config settings for application.
 
 from dotenv import load_dotenv
@@ -22,3 +22,51 @@ class Config:
     except Exception as e:
         raise EnvironmentError('Please set the DATABASE_URI env variable')
     # SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # logged in users are cached per worker, checked against the users version stamp so a change made on another
+    # worker applies within VERSION_CHECK_SECONDS. the shared version stamps are reread at most that often
+    VERSION_CHECK_SECONDS = float(os.getenv('VERSION_CHECK_SECONDS', '2'))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))
+    # most bytes of rendered sites, assets and faqs html each worker keeps, see website/fragmentcache.py
+    FRAGMENT_CACHE_BYTES = int(os.getenv('FRAGMENT_CACHE_BYTES', str(8 * 1024 * 1024)))
+    # SQLite production profile, see website/sqlitetuning.py. set SQLITE_TUNING=0 to use the driver defaults
+    SQLITE_TUNING = os.getenv('SQLITE_TUNING', '1') == '1'
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', str(-64 * 1024)))
+    SQLITE_READ_ONLY_GET = os.getenv('SQLITE_READ_ONLY_GET', '1') == '1'
+    # werkzeug hash method with its cost, e.g. pbkdf2:sha256:600000 or scrypt:32768:8:1. stored hashes made with
+    # anything else are rehashed the next time the user logs in
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+    PASSWORD_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_QUEUE_TIMEOUT', '5'))
+    # login attempts allowed per username and per client IP, each refilling over its window in seconds.
+    # memory keeps the buckets per worker, sqlite shares them between workers in the throttle_bucket table
+    LOGIN_THROTTLE_STORE = os.getenv('LOGIN_THROTTLE_STORE', 'memory')
+    LOGIN_THROTTLE_MAX_KEYS = int(os.getenv('LOGIN_THROTTLE_MAX_KEYS', '10000'))
+    LOGIN_USER_ATTEMPTS = int(os.getenv('LOGIN_USER_ATTEMPTS', '5'))
+    LOGIN_USER_WINDOW = float(os.getenv('LOGIN_USER_WINDOW', '300'))
+    LOGIN_IP_ATTEMPTS = int(os.getenv('LOGIN_IP_ATTEMPTS', '50'))
+    LOGIN_IP_WINDOW = float(os.getenv('LOGIN_IP_WINDOW', '300'))
+    # number of proxies in front of the app whose X-Forwarded-For entries are trusted for the client IP the login and
+    # CSP report throttles bucket on. 0 uses the address of the connection, which behind a proxy is the proxy's own
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', '0'))
+    # request, SQL and pool metrics at /metrics. with several workers set METRICS_DIR to a directory they all share,
+    # emptied on deploy, and each worker publishes its totals there at most every METRICS_FLUSH_SECONDS
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+    METRICS_DIR = os.getenv('METRICS_DIR', '')
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+    # gzip html and json responses of at least COMPRESS_MIN_BYTES, see website/compression.py. behind a proxy that
+    # already compresses set COMPRESS_ENABLED=0
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', '1') == '1'
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+    # CSP violation reports, see website/cspreports.py. each worker queues up to CSP_QUEUE_SIZE and writes them every
+    # CSP_FLUSH_SECONDS, a client may send CSP_CLIENT_REPORTS every CSP_CLIENT_WINDOW seconds
+    CSP_QUEUE_SIZE = int(os.getenv('CSP_QUEUE_SIZE', '1000'))
+    CSP_FLUSH_SECONDS = float(os.getenv('CSP_FLUSH_SECONDS', '5'))
+    CSP_FLUSH_ROWS = int(os.getenv('CSP_FLUSH_ROWS', '500'))
+    CSP_CLIENT_REPORTS = int(os.getenv('CSP_CLIENT_REPORTS', '30'))
+    CSP_CLIENT_WINDOW = float(os.getenv('CSP_CLIENT_WINDOW', '60'))
@@ -1,16 +1,21 @@
 # Name      : conftest
 # Author    : Patrick Cronin
 # Date      : 19/08/2025
-# Updated   : 19/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Helping CI wipe it's bottom
 
 import sys
 import pytest
 
+
+def _pop_website_modules():
+    """drop the website package and all of its modules so each test imports them against a fresh db"""
+    for name in [name for name in sys.modules if name == 'website' or name.startswith('website.')]:
+        sys.modules.pop(name, None)
+
+
 @pytest.fixture(autouse=True)
 def _cleanup_modules():
-    for name in ('website.views', 'website.models','website.userrolewrappers', 'website.auth', 'website.inspections', 'website.csp'):
-        sys.modules.pop(name, None)
+    _pop_website_modules()
     yield
-    for name in ('website.views', 'website.models','website.userrolewrappers', 'website.auth', 'website.inspections', 'website.csp'):
-        sys.modules.pop(name, None)
+    _pop_website_modules()
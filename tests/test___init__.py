@@ -1,7 +1,7 @@
 # Name      : test__init__
 # Author    : Patrick Cronin
 # Date      : 20/07/2025
-# Updated   : 18/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Test functions defined in __init__
 
 import sys
@@ -24,14 +24,16 @@ def _dummy_model_module():
 
     User.query = _Query()
 
-    for classname in ['Role', 'Asset', 'Assetclass', 'Assetstatus', 'Site', 'Condition', 'Inspection']:
+    for classname in ['Role', 'Asset', 'Assetclass', 'Assetstatus', 'Site', 'Condition', 'Inspection',
+                      'DashboardCounter', 'DataVersion', 'ThrottleBucket',
+                      'AssetLatestInspection', 'AssetWearTrend', 'CspViolation']:
         setattr(m, classname, type(classname, (), {}))
     m.User = User
     return m
 
 def _install_sub_modules(*, break_views: bool = False):
-    """stands in website.models/views/auth/csp"""
-    for module_name in ('website.models', 'website.views', 'website.auth', 'website.csp'):
+    """stands in website.models/views/auth/csp/api"""
+    for module_name in ('website.models', 'website.views', 'website.auth', 'website.csp', 'website.api'):
         sys.modules.pop(module_name, None)
 
     sys.modules['website.models'] = _dummy_model_module()
@@ -48,12 +50,16 @@ def _install_sub_modules(*, break_views: bool = False):
     c.csp = Blueprint('csp', __name__)
     sys.modules['website.csp'] = c
 
+    api = types.ModuleType('website.api')
+    api.api = Blueprint('api', __name__)
+    sys.modules['website.api'] = api
+
 @pytest.fixture(autouse=True)
 def _reset_modules():
     """reset modules for each test"""
     sys.modules.pop('website', None)
     yield
-    for module_name in ('website.models', 'website.views', 'website.auth', 'website.csp'):
+    for module_name in ('website.models', 'website.views', 'website.auth', 'website.csp', 'website.api'):
         sys.modules.pop(module_name, None)
     sys.modules.pop('website', None)
 
@@ -74,6 +80,7 @@ def test_create_app_registers_blueprints():
     assert 'views' in app.blueprints
     assert 'auth' in app.blueprints
     assert 'csp' in app.blueprints
+    assert 'api' in app.blueprints
 
 def test_init_app_failure(monkeypatch, caplog):
     """Test logging raising of exception in initialisation of application"""
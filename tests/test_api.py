@@ -0,0 +1,139 @@
+# Name      : test_api
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test api.py using pytest
+
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+
+import website
+from website import models as m
+from website.api import api
+from website.importer import insertrecords
+
+ADMIN, FIELD = 1, 2
+
+
+@pytest.fixture
+def app():
+    """lite flask app with the api blueprint and an in memory db holding a site with five assets"""
+    app = Flask(__name__)
+    app.secret_key = 'testing'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    lm = LoginManager()
+    lm.init_app(app)
+    lm.user_loader(lambda uid: website.db.session.get(m.User, int(uid)))
+    app.register_blueprint(api, url_prefix='/api/v1')
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([
+            m.Role(role_name='ADMIN', role_description='Admin'),
+            m.Role(role_name='FIELD', role_description='Field'),
+            m.User(username='admin', first_name='Al', surname='Min', password='hashed', user_role='ADMIN'),
+            m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed', user_role='FIELD'),
+            m.Site(id=123456, site_no=123456, description='Dock')])
+        website.db.session.add_all([
+            m.Asset(equip_no=100000000000 + i, description=f'Chain {i}', location_on_site='Bay', site_no=123456,
+                    equip_status='AC', equip_class='C5') for i in range(5)])
+        website.db.session.commit()
+        yield app
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def _client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+    return client
+
+
+def _countqueries(app):
+    statements = []
+    engine = website.db.engine
+
+    def listener(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', listener)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', listener)
+
+
+def test_requires_login(app):
+    resp = app.test_client().get('/api/v1/assets')
+    assert resp.status_code == 401 and 'error' in resp.get_json()
+
+
+def test_inspections_require_admin(app):
+    resp = _client(app, FIELD).get('/api/v1/inspections')
+    assert resp.status_code == 403 and 'error' in resp.get_json()
+
+
+def test_field_selection(app):
+    client = _client(app, FIELD)
+    resp = client.get('/api/v1/assets?fields=equip_no,site_description&per_page=2')
+    body = resp.get_json()
+    assert body['data'] == [{'equip_no': 100000000000, 'site_description': 'Dock'},
+                            {'equip_no': 100000000001, 'site_description': 'Dock'}]
+
+    resp = client.get('/api/v1/assets?fields=equip_no,password')
+    assert resp.status_code == 400 and 'password' in resp.get_json()['error']
+
+
+def test_cursor_walks_every_row_once(app):
+    client = _client(app, FIELD)
+    seen, url = [], '/api/v1/assets?fields=equip_no&per_page=2'
+    while url:
+        body = client.get(url).get_json()
+        seen += [row['equip_no'] for row in body['data']]
+        url = body['links'].get('next')
+    assert seen == [100000000000 + i for i in range(5)]
+
+
+def test_current_etag_gets_304_without_listing_query(app):
+    client = _client(app, FIELD)
+    first = client.get('/api/v1/sites')
+    assert first.status_code == 200 and first.headers['ETag'].startswith('"')
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    statements, stop = _countqueries(app)
+    try:
+        again = client.get('/api/v1/sites', headers={'If-None-Match': first.headers['ETag']})
+    finally:
+        stop()
+    assert again.status_code == 304 and again.data == b''
+    assert not any('FROM site' in statement for statement in statements)
+    # the weak form a compressed response carries is just as current
+    assert client.get('/api/v1/sites', headers={'If-None-Match': f"W/{first.headers['ETag']}"}).status_code == 304
+
+
+def test_writes_change_the_etag(app):
+    client = _client(app, ADMIN)
+    tag = client.get('/api/v1/inspections').headers['ETag']
+
+    insertrecords([{'equip_no': 100000000000, 'condition_code': '1', 'user_id': 1, 'lc_health_score': 90,
+                    'asset_passed': True, 'insp_date': datetime(2025, 8, 1)}])
+    website.db.session.commit()
+    resp = client.get('/api/v1/inspections', headers={'If-None-Match': tag})
+    assert resp.status_code == 200 and len(resp.get_json()['data']) == 1
+    assert resp.headers['ETag'] != tag
+
+
+def test_site_edit_changes_only_listings_that_read_sites(app):
+    client = _client(app, FIELD)
+    numbers = client.get('/api/v1/assets?fields=equip_no').headers['ETag']
+    named = client.get('/api/v1/assets?fields=equip_no,site_description').headers['ETag']
+
+    website.db.session.get(m.Site, 123456).description = 'North Dock'
+    website.db.session.commit()
+    assert client.get('/api/v1/assets?fields=equip_no', headers={'If-None-Match': numbers}).status_code == 304
+    resp = client.get('/api/v1/assets?fields=equip_no,site_description', headers={'If-None-Match': named})
+    assert resp.status_code == 200 and resp.get_json()['data'][0]['site_description'] == 'North Dock'
@@ -0,0 +1,141 @@
+# Name      : test_assetsearch
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test assetsearch.py using pytest
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import text
+
+import website
+from website import models as m
+from website.assetsearch import matchquery, rebuildsearch, searchassets, MAX_SEARCH_LIMIT
+from website.pagination import paginate
+from website.views import views, ASSET_LISTING, pickedasset
+
+
+@pytest.fixture
+def app():
+    """lite flask app with the views blueprint and an in memory db holding two sites and four assets"""
+    app = Flask(__name__)
+    app.secret_key = 'testing'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    lm = LoginManager()
+    lm.init_app(app)
+    lm.user_loader(lambda uid: website.db.session.get(m.User, int(uid)))
+    app.register_blueprint(views, url_prefix='/')
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([
+            m.Role(role_name='FIELD', role_description='Field'),
+            m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed', user_role='FIELD'),
+            m.Site(id=123456, site_no=123456, description='Pumping Station North'),
+            m.Site(id=654321, site_no=654321, description='Chainbridge Depot'),
+            m.Asset(equip_no=100000000001, description='Lifting Chain', location_on_site='Wet well', site_no=123456,
+                    equip_status='AC', equip_class='C5'),
+            m.Asset(equip_no=100000000002, description='Hoist', location_on_site='Chain store', site_no=123456,
+                    equip_status='AC', equip_class='H1'),
+            m.Asset(equip_no=100000000003, description='Shackle', location_on_site='Yard', site_no=654321,
+                    equip_status='AC', equip_class='SH'),
+            m.Asset(equip_no=200000000001, description='Sling 100000000001', location_on_site='Yard',
+                    site_no=654321, equip_status='AC', equip_class='S1')])
+        website.db.session.commit()
+        yield app
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def _equip_nos(raw, **kw):
+    return [result['equip_no'] for result in searchassets(raw, **kw)]
+
+
+def test_search_matches_prefixes_across_columns_and_ranks_them(app):
+    # a whole word in the description beats the same word in a location beats a prefix of a site name
+    assert _equip_nos('chain') == [100000000001, 100000000002, 100000000003, 200000000001]
+    assert _equip_nos('lift cha') == [100000000001]
+    # both only match on their site, bm25 puts the shorter row first
+    assert sorted(_equip_nos('pumping north')) == [100000000001, 100000000002]
+    # an exact equip no is a whole word, found before the prefix search runs
+    assert _equip_nos('100000000003', limit=1) == [100000000003]
+    # an equip no outranks the same number in another asset's description
+    assert _equip_nos('100000000001') == [100000000001, 200000000001]
+    assert _equip_nos('1000000000')[-1] == 200000000001
+    assert set(_equip_nos('1000000000', limit=2)) < {100000000001, 100000000002, 100000000003}
+
+
+def test_search_text_is_never_read_as_fts_syntax(app):
+    assert matchquery('  ') is None and searchassets('') == []
+    assert matchquery('chain" OR hoist*') == '"chain"* "or"* "hoist"*'
+    assert _equip_nos('NEAR(hoist) -') == []
+    assert _equip_nos('hoist:') == [100000000002]
+
+
+def test_triggers_keep_the_index_in_step(app):
+    db = website.db
+    hoist = m.Asset.query.filter_by(equip_no=100000000002).one()
+    hoist.description = 'Gantry Crane'
+    db.session.add(m.Asset(equip_no=100000000004, description='Lifting Beam', location_on_site='Bay',
+                           site_no=654321, equip_status='AC', equip_class='LB'))
+    db.session.delete(m.Asset.query.filter_by(equip_no=100000000003).one())
+    m.Site.query.filter_by(site_no=654321).one().description = 'Harbour Depot'
+    db.session.commit()
+
+    assert _equip_nos('hoist') == []
+    assert _equip_nos('gantry') == [100000000002]
+    assert _equip_nos('shackle') == []
+    assert _equip_nos('harbour') == [100000000004, 200000000001]
+    assert _equip_nos('chainbridge') == []
+
+    # a bulk insert that skips the model events is indexed by the triggers too
+    spreader = {'equip_no': 100000000005, 'description': 'Spreader Bar', 'location_on_site': 'Bay', 'site_no': 123456,
+                'equip_status': 'AC', 'equip_class': 'LB'}
+    db.session.execute(m.Asset.__table__.insert(), [spreader])
+    assert _equip_nos('spreader') == [100000000005]
+
+
+def test_rebuild_restores_a_lost_index(app):
+    website.db.session.execute(text('DROP TABLE asset_search'))
+    website.db.session.commit()
+    assert rebuildsearch() == 4
+    assert _equip_nos('shackle') == [100000000003]
+
+
+def test_search_endpoint_and_assets_filter(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = '1'
+    body = client.get('/assets/search?q=yard&limit=500').get_json()
+    assert body['query'] == 'yard'
+    assert [result['equip_no'] for result in body['results']] == [100000000003, 200000000001]
+    assert body['results'][0]['site_description'] == 'Chainbridge Depot'
+    assert len(client.get(f'/assets/search?q=1&limit={MAX_SEARCH_LIMIT + 1}').get_json()['results']) == 4
+
+    page = paginate(website.db.session.query(m.Asset.equip_no), ASSET_LISTING, {'q': 'depot'})
+    assert [row.equip_no for row in page] == [100000000003, 200000000001]
+
+
+def test_lookup_pages_one_class_of_assets_for_the_pickers(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = '1'
+    chains = client.get('/assets/lookup?class=C5&q=10000').get_json()
+    assert [result['equip_no'] for result in chains['results']] == [100000000001]
+    assert chains['results'][0]['site_description'] == 'Pumping Station North' and chains['next_cursor'] is None
+
+    first = client.get('/assets/lookup?not_class=C5&q=yard&per_page=1').get_json()
+    assert [result['equip_no'] for result in first['results']] == [100000000003]
+    second = client.get(f"/assets/lookup?not_class=C5&q=yard&per_page=1&cursor={first['next_cursor']}").get_json()
+    assert [result['equip_no'] for result in second['results']] == [200000000001]
+    assert second['next_cursor'] is None
+    # no text pages through the whole class
+    assert len(client.get('/assets/lookup?not_class=C5').get_json()['results']) == 3
+
+    # the free text pickers are checked on the way back in
+    assert pickedasset('100000000001', chain=True) and not pickedasset('100000000001', chain=False)
+    assert pickedasset('100000000002', chain=False) and not pickedasset('100000000002', chain=True)
+    assert not pickedasset('999', chain=False) and not pickedasset('chain', chain=True)
@@ -1,7 +1,7 @@
 # Name      : test_auth
 # Author    : Patrick Cronin
 # Date      : 18/08/2025
-# Updated   : 18/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Test auth.py using pytest
 
 import sys
@@ -64,6 +64,9 @@ def _stub_models_module():
 
     m.User = User
     m.Role = Role
+    for classname in ('Condition', 'Assetclass', 'Assetstatus', 'DataVersion', 'ThrottleBucket', 'Site', 'Asset',
+                      'Inspection'):
+        setattr(m, classname, type(classname, (), {}))
     sys.modules['website.models'] = m
 
 @pytest.fixture
@@ -0,0 +1,60 @@
+# Name      : test_benchmark
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test benchmark.py using pytest
+
+import json
+
+import benchmark
+
+
+def _results(**cases):
+    return {'datasets': {'1k': {'cases': {case: dict(zip(('median_ms', 'peak_kib'), values))
+                                          for case, values in cases.items()}}}}
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = _results(**{'views.assets': (10.0, 500), 'views.home[ADMIN]': (1.0, 100), 'auth.login': (500.0, 100)})
+    results = _results(**{'views.assets': (14.0, 520), 'views.home[ADMIN]': (1.9, 300), 'auth.login': (520.0, 900),
+                          'views.new': (99.0, 9999)})
+    regressions = benchmark.compareresults(results, baseline, tolerance=0.25, floor_ms=2.0, floor_kib=256)
+    # home is slower and bigger but by less than either floor, the new case has no baseline, assets is slower and
+    # login holds far more memory
+    flagged = [(regression['case'], regression['metric']) for regression in regressions]
+    assert flagged == [('views.assets', 'median_ms'), ('auth.login', 'peak_kib')]
+    assert regressions[0]['change'] == 0.4
+    assert benchmark.compareresults(results, {}) == []
+
+
+def test_update_keeps_datasets_that_were_not_run():
+    baseline = {'python': '3.10', 'datasets': {'1k': {'cases': {}}, '1M': {'cases': {'views.assets': {}}}}}
+    merged = benchmark.mergebaseline({'python': '3.11', 'datasets': {'1k': {'cases': {'views.sites': {}}}}}, baseline)
+    assert merged['python'] == '3.11'
+    assert merged['datasets'] == {'1k': {'cases': {'views.sites': {}}}, '1M': {'cases': {'views.assets': {}}}}
+
+
+def test_run_times_every_case_against_a_seeded_dataset(monkeypatch, tmp_path):
+    import config
+    monkeypatch.setattr(config.Config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    results = benchmark.runbenchmarks({'tiny': (200, 20, 2, 2)}, repeat=2, data_dir=str(tmp_path), min_seconds=0)
+
+    cases = results['datasets']['tiny']['cases']
+    assert all(summary['runs'] == 2 and summary['median_ms'] > 0 and summary['peak_kib'] >= 0
+               for summary in cases.values())
+    # the committed baseline covers every case, so none of them can slip through as new
+    with open(benchmark.BASELINE_FILE, encoding='utf-8') as f:
+        baseline = json.load(f)
+    for name in benchmark.DATASETS:
+        assert set(baseline['datasets'][name]['cases']) == set(cases)
+    # the seeded file is kept for the next run and the working copy the POSTs wrote to is gone
+    assert [path.name for path in tmp_path.iterdir()] == ['tiny-200-20-2-2-0.db']
+    # the overrides only reach the benchmark apps
+    assert config.Config.LOGIN_USER_ATTEMPTS < 10 ** 9
+
+
+def test_unknown_dataset_is_refused():
+    from click.testing import CliRunner
+    result = CliRunner().invoke(benchmark.main, ['--datasets', '1k,2M'])
+    assert result.exit_code != 0
+    assert 'unknown datasets 2M' in result.output
@@ -0,0 +1,80 @@
+# Name      : test_commands
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test commands.py using pytest
+
+import pytest
+from flask import Flask
+
+import website
+from website import models as m
+from website.commands import registercommands, rescoreinspections
+from website.inspections import batchscore
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an in memory db and the CLI commands registered"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+    registercommands(app)
+
+    with app.app_context():
+        website.db.create_all()
+        session = website.db.session
+        session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                         m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                user_role='FIELD')])
+        session.add_all([
+            m.Inspection(equip_no=100000000001, condition_code='1', chain_pitch_length=100,
+                         measure_mean_pitch_length=110, lc_health_score=90.9090909, asset_passed=True, user_id=1),
+            m.Inspection(equip_no=100000000002, condition_code='2', chain_pitch_length=100,
+                         measure_mean_pitch_length=120, lc_health_score=83.3333333, asset_passed=True, user_id=1),
+            m.Inspection(equip_no=100000000003, condition_code='5', asset_passed=False, user_id=1),
+        ])
+        session.commit()
+        yield app
+        session.rollback()
+        website.db.drop_all()
+
+
+def _passed():
+    return [i.asset_passed for i in m.Inspection.query.order_by(m.Inspection.id)]
+
+
+def test_rescore_unchanged_thresholds_writes_nothing(app):
+    assert rescoreinspections(chunk_size=2) == (3, 0)
+    assert _passed() == [True, True, False]
+
+
+def test_rescore_new_thresholds_updates_history(app, monkeypatch):
+    # batchscore reads the configured thresholds when called, as the scalar scoring of new inspections does
+    monkeypatch.setitem(batchscore.__globals__, 'PASS_SCORE_THRESHOLD', 85)
+    monkeypatch.setitem(batchscore.__globals__, 'CONDITION_FAILURE_THRESHOLD', 6)
+    scanned, changed = rescoreinspections(chunk_size=2)
+    assert (scanned, changed) == (3, 2)
+    assert _passed() == [True, False, True]
+
+
+def test_other_thresholds_are_only_a_dry_run(app):
+    assert rescoreinspections(chunk_size=2, pass_threshold=85, condition_threshold=6, dry_run=True) == (3, 2)
+    assert _passed() == [True, True, False]
+    with pytest.raises(ValueError):
+        rescoreinspections(pass_threshold=85)
+
+
+def test_rescore_command(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['rescore', '--pass-threshold', '95'])
+    assert result.exit_code != 0 and '--dry-run' in result.output
+
+    result = runner.invoke(args=['rescore', '--dry-run', '--pass-threshold', '95'])
+    assert result.exit_code == 0
+    assert 'Checked 3 inspections, 2 would be updated. Nothing was written.' in result.output
+    assert _passed() == [True, True, False]
+
+    result = runner.invoke(args=['rescore'])
+    assert result.exit_code == 0
+    assert 'Rescored 3 inspections, 0 updated.' in result.output
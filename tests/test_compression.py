@@ -0,0 +1,73 @@
+# Name      : test_compression
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test compression.py using pytest
+
+import gzip
+
+import pytest
+from flask import Flask, Response, jsonify, stream_with_context
+
+from website.compression import initcompression
+
+PAGE = '<html>' + '<tr><td>lifting chain</td></tr>' * 200 + '</html>'
+
+
+@pytest.fixture
+def client():
+    """lite flask app with a large page, a small page, a json listing, a streamed export and a gzip download"""
+    app = Flask(__name__)
+    app.config['COMPRESS_MIN_BYTES'] = 1024
+
+    @app.route('/page')
+    def page():
+        response = Response(PAGE, mimetype='text/html')
+        response.set_etag('v1')
+        return response
+
+    @app.route('/small')
+    def small():
+        return '<p>ok</p>'
+
+    @app.route('/json')
+    def listing():
+        return jsonify({'results': [{'equip_no': 100000000000 + i} for i in range(100)]})
+
+    @app.route('/stream')
+    def stream():
+        return Response(stream_with_context(iter([PAGE])), mimetype='text/html')
+
+    @app.route('/export')
+    def export():
+        response = Response(gzip.compress(PAGE.encode()), mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    initcompression(app)
+    return app.test_client()
+
+
+def test_large_responses_are_gzipped_for_clients_that_accept_it(client):
+    response = client.get('/page', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).decode() == PAGE
+    assert int(response.headers['Content-Length']) == len(response.data) < len(PAGE) // 10
+    assert 'Accept-Encoding' in response.headers['Vary']
+    # the etag is weakened rather than dropped, so the page still revalidates
+    assert response.headers['ETag'] == 'W/"v1"'
+    assert client.get('/json', headers={'Accept-Encoding': 'gzip'}).headers['Content-Encoding'] == 'gzip'
+
+    plain = client.get('/page')
+    assert plain.data.decode() == PAGE and 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary'] and plain.headers['ETag'] == '"v1"'
+
+
+def test_small_streamed_and_encoded_responses_are_left_alone(client):
+    headers = {'Accept-Encoding': 'gzip'}
+    small = client.get('/small', headers=headers)
+    assert small.data == b'<p>ok</p>' and 'Content-Encoding' not in small.headers
+    stream = client.get('/stream', headers=headers)
+    assert stream.data.decode() == PAGE and 'Content-Encoding' not in stream.headers
+    export = client.get('/export', headers=headers)
+    assert gzip.decompress(export.data).decode() == PAGE
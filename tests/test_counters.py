@@ -0,0 +1,77 @@
+# Name      : test_counters
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test counters.py using pytest
+
+import pytest
+from flask import Flask
+
+import website
+from website import models as m
+from website.counters import readcounters, reconcilecounters, rolecounter, USER_COUNTER, INSPECTION_COUNTER
+
+
+@pytest.fixture
+def session():
+    """lite flask app with an in memory db"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([m.Role(role_name=r, role_description=r) for r in ('ADMIN', 'CONTENG', 'FIELD')])
+        website.db.session.commit()
+        yield website.db.session
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def _user(username, role):
+    return m.User(username=username, first_name='Jo', surname='Ward', password='hashed', user_role=role)
+
+
+def test_counters_follow_inserts_updates_and_deletes(session):
+    admin, field = _user('admin1', 'ADMIN'), _user('field1', 'FIELD')
+    session.add_all([admin, field, _user('field2', 'FIELD')])
+    session.flush()
+    session.add_all([m.Inspection(equip_no=100000000001, condition_code='1', user_id=field.id) for _ in range(3)])
+    session.commit()
+
+    counters = readcounters()
+    assert counters[USER_COUNTER] == 3
+    assert counters[rolecounter('FIELD')] == 2
+    assert counters[INSPECTION_COUNTER] == 3
+
+    field.user_role = 'CONTENG'
+    session.delete(admin)
+    session.delete(m.Inspection.query.first())
+    session.commit()
+
+    counters = readcounters()
+    assert counters[USER_COUNTER] == 2
+    assert counters[rolecounter('ADMIN')] == 0
+    assert counters[rolecounter('FIELD')] == 1
+    assert counters[rolecounter('CONTENG')] == 1
+    assert counters[INSPECTION_COUNTER] == 2
+
+
+def test_rolled_back_changes_leave_counters_alone(session):
+    session.add(_user('admin1', 'ADMIN'))
+    session.commit()
+    session.add(_user('admin2', 'ADMIN'))
+    session.flush()
+    session.rollback()
+
+    assert readcounters()[rolecounter('ADMIN')] == 1
+
+
+def test_reconcile_rebuilds_from_tables(session):
+    session.add(_user('field1', 'FIELD'))
+    session.commit()
+    session.execute(m.DashboardCounter.__table__.update().values(value=99))
+    session.commit()
+
+    assert reconcilecounters() == {USER_COUNTER: 1, INSPECTION_COUNTER: 0, rolecounter('FIELD'): 1}
+    assert readcounters()[USER_COUNTER] == 1
@@ -1,18 +1,23 @@
 # Name      : test_csp
 # Author    : Patrick Cronin
 # Date      : 18/08/2025
-# Updated   : 18/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Test csp.py using pytest
 
 import pytest
 from flask import Flask
 from website.csp import csp, CSP_POLICY
+from website.cspreports import CspReportQueue
 
 @pytest.fixture
 def app():
     app = Flask(__name__)
     app.register_blueprint(csp)
-    return app
+    # batches collected in a list rather than written to a db
+    app.config['written'] = []
+    app.extensions['csp_queue'] = CspReportQueue(app, flush_seconds=60, writer=app.config['written'].extend)
+    yield app
+    app.extensions['csp_queue'].stop()
 
 @pytest.fixture
 def client(app):
@@ -28,13 +33,18 @@ def test_csp_header_blueprint(client):
     assert "default-src 'self';" in header
     assert "script-src 'self';" in header
 
-def test_csp_returns_records_and_204(client, capsys):
+def test_csp_returns_records_and_204(app, client, capsys):
     """test creation of report records and returning 204"""
-    record = {"csp-report": {"document-uri": "https//kittens.com", "blocked-uri": "inline"}}
+    record = {"csp-report": {"document-uri": "https://kittens.com/?page=2", "blocked-uri": "inline",
+                             "violated-directive": "script-src 'self'"}}
     resp = client.post('/cspreport', json=record)
 
     assert resp.status_code == 204
+    # queued for the background thread rather than printed
     out, _ = capsys.readouterr()
-    assert 'Violations:' in out
+    assert out == ''
+    app.extensions['csp_queue'].stop()
+    assert [(row['directive'], row['blocked_uri'], row['document_uri'], row['count'])
+            for row in app.config['written']] == [('script-src', 'inline', 'https://kittens.com/', 1)]
 
 
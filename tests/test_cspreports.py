@@ -0,0 +1,141 @@
+# Name      : test_cspreports
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test cspreports.py using pytest
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from website.cspreports import CspReportQueue, parsereports
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """full app from create_app on an in memory db holding an admin and a field user"""
+    # imported here as test_config re-imports the module, create_app reads whichever one is current
+    import config
+    monkeypatch.setattr(config.Config, 'SECRET_KEY', 'secret')
+    monkeypatch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+    monkeypatch.setattr(config.Config, 'METRICS_ENABLED', False, raising=False)
+    monkeypatch.setattr(config.Config, 'CSP_CLIENT_REPORTS', 3, raising=False)
+    from website import create_app, db
+    from website import models as m
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([m.Role(role_name='ADMIN', role_description='Administrator'),
+                            m.Role(role_name='FIELD', role_description='Field'),
+                            m.User(username='admin', first_name='Jo', surname='Ward', password='hashed',
+                                   user_role='ADMIN'),
+                            m.User(username='field', first_name='Sam', surname='Hill', password='hashed',
+                                   user_role='FIELD')])
+        db.session.commit()
+    yield app
+    if 'csp_queue' in app.extensions:
+        app.extensions['csp_queue'].stop()
+    with app.app_context():
+        db.drop_all()
+
+
+def _report(directive='script-src-elem', blocked='https://code.jquery.com/jquery.min.js', page='/assets?cursor=abc'):
+    return {'csp-report': {'effective-directive': directive, 'blocked-uri': blocked,
+                           'document-uri': f'https://lch.example.com{page}'}}
+
+
+def test_both_report_formats_are_read_and_grouped_without_query_strings():
+    assert parsereports(_report()) == [('script-src-elem', 'https://code.jquery.com/jquery.min.js',
+                                        'https://lch.example.com/assets')]
+    assert parsereports({'csp-report': {'violated-directive': "style-src 'self'", 'blocked-uri': 'inline',
+                                        'document-uri': 'https://lch.example.com/#top'}}) == \
+           [('style-src', 'inline', 'https://lch.example.com/')]
+    assert parsereports([{'type': 'csp-violation', 'body': {'effectiveDirective': 'img-src',
+                                                            'blockedURL': 'data', 'documentURL': 'https://a.b/c?d'}},
+                         {'type': 'deprecation', 'body': {}}]) == [('img-src', 'data', 'https://a.b/c')]
+    assert parsereports(None) == [] and parsereports({'csp-report': {'blocked-uri': 'inline'}}) == []
+    assert parsereports(['junk', {'type': 'csp-violation', 'body': 'junk'}]) == []
+
+
+def test_repeats_are_counted_and_written_in_one_batch():
+    batches = []
+    reports = CspReportQueue(Flask(__name__), flush_seconds=60, writer=batches.append)
+    for page in ('/assets?cursor=1', '/assets?cursor=2', '/assets', '/sites'):
+        assert reports.submit(parsereports(_report(page=page)))
+    reports.stop()
+
+    assert len(batches) == 1
+    assert sorted((row['document_uri'], row['count']) for row in batches[0]) == \
+           [('https://lch.example.com/assets', 3), ('https://lch.example.com/sites', 1)]
+    assert all(row['first_seen'] <= row['last_seen'] for row in batches[0])
+    stats = reports.stats()
+    assert (stats['received'], stats['dropped'], stats['written'], stats['queued']) == (4, 0, 2, 0)
+
+
+def test_full_queue_drops_reports_instead_of_blocking():
+    release, batches = threading.Event(), []
+
+    def slowwriter(rows):
+        release.wait(5)
+        batches.append(rows)
+
+    # every distinct violation is flushed at once, so the thread sits in the writer while the queue fills up
+    reports = CspReportQueue(Flask(__name__), maxsize=2, flush_seconds=60, flush_rows=1, writer=slowwriter)
+    assert reports.submit(parsereports(_report(page='/first')))
+    while reports.stats()['queued']:
+        time.sleep(0.001)
+    assert reports.submit(parsereports(_report(page='/second')))
+    assert reports.submit(parsereports(_report(page='/third')))
+    assert not reports.submit(parsereports(_report(page='/fourth')))
+    # a report with several violations arriving at a full queue has every one of them counted as dropped
+    assert not reports.submit(parsereports([{'type': 'csp-violation', 'body': {
+        'effectiveDirective': 'img-src', 'blockedURL': 'data', 'documentURL': f'https://a.b/{n}'}} for n in range(3)]))
+    release.set()
+    reports.stop()
+
+    assert [batch[0]['document_uri'].rsplit('/', 1)[1] for batch in batches] == ['first', 'second', 'third']
+    stats = reports.stats()
+    assert (stats['received'], stats['dropped'], stats['written']) == (7, 4, 3)
+
+
+def test_batches_add_to_the_counts_already_stored(app):
+    # imported here so it writes through the db of the app create_app just built
+    from website import db
+    from website.cspreports import writeviolations
+    from website.models import CspViolation
+    key = {'directive': 'script-src', 'blocked_uri': 'inline', 'document_uri': 'https://lch.example.com/'}
+    with app.app_context():
+        writeviolations([dict(key, count=2, first_seen=datetime(2026, 10, 1), last_seen=datetime(2026, 10, 2))])
+        writeviolations([dict(key, count=5, first_seen=datetime(2026, 10, 3), last_seen=datetime(2026, 10, 4)),
+                         dict(key, directive='img-src', count=1, first_seen=datetime(2026, 10, 3),
+                              last_seen=datetime(2026, 10, 3))])
+        rows = db.session.query(CspViolation.directive, CspViolation.count, CspViolation.first_seen,
+                                CspViolation.last_seen).order_by(CspViolation.directive).all()
+    assert [tuple(row) for row in rows] == [
+        ('img-src', 1, datetime(2026, 10, 3), datetime(2026, 10, 3)),
+        ('script-src', 7, datetime(2026, 10, 1), datetime(2026, 10, 4))]
+
+
+def test_endpoint_limits_each_client_and_admins_see_the_summary(app):
+    client = app.test_client()
+    for _ in range(3):
+        assert client.post('/cspreport', json=_report(), content_type='application/csp-report').status_code == 204
+    assert client.post('/cspreport', json=_report()).status_code == 429
+    other = app.test_client()
+    assert other.post('/cspreport', data='x' * 20000, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 413
+    app.extensions['csp_queue'].stop()
+
+    with client.session_transaction() as session:
+        session['_user_id'], session['_fresh'] = '1', True
+    page = client.get('/cspadmin')
+    assert page.status_code == 200
+    assert b'script-src-elem' in page.data and b'https://lch.example.com/assets' in page.data
+    assert b'<td>3</td>' in page.data
+
+    field = app.test_client()
+    with field.session_transaction() as session:
+        session['_user_id'], session['_fresh'] = '2', True
+    assert field.get('/cspadmin').status_code == 302
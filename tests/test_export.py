@@ -0,0 +1,72 @@
+# Name      : test_export
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test export.py using pytest
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+import website
+from website import models as m
+from website import export
+from website.export import exportquery, exportstream
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an in memory db holding inspections at two sites"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        session = website.db.session
+        session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                         m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                user_role='FIELD'),
+                         m.Site(site_no=111111, description='North WPS'),
+                         m.Site(site_no=222222, description='South WPS'),
+                         m.Condition(condition_code='1', condition_description='Good'),
+                         m.Asset(equip_no=100000000001, description='Chain', location_on_site='Wet well',
+                                 site_no=111111, equip_status='AC', equip_class='C5'),
+                         m.Asset(equip_no=100000000002, description='Hoist', location_on_site='Dry well',
+                                 site_no=222222, equip_status='AC', equip_class='H1')])
+        for day in range(1, 11):
+            session.add(m.Inspection(equip_no=100000000001 + day % 2, condition_code='1', asset_passed=True,
+                                     user_id=1, insp_date=datetime(2025, 8, day)))
+        session.commit()
+        yield app
+        session.rollback()
+        website.db.drop_all()
+
+
+def _text(stream):
+    return b''.join(stream).decode()
+
+
+def test_csv_export_joins_and_filters(app, monkeypatch):
+    monkeypatch.setattr(export, 'EXPORT_BUFFER_SIZE', 10)
+    rows = list(csv.DictReader(io.StringIO(_text(exportstream(
+        exportquery(datetime(2025, 8, 3), datetime(2025, 8, 8), 111111))))))
+
+    assert [r['id'] for r in rows] == ['4', '6']
+    assert rows[0]['site_description'] == 'North WPS'
+    assert rows[0]['condition_description'] == 'Good'
+    assert rows[0]['username'] == 'wardj'
+
+
+def test_jsonl_export_is_gzipped(app):
+    data = gzip.decompress(b''.join(exportstream(exportquery(), 'jsonl', compress=True)))
+    lines = [json.loads(line) for line in data.decode().splitlines()]
+
+    assert len(lines) == 10
+    assert lines[0]['insp_date'].startswith('2025-08-01')
+    assert lines[0]['asset_description'] == 'Hoist'
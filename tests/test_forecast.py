@@ -0,0 +1,167 @@
+# Name      : test_forecast
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test forecast.py using pytest
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from flask import Flask
+
+import website
+from website import models as m
+from website.forecast import fittrends, crossingdays, rebuildtrends, duetofail
+from website.importer import insertrecords
+
+CHAIN = 100000000001
+STEADY_CHAIN = 100000000002
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def session():
+    """lite flask app with an in memory db holding two lifting chains"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([
+            m.Role(role_name='FIELD', role_description='Field'),
+            m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed', user_role='FIELD'),
+            m.Site(id=123456, site_no=123456, description='Dock'),
+            m.Asset(equip_no=CHAIN, description='Chain', location_on_site='Bay 1', site_no=123456,
+                    equip_status='AC', equip_class='C5'),
+            m.Asset(equip_no=STEADY_CHAIN, description='Chain', location_on_site='Bay 2', site_no=123456,
+                    equip_status='AC', equip_class='C5')])
+        website.db.session.commit()
+        yield website.db.session
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def _inspect(session, equip_no, day, score):
+    inspection = m.Inspection(equip_no=equip_no, condition_code='1', user_id=1, lc_health_score=score,
+                              asset_passed=score >= 80, insp_date=START + timedelta(days=day))
+    session.add(inspection)
+    session.commit()
+    return inspection
+
+
+def _trend(session, equip_no):
+    return session.get(m.AssetWearTrend, equip_no)
+
+
+def test_fit_matches_least_squares():
+    t, y = np.array([0.0, 10.0, 25.0, 40.0]), np.array([100.0, 98.0, 94.0, 91.0])
+    slopes, intercepts = fittrends([4], [t.sum()], [y.sum()], [(t * t).sum()], [(t * y).sum()])
+    expected_slope, expected_intercept = np.polyfit(t, y, 1)
+    assert slopes[0] == pytest.approx(expected_slope)
+    assert intercepts[0] == pytest.approx(expected_intercept)
+    assert crossingdays(slopes, intercepts)[0] == pytest.approx((80 - expected_intercept) / expected_slope)
+
+
+def test_too_few_points_or_no_wear_gives_no_forecast():
+    slopes, intercepts = fittrends([1, 2, 2], [0, 10, 0], [95, 190, 190], [0, 100, 0], [0, 950, 0])
+    assert np.isnan(slopes[0]) and np.isnan(slopes[2])
+    assert np.isnan(crossingdays(slopes, intercepts)).all()
+
+
+def test_each_inspection_updates_the_trend_incrementally(session):
+    _inspect(session, CHAIN, 0, 100)
+    assert _trend(session, CHAIN).predicted_fail_date is None
+
+    _inspect(session, CHAIN, 100, 95)
+    trend = _trend(session, CHAIN)
+    assert trend.points == 2
+    assert trend.slope == pytest.approx(-0.05)
+    assert trend.predicted_fail_date == START + timedelta(days=400)
+
+    latest = _inspect(session, CHAIN, 200, 88)
+    session.delete(latest)
+    session.commit()
+    assert _trend(session, CHAIN).predicted_fail_date == START + timedelta(days=400)
+
+
+def test_incremental_bulk_and_rebuild_agree(session):
+    for day, score in ((0, 100), (60, 97), (150, 94)):
+        _inspect(session, CHAIN, day, score)
+    insertrecords([{'equip_no': CHAIN, 'condition_code': '1', 'user_id': 1, 'lc_health_score': 90,
+                    'asset_passed': True, 'insp_date': START + timedelta(days=240)}])
+    _inspect(session, CHAIN, 300, 87)
+    maintained = _trend(session, CHAIN)
+    slope, fail_date = maintained.slope, maintained.predicted_fail_date
+
+    assert rebuildtrends() == 1
+    rebuilt = _trend(session, CHAIN)
+    assert rebuilt.slope == pytest.approx(slope)
+    assert abs(rebuilt.predicted_fail_date - fail_date) < timedelta(minutes=1)
+
+
+def test_due_to_fail_uses_the_horizon(session):
+    _inspect(session, CHAIN, 0, 100)
+    _inspect(session, CHAIN, 100, 95)
+    _inspect(session, STEADY_CHAIN, 0, 99)
+    _inspect(session, STEADY_CHAIN, 100, 99)
+
+    now = START + timedelta(days=100)
+    assert [row.equip_no for row in duetofail(299, now)] == []
+    assert [row.equip_no for row in duetofail(300, now)] == [CHAIN]
+
+
+def test_rebuild_moves_the_inspections_version_on_and_moves_follow_the_asset(session):
+    _inspect(session, CHAIN, 0, 100)
+    moved = _inspect(session, CHAIN, 100, 95)
+    before = session.get(m.DataVersion, 'inspections').version
+    rebuildtrends()
+    session.expire_all()
+    assert session.get(m.DataVersion, 'inspections').version == before + 1
+
+    # one point left on the chain is too few for a trend, the steady chain now has the wearing pair
+    moved = session.get(m.Inspection, moved.id)
+    moved.equip_no = STEADY_CHAIN
+    session.commit()
+    assert _trend(session, CHAIN).predicted_fail_date is None
+    assert _trend(session, STEADY_CHAIN).points == 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """full app from create_app on an in memory db, logged in as a field user, one chain wearing and one steady"""
+    # imported here as test_config re-imports the module, create_app reads whichever one is current
+    import config
+    monkeypatch.setattr(config.Config, 'SECRET_KEY', 'secret')
+    monkeypatch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+    monkeypatch.setattr(config.Config, 'METRICS_ENABLED', False, raising=False)
+    from website import create_app, db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                            m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                   user_role='FIELD'),
+                            m.Site(id=123456, site_no=123456, description='Dock')])
+        db.session.add_all([m.Asset(equip_no=equip_no, description='Chain', location_on_site='Bay', site_no=123456,
+                                    equip_status='AC', equip_class='C5') for equip_no in (CHAIN, STEADY_CHAIN)])
+        db.session.commit()
+        now = datetime.now()
+        for equip_no, scores in ((CHAIN, (100, 82)), (STEADY_CHAIN, (99, 99))):
+            for days_ago, score in zip((100, 0), scores):
+                _inspect(db.session, equip_no, 0, score).insp_date = now - timedelta(days=days_ago)
+                db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'], session['_fresh'] = '1', True
+    yield client
+    with app.app_context():
+        db.drop_all()
+
+
+def test_blank_days_uses_the_default_horizon_and_skips_steady_chains(client):
+    for url in ('/forecast?days=', '/forecast?days=%20&site=', '/forecast?days=abc'):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert str(CHAIN).encode() in response.data and str(STEADY_CHAIN).encode() not in response.data
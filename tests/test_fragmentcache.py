@@ -0,0 +1,135 @@
+# Name      : test_fragmentcache
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test fragmentcache.py using pytest
+
+import sys
+
+import pytest
+from flask import template_rendered
+from sqlalchemy import event
+
+from website.fragmentcache import FragmentCache
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """full app from create_app on an in memory db holding one field user and two sites"""
+    # imported here as test_config re-imports the module, create_app reads whichever one is current
+    import config
+    monkeypatch.setattr(config.Config, 'SECRET_KEY', 'secret')
+    monkeypatch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+    monkeypatch.setattr(config.Config, 'METRICS_ENABLED', False, raising=False)
+    from website import create_app, db
+    from website import models as m
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                            m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                   user_role='FIELD'),
+                            m.Site(id=123456, site_no=123456, description='Pumping Station North'),
+                            m.Site(id=654321, site_no=654321, description='Chainbridge Depot')])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def _get(app, url):
+    '''function to request a page as the field user, returns the response, the templates rendered and the statements'''
+    from website import db
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'], session['_fresh'] = '1', True
+    templates, statements = [], []
+
+    def _rendered(sender, template, context, **extra):
+        templates.append(template.name)
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        with template_rendered.connected_to(_rendered, app):
+            response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+    assert response.status_code == 200
+    return response, templates, statements
+
+
+def test_lru_is_bounded_by_the_html_it_holds():
+    cache = FragmentCache(maxbytes=2 * sys.getsizeof('a' * 100))
+    renders = []
+
+    def render(name):
+        renders.append(name)
+        return name * 100
+
+    assert cache.get('a', lambda: render('a')) == 'a' * 100
+    cache.get('b', lambda: render('b'))
+    cache.get('a', lambda: render('a'))
+    # room for two, a third fragment pushes out the least recently used one, b, to stay within the bytes
+    cache.get('c', lambda: render('c'))
+    cache.get('a', lambda: render('a'))
+    cache.get('b', lambda: render('b'))
+    assert renders == ['a', 'b', 'c', 'b']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 4, 2, 2)
+    assert stats['bytes'] <= cache.maxbytes and stats['hit_rate'] == 2 / 6
+    # a fragment bigger than the whole cache is handed back without holding it
+    assert cache.get('big', lambda: 'z' * 1000) == 'z' * 1000 and cache.stats()['size'] == 2
+
+
+def test_unchanged_table_is_served_without_a_query_or_render(app):
+    first, templates, _ = _get(app, '/sites')
+    assert '_sites_table.html' in templates and b'Chainbridge Depot' in first.data
+
+    second, templates, statements = _get(app, '/sites')
+    assert '_sites_table.html' not in templates and 'sites.html' in templates
+    # only the sites version stamp is read, the users one was checked moments ago
+    selects = [statement for statement in statements if statement.startswith('SELECT')]
+    assert len(selects) == 1 and 'data_version' in selects[0]
+    assert second.data == first.data
+
+    # another query string is another fragment
+    _, templates, _ = _get(app, '/sites?sort=description')
+    assert '_sites_table.html' in templates
+
+    # the faqs never change, they are rendered once and served with no statements at all
+    _get(app, '/faqs')
+    faqs, templates, statements = _get(app, '/faqs')
+    assert '_faqs_content.html' not in templates and statements == [] and b'Frequently Asked' in faqs.data
+
+    # nor does any query string add another copy of them
+    size = app.extensions['fragment_cache'].stats()['size']
+    for n in range(3):
+        _, templates, _ = _get(app, f'/faqs?x={n}')
+        assert '_faqs_content.html' not in templates
+    assert app.extensions['fragment_cache'].stats()['size'] == size
+
+    # the table is keyed on the arguments its listing reads, made up or repeated ones share the page already held
+    for url in ('/sites?x=1', '/sites?sort=description&x=2', '/sites?sort=description&sort=site_no'):
+        _, templates, _ = _get(app, url)
+        assert '_sites_table.html' not in templates
+    assert app.extensions['fragment_cache'].stats()['size'] == size
+
+
+def test_a_write_renders_the_table_again(app):
+    from website import db
+    from website import models as m
+    _get(app, '/sites')
+    with app.app_context():
+        db.session.add(m.Site(id=111111, site_no=111111, description='Harbour Works'))
+        db.session.commit()
+    response, templates, _ = _get(app, '/sites')
+    assert '_sites_table.html' in templates and b'Harbour Works' in response.data
+
+    with app.app_context():
+        stats = app.extensions['fragment_cache'].stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (0, 2, 2)
@@ -0,0 +1,120 @@
+# Name      : test_importer
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test importer.py using pytest
+
+import io
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+
+import website
+from website import models as m
+from website.commands import registercommands
+from website.importer import importinspections
+from website.views import views
+
+HEADER = ('equip_no,condition_code,chain_length,chain_pitch_length,measure_mean_pitch_length,pitches_measured,'
+          'insp_date\n')
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an in memory db holding one lifting chain and one hoist"""
+    app = Flask(__name__)
+    app.secret_key = 'secret'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        session = website.db.session
+        session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                         m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                user_role='FIELD'),
+                         m.Site(site_no=123456, description='Calm Lands WPS'),
+                         m.Assetclass(class_id='C5', class_description='Lifting Chain'),
+                         m.Assetclass(class_id='H1', class_description='Hoist'),
+                         m.Assetstatus(status_id='AC', status_description='Active'),
+                         m.Asset(equip_no=100000000001, description='Chain', location_on_site='Wet well',
+                                 site_no=123456, equip_status='AC', equip_class='C5'),
+                         m.Asset(equip_no=100000000002, description='Hoist', location_on_site='Dry well',
+                                 site_no=123456, equip_status='AC', equip_class='H1')])
+        session.add_all([m.Condition(condition_code=str(c), condition_description=f'Grade {c}') for c in range(1, 6)])
+        session.commit()
+        yield app
+        session.rollback()
+        website.db.drop_all()
+
+
+def test_import_scores_valid_rows_and_reports_bad_ones(app):
+    csvfile = io.StringIO(HEADER +
+                          '100000000001,1,10,100,110,12,2025-08-01\n'
+                          '100000000001,2,10,100,130,12,\n'
+                          '100000000002,5,,,,,\n'
+                          '100000000002,9,,,,,\n'
+                          '100000000001,1,60,50,40,2,\n'
+                          '100000000003,1,,,,,\n'
+                          '100000000001,1,,,,,\n')
+    report = importinspections(csvfile, user_id=1, chunk_size=2, commit_rows=2)
+
+    assert report.inserted == 3
+    assert report.rejected == 4
+    assert report.error is None
+    assert [e['row'] for e in report.errors] == [5, 6, 7, 8]
+    assert any('chain_pitch_length must be between' in e for e in report.errors[1]['errors'])
+
+    rows = m.Inspection.query.order_by(m.Inspection.id).all()
+    assert [r.asset_passed for r in rows] == [True, False, False]
+    assert rows[0].lc_health_score == pytest.approx(100 / 110 * 100)
+    assert rows[2].lc_health_score is None
+    assert str(rows[0].insp_date).startswith('2025-08-01')
+
+
+def test_import_missing_columns(app):
+    report = importinspections(io.StringIO('equip_no,chain_length\n1,2\n'), user_id=1)
+    assert report.inserted == 0
+    assert 'condition_code' in report.error
+
+
+def test_import_endpoint(app):
+    lm = LoginManager()
+    lm.init_app(app)
+
+    class _User:
+        id = 1
+        is_authenticated = True
+        is_active = True
+
+        def get_id(self):
+            return '1'
+
+    lm.user_loader(lambda uid: _User())
+    app.register_blueprint(views)
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['_user_id'], s['_fresh'] = '1', True
+
+    data = {'file': (io.BytesIO((HEADER + '100000000002,1,,,,,\nabc,1,,,,,\n').encode()), 'insps.csv')}
+    resp = client.post('/inspection/import', data=data, content_type='multipart/form-data')
+    assert resp.status_code == 200
+    assert resp.get_json()['inserted'] == 1
+    assert resp.get_json()['errors'] == [{'row': 3, 'errors': ['equip_no must be a number']}]
+
+    assert client.post('/inspection/import', data={}).status_code == 400
+
+
+def test_import_command(app, tmp_path):
+    registercommands(app)
+    csvpath = tmp_path / 'insps.csv'
+    csvpath.write_text(HEADER + '100000000001,1,10,100,105,12,\n100000000002,1,,,,,\n100000000002,X,,,,,\n')
+
+    result = app.test_cli_runner().invoke(args=['import-inspections', str(csvpath), '--username', 'wardj'])
+    assert result.exit_code == 0
+    assert 'Imported 2 inspections, 1 rejected.' in result.output
+    assert m.Inspection.query.count() == 2
+
+    result = app.test_cli_runner().invoke(args=['import-inspections', str(csvpath), '--username', 'nobody'])
+    assert result.exit_code != 0
@@ -1,13 +1,15 @@
 # Name      : test_inspections
 # Author    : Patrick Cronin
 # Date      : 18/08/2025
-# Updated   : 18/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Test inspections.py using pytest
 
+import numpy as np
 import pytest
 from flask import Flask, get_flashed_messages
 
-from website.inspections import conditioncheck,lchealthscore, lcpass,PASS_SCORE_THRESHOLD, MIN_PITCH_LENGTH
+from website.inspections import conditioncheck,lchealthscore, lcpass,PASS_SCORE_THRESHOLD, MIN_PITCH_LENGTH, \
+    batchscore, batchconditioncheck, batchlcpass
 
 
 @pytest.fixture
@@ -55,3 +57,31 @@ def test_lcpass_logic():
 
     assert lcpass(True, PASS_SCORE_THRESHOLD) is True
     assert lcpass(True, PASS_SCORE_THRESHOLD + 1) is True
+
+
+def test_batchscore_matches_scalar_functions(app):
+    """batch scoring should agree with the scalar functions row for row"""
+    measured = [100, 110, 150, 125, 200]
+    nominal = [100, 100, 100, 100, 180]
+    conditions = ['1', '4', '2', '5', '3']
+
+    health_scores, passed = batchscore(measured, nominal, conditions)
+
+    with app.test_request_context("/"):
+        for i in range(len(measured)):
+            score = lchealthscore(measured[i], nominal[i])
+            assert health_scores[i] == pytest.approx(score)
+            assert passed[i] == lcpass(conditioncheck(conditions[i]), score)
+
+
+def test_batchscore_other_assets_and_thresholds():
+    """rows without pitch lengths are judged on condition only, bad condition codes fail"""
+    health_scores, passed = batchscore([None, None, 100, 120], [None, None, 100, 100], ['1', 'XX', '2', '2'])
+
+    assert np.isnan(health_scores[0]) and np.isnan(health_scores[1])
+    assert list(passed) == [True, False, True, True]
+
+    _, passed = batchscore([120], [100], ['2'], pass_threshold=90)
+    assert list(passed) == [False]
+    assert list(batchconditioncheck(['1', '3'], condition_threshold=3)) == [True, False]
+    assert list(batchlcpass([True, True], [PASS_SCORE_THRESHOLD, PASS_SCORE_THRESHOLD - 1])) == [True, False]
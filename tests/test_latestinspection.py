@@ -0,0 +1,112 @@
+# Name      : test_latestinspection
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test latestinspection.py using pytest
+
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+import website
+from website import models as m
+from website.importer import insertrecords
+from website.latestinspection import rebuildlatest
+
+CHAIN = 100000000001
+HOIST = 100000000002
+
+
+@pytest.fixture
+def session():
+    """lite flask app with an in memory db holding two assets"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([
+            m.Role(role_name='FIELD', role_description='Field'),
+            m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed', user_role='FIELD'),
+            m.Asset(equip_no=CHAIN, description='Chain', location_on_site='Bay 1', site_no=1, equip_status='AC',
+                    equip_class='C5'),
+            m.Asset(equip_no=HOIST, description='Hoist', location_on_site='Bay 2', site_no=1, equip_status='AC',
+                    equip_class='H1')])
+        website.db.session.commit()
+        yield website.db.session
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def _inspect(session, equip_no, day, score=None, passed=True):
+    inspection = m.Inspection(equip_no=equip_no, condition_code='1', user_id=1, lc_health_score=score,
+                              asset_passed=passed, insp_date=datetime(2025, 8, day))
+    session.add(inspection)
+    session.commit()
+    return inspection
+
+
+def _latest(session):
+    return {row.equip_no: (row.inspection_id, row.lc_health_score, row.asset_passed)
+            for row in session.query(m.AssetLatestInspection)}
+
+
+def test_new_inspection_becomes_latest_unless_older(session):
+    first = _inspect(session, CHAIN, 10, 95)
+    assert _latest(session) == {CHAIN: (first.id, 95, True)}
+
+    newer = _inspect(session, CHAIN, 12, 88, passed=False)
+    _inspect(session, CHAIN, 1, 99)
+    hoist = _inspect(session, HOIST, 5)
+    assert _latest(session) == {CHAIN: (newer.id, 88, False), HOIST: (hoist.id, None, True)}
+
+
+def test_delete_falls_back_to_previous_inspection(session):
+    first = _inspect(session, CHAIN, 10, 95)
+    newer = _inspect(session, CHAIN, 12, 88, passed=False)
+    hoist = _inspect(session, HOIST, 5)
+
+    session.delete(newer)
+    session.commit()
+    assert _latest(session)[CHAIN] == (first.id, 95, True)
+
+    session.delete(hoist)
+    session.commit()
+    assert HOIST not in _latest(session)
+
+
+def test_bulk_import_and_rebuild_agree(session):
+    _inspect(session, CHAIN, 10, 95)
+    insertrecords([{'equip_no': CHAIN, 'condition_code': '1', 'user_id': 1, 'lc_health_score': 70,
+                    'asset_passed': False, 'insp_date': datetime(2025, 8, 20)},
+                   {'equip_no': HOIST, 'condition_code': '1', 'user_id': 1, 'lc_health_score': None,
+                    'asset_passed': True, 'insp_date': datetime(2025, 8, 3)}])
+    session.commit()
+    maintained = _latest(session)
+    assert maintained[CHAIN][1:] == (70, False)
+
+    assert rebuildlatest() == 2
+    assert _latest(session) == maintained
+
+
+def test_moving_an_inspection_refreshes_both_assets(session):
+    _inspect(session, CHAIN, 10, 95)
+    moved = _inspect(session, CHAIN, 12, 88)
+    moved.equip_no = HOIST
+    session.commit()
+    assert _latest(session) == {CHAIN: (1, 95, True), HOIST: (moved.id, 88, True)}
+
+    only = session.get(m.Inspection, 1)
+    only.equip_no = HOIST
+    session.commit()
+    assert set(_latest(session)) == {HOIST}
+
+
+def test_rebuild_moves_the_inspections_version_on(session):
+    _inspect(session, CHAIN, 10, 95)
+    before = session.get(m.DataVersion, 'inspections').version
+    rebuildlatest()
+    session.expire_all()
+    assert session.get(m.DataVersion, 'inspections').version == before + 1
@@ -0,0 +1,64 @@
+# Name      : test_memorybudget
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test the peak memory each list view allocates against seeded datasets using pytest
+
+import shutil
+
+import pytest
+
+import benchmark
+
+ADMIN, CONTENG, FIELD = 1, 2, 3
+SMALL, LARGE = (10000, 200, 10, 2), (40000, 200, 10, 2)
+
+# (user, url): most KiB one warm request may allocate at its peak on the large dataset. a page that renders every row
+# of a growing table blows through these, the unpaged field home page peaked at 39MB with 20k of its own inspections
+MEMORY_CEILINGS_KIB = {
+    (ADMIN, '/inspadmin'): 384,
+    (CONTENG, '/'): 384,
+    (FIELD, '/'): 256,
+    (FIELD, '/assets'): 320,
+    (FIELD, '/sites'): 128,
+    (FIELD, '/forecast'): 128,
+    (FIELD, '/inspection'): 128,
+    (FIELD, '/assets/lookup?class=C5&q=1'): 128,
+    (ADMIN, '/useradmin'): 128,
+}
+
+
+@pytest.fixture(scope='module')
+def datasets(tmp_path_factory):
+    """seeded database files shared by every test in the module, each test works on its own copy"""
+    import config
+    directory = tmp_path_factory.mktemp('memorybudget')
+    method = config.Config.PASSWORD_HASH_METHOD
+    config.Config.PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    try:
+        return {spec: benchmark.preparedataset(f'mem{spec[0]}', spec, str(directory)) for spec in (SMALL, LARGE)}
+    finally:
+        config.Config.PASSWORD_HASH_METHOD = method
+
+
+def _peak(datasets, spec, tmp_path, user_id, url):
+    working = tmp_path / f'{spec[0]}.db'
+    shutil.copyfile(datasets[spec], working)
+    app = benchmark.benchmarkapp(str(working))
+    call = benchmark.pagecall(benchmark.loggedin(app, user_id), 'GET', url, 200)
+    # the first request fills the user and reference caches, the second shows the steady state
+    call()
+    return benchmark.peakallocation(call)
+
+
+@pytest.mark.parametrize('user_id, url', list(MEMORY_CEILINGS_KIB))
+def test_view_stays_within_memory_ceiling(datasets, tmp_path, user_id, url):
+    peak = _peak(datasets, LARGE, tmp_path, user_id, url)
+    assert peak <= MEMORY_CEILINGS_KIB[(user_id, url)], f'{url} peaked at {peak} KiB'
+
+
+@pytest.mark.parametrize('user_id, url', list(MEMORY_CEILINGS_KIB))
+def test_view_memory_does_not_grow_with_rows(datasets, tmp_path, user_id, url):
+    small = _peak(datasets, SMALL, tmp_path, user_id, url)
+    large = _peak(datasets, LARGE, tmp_path, user_id, url)
+    assert large <= small * 1.25 + 32, f'{url} grew from {small} KiB to {large} KiB with four times the rows'
@@ -0,0 +1,128 @@
+# Name      : test_metrics
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test metrics.py using pytest
+
+import glob
+import json
+import os
+
+import pytest
+from flask import Flask
+
+import website
+from website import models as m
+from website.metrics import RequestMetrics, instrumentapp, mergesnapshots, rendermetrics
+
+DEAD_PID = 2 ** 22 + 1
+
+
+@pytest.fixture
+def app():
+    """lite flask app with the metrics hooks and a view that runs two queries"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+    instrumentapp(app)
+
+    @app.route('/sites')
+    def sites():
+        website.db.session.query(m.Site).all()
+        website.db.session.query(m.Asset).count()
+        return 'OK'
+
+    with app.app_context():
+        website.db.create_all()
+        yield app
+        website.db.drop_all()
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = RequestMetrics(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 3.0):
+        metrics.observe('views.home', 'GET', 200, seconds)
+    text = rendermetrics(mergesnapshots([metrics.snapshot()]))
+    assert 'http_request_duration_seconds_bucket{endpoint="views.home",le="0.1"} 1' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="views.home",le="1.0"} 3' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="views.home",le="+Inf"} 4' in text
+    assert 'http_request_duration_seconds_count{endpoint="views.home"} 4' in text
+
+
+def test_requests_statuses_and_sql_are_recorded(app):
+    client = app.test_client()
+    client.get('/sites')
+    client.get('/sites')
+    client.get('/missing')
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_requests_total{endpoint="sites",method="GET",status="200"} 2' in text
+    assert 'http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in text
+    assert 'db_statements_total{endpoint="sites"} 4' in text
+    assert 'http_request_duration_seconds_count{endpoint="sites"} 2' in text
+    assert 'user_cache_size 0' in text
+    assert 'fragment_cache_size 0' in text and 'fragment_cache_hits_total 0' in text
+    assert '# TYPE user_cache_hits_total counter' in text and '# TYPE user_cache_size gauge' in text
+
+
+def test_workers_are_merged_through_the_metrics_dir(app, tmp_path):
+    app.config.update(METRICS_DIR=str(tmp_path), METRICS_FLUSH_SECONDS=0)
+    other = RequestMetrics()
+    other.observe('sites', 'GET', 200, 0.01, statements=3, statement_seconds=0.002)
+    (tmp_path / f'metrics-{DEAD_PID}-1.json').write_text(
+        json.dumps(other.snapshot() | {'pid': DEAD_PID, 'started': 1, 'gauges': {'user_cache_size': 7}}))
+
+    client = app.test_client()
+    client.get('/sites')
+    text = client.get('/metrics').get_data(as_text=True)
+
+    assert len(glob.glob(str(tmp_path / f'metrics-{os.getpid()}-*.json'))) == 1
+    # an exited worker's counters are kept but its gauges are not
+    assert 'http_requests_total{endpoint="sites",method="GET",status="200"} 2' in text
+    assert 'db_statements_total{endpoint="sites"} 5' in text
+    assert 'user_cache_size 0' in text
+    # and its snapshot is folded in to the exited totals, which a later scrape reads instead
+    assert not (tmp_path / f'metrics-{DEAD_PID}-1.json').exists() and (tmp_path / 'metrics-exited.json').exists()
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'db_statements_total{endpoint="sites"} 5' in text
+
+
+def test_exited_totals_keep_the_directory_bounded(app, tmp_path):
+    app.config.update(METRICS_DIR=str(tmp_path), METRICS_FLUSH_SECONDS=0)
+    client = app.test_client()
+    for started in range(1, 6):
+        exited = RequestMetrics()
+        exited.observe('sites', 'GET', 200, 0.01, statements=1)
+        (tmp_path / f'metrics-{DEAD_PID}-{started}.json').write_text(json.dumps(
+            exited.snapshot() | {'pid': DEAD_PID, 'started': started, 'counters': {'user_cache_hits_total': 1}}))
+        text = client.get('/metrics').get_data(as_text=True)
+        assert len(os.listdir(tmp_path)) == 2
+        assert f'http_requests_total{{endpoint="sites",method="GET",status="200"}} {started}' in text
+        assert f'user_cache_hits_total {started}' in text
+
+    # a snapshot a fold listed but could not delete is not counted again
+    stale = RequestMetrics()
+    stale.observe('sites', 'GET', 200, 0.01)
+    folded = json.loads((tmp_path / 'metrics-exited.json').read_text())['folded'][0]
+    (tmp_path / folded).write_text(json.dumps(stale.snapshot() | {'pid': DEAD_PID, 'started': 5}))
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_requests_total{endpoint="sites",method="GET",status="200"} 5' in text
+
+
+def test_new_worker_with_a_reused_pid_keeps_the_old_totals(app, tmp_path):
+    app.config.update(METRICS_DIR=str(tmp_path), METRICS_FLUSH_SECONDS=0)
+    exited = RequestMetrics()
+    for _ in range(3):
+        exited.observe('sites', 'GET', 200, 0.01)
+    # an exited worker that had this worker's pid, started before it
+    (tmp_path / f'metrics-{os.getpid()}-1.json').write_text(json.dumps(
+        exited.snapshot() | {'pid': os.getpid(), 'started': 1, 'counters': {'user_cache_hits_total': 4},
+                             'gauges': {'user_cache_size': 7}}))
+
+    client = app.test_client()
+    client.get('/sites')
+    text = client.get('/metrics').get_data(as_text=True)
+
+    assert len(glob.glob(str(tmp_path / f'metrics-{os.getpid()}-*.json'))) == 1
+    assert 'http_requests_total{endpoint="sites",method="GET",status="200"} 4' in text
+    assert 'user_cache_hits_total 4' in text and 'user_cache_size 0' in text
@@ -0,0 +1,72 @@
+# Name      : test_migrations
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test migrations.py using pytest
+
+import pytest
+from flask import Flask
+from sqlalchemy import inspect, text
+
+import website
+from website.commands import registercommands
+from website.migrations import MIGRATIONS, schemaversion, upgrade
+
+# schema of the inspection table before any indexes were added
+LEGACY_INSPECTION = ('CREATE TABLE inspection (id INTEGER PRIMARY KEY, equip_no INTEGER NOT NULL, '
+                     'condition_code VARCHAR(2) NOT NULL, chain_length FLOAT, chain_pitch_length INTEGER, '
+                     'measure_mean_pitch_length INTEGER, pitches_measured INTEGER, lc_health_score INTEGER, '
+                     'asset_passed BOOLEAN, insp_date DATETIME, user_id INTEGER NOT NULL)')
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an empty in memory db"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+    registercommands(app)
+    with app.app_context():
+        yield app
+        website.db.drop_all()
+
+
+def _indexes(table):
+    return {index['name'] for index in inspect(website.db.engine).get_indexes(table)}
+
+
+def test_upgrade_existing_database_in_place(app):
+    with website.db.engine.begin() as connection:
+        connection.execute(text(LEGACY_INSPECTION))
+        connection.execute(text("INSERT INTO inspection (equip_no, condition_code, user_id, asset_passed) "
+                                "VALUES (100000000001, '1', 1, 0)"))
+
+    applied = upgrade()
+
+    assert [version for version, _ in applied] == [version for version, _, _ in MIGRATIONS]
+    assert {'ix_inspection_asset_passed_insp_date', 'ix_inspection_user_id_insp_date',
+            'ix_inspection_equip_no_insp_date', 'ux_inspection_user_id_client_key'} <= _indexes('inspection')
+    assert 'ix_asset_equip_class' in _indexes('asset')
+    with website.db.engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM inspection')).scalar() == 1
+        assert schemaversion(connection) == MIGRATIONS[-1][0]
+    assert upgrade() == []
+
+
+def test_dashboard_queries_use_indexes(app):
+    upgrade()
+    with website.db.engine.connect() as connection:
+        failed = connection.execute(text('EXPLAIN QUERY PLAN SELECT id FROM inspection '
+                                         'WHERE asset_passed IS 0 ORDER BY insp_date')).all()
+        field = connection.execute(text('EXPLAIN QUERY PLAN SELECT id FROM inspection '
+                                        'WHERE user_id = 1 ORDER BY insp_date')).all()
+    assert 'ix_inspection_asset_passed_insp_date' in str(failed)
+    assert 'ix_inspection_user_id_insp_date' in str(field)
+
+
+def test_upgrade_command(app):
+    result = app.test_cli_runner().invoke(args=['upgrade-db'])
+    assert result.exit_code == 0
+    assert 'Applied migration 1' in result.output
+    result = app.test_cli_runner().invoke(args=['upgrade-db'])
+    assert 'No migrations to apply.' in result.output
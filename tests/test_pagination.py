@@ -0,0 +1,147 @@
+# Name      : test_pagination
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test pagination.py using pytest
+
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+import website
+from website import models as m
+from website.pagination import Listing, Sort, Filter, paginate, parsebool, datefrom, dateto, decodecursor, \
+    encodecursor, MAX_PAGE_SIZE
+
+
+@pytest.fixture
+def session():
+    """lite flask app with an in memory db"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        yield website.db.session
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def _inspections(session, count):
+    """dummy inspections with one day between each, every third one failed with no health score"""
+    session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                     m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed', user_role='FIELD')])
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        session.add(m.Inspection(equip_no=100000000000 + (i % 4), condition_code='1', user_id=1,
+                                 lc_health_score=None if i % 3 == 0 else 90 - i, asset_passed=i % 3 != 0,
+                                 insp_date=start + timedelta(days=i)))
+    session.commit()
+
+
+def _listing():
+    return Listing(m.Inspection.id,
+                   sorts={'insp_date': Sort(m.Inspection.insp_date),
+                          'lc_health_score': Sort(m.Inspection.lc_health_score, nullable=True)},
+                   default_sort='insp_date', default_order='desc',
+                   filters={'equip_no': Filter(m.Inspection.equip_no),
+                            'passed': Filter(m.Inspection.asset_passed, parse=parsebool),
+                            'date_from': datefrom(m.Inspection.insp_date),
+                            'date_to': dateto(m.Inspection.insp_date)})
+
+
+def _query(session):
+    return session.query(m.Inspection.id, m.Inspection.insp_date)
+
+
+def test_pages_forwards_and_backwards(session):
+    """walking next then prev should visit every row once and come back to the same pages"""
+    _inspections(session, 25)
+    listing = _listing()
+
+    first = paginate(_query(session), listing, {'per_page': '10'})
+    assert [r.id for r in first] == list(range(25, 15, -1))
+    assert first.has_next and not first.has_prev
+
+    second = paginate(_query(session), listing, {'per_page': '10', 'cursor': first.next_cursor})
+    third = paginate(_query(session), listing, {'per_page': '10', 'cursor': second.next_cursor})
+    assert [r.id for r in second] == list(range(15, 5, -1))
+    assert [r.id for r in third] == list(range(5, 0, -1))
+    assert not third.has_next and third.has_prev
+
+    back = paginate(_query(session), listing, {'per_page': '10', 'cursor': third.prev_cursor})
+    assert [r.id for r in back] == [r.id for r in second]
+    back = paginate(_query(session), listing, {'per_page': '10', 'cursor': back.prev_cursor})
+    assert [r.id for r in back] == [r.id for r in first]
+    assert not back.has_prev
+
+
+def test_nullable_sort_keeps_ties_and_nulls(session):
+    """rows with no health score should still be paged through exactly once"""
+    _inspections(session, 12)
+    listing = _listing()
+    seen, cursor = [], None
+    while True:
+        args = {'sort': 'lc_health_score', 'order': 'asc', 'per_page': '5'}
+        if cursor:
+            args['cursor'] = cursor
+        page = paginate(_query(session), listing, args)
+        seen.extend(r.id for r in page)
+        cursor = page.next_cursor
+        if not page.has_next:
+            break
+    assert sorted(seen) == list(range(1, 13))
+    assert len(seen) == 12
+
+
+def test_filters_are_applied_and_kept_in_links(session):
+    _inspections(session, 20)
+    args = {'passed': 'fail', 'date_from': '2025-01-04', 'date_to': '2025-01-10'}
+    page = paginate(_query(session), _listing(), args)
+    assert [r.id for r in page] == [10, 7, 4]
+    assert page.args['passed'] == 'fail'
+    assert page.linkargs(cursor='x')['date_to'] == '2025-01-10'
+
+
+def test_invalid_inputs_fall_back_to_defaults(session):
+    """bad sorts, filters, cursors and page sizes are ignored rather than erroring"""
+    _inspections(session, 5)
+    args = {'sort': 'password', 'order': 'sideways', 'equip_no': 'abc', 'cursor': 'not-a-cursor', 'per_page': '100000'}
+    page = paginate(_query(session), _listing(), args)
+    assert page.sort == 'insp_date' and page.order == 'desc'
+    assert 'equip_no' not in page.args
+    assert page.args.get('per_page') == MAX_PAGE_SIZE
+    assert len(page) == 5
+
+
+def test_cursor_round_trip():
+    token = encodecursor('next', 'insp_date', 'desc', datetime(2025, 8, 1, 12, 30), 42)
+    assert decodecursor(token) == ('next', 'insp_date', 'desc', datetime(2025, 8, 1, 12, 30), 42)
+    assert decodecursor('bogus') is None
+
+
+def test_rows_dated_by_the_column_default_page_through_once(session):
+    """inspections saved in the same second take their date from func.now(), stored without microseconds"""
+    session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                     m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed', user_role='FIELD')])
+    session.add_all([m.Inspection(equip_no=100000000000, condition_code='1', user_id=1) for _ in range(5)])
+    session.commit()
+    listing = _listing()
+    for order, expected in (('desc', [5, 4, 3, 2, 1]), ('asc', [1, 2, 3, 4, 5])):
+        seen, cursor, pages = [], None, 0
+        while True:
+            args = {'order': order, 'per_page': '2'}
+            if cursor:
+                args['cursor'] = cursor
+            page = paginate(_query(session), listing, args)
+            seen.extend(r.id for r in page)
+            pages += 1
+            cursor = page.next_cursor
+            if not page.has_next or pages > 5:
+                break
+        assert seen == expected
+
+    back = paginate(_query(session), listing, {'order': 'asc', 'per_page': '2', 'cursor': page.prev_cursor})
+    assert [r.id for r in back] == [3, 4]
@@ -0,0 +1,111 @@
+# Name      : test_passwords
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test passwords.py and the login rehash using pytest
+
+import threading
+
+import pytest
+from flask import Flask, Blueprint
+from flask_login import LoginManager
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import website
+from website import models as m
+from website.auth import auth
+from website.passwords import PasswordPool, PasswordPoolBusy, hashmethod, needsrehash, hashpassword
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """lite flask app with the auth blueprint, a cheap hash method and an in memory db"""
+    app = Flask(__name__)
+    app.secret_key = 'testing'
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///:memory:', PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+                      PASSWORD_HASH_WORKERS=2, PASSWORD_QUEUE_TIMEOUT=0.5)
+    website.db.init_app(app)
+    monkeypatch.setattr(website.auth, 'render_template', lambda template_name, **ctx: f'OK: {template_name}')
+
+    lm = LoginManager()
+    lm.init_app(app)
+    lm.user_loader(lambda uid: website.db.session.get(m.User, int(uid)))
+
+    views_bp = Blueprint('views', __name__)
+    views_bp.add_url_rule('/', 'home', lambda: 'HOME')
+    app.register_blueprint(views_bp)
+    app.register_blueprint(auth)
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([
+            m.Role(role_name='FIELD', role_description='Field'),
+            m.User(username='wardj', first_name='Jo', surname='Ward', user_role='FIELD',
+                   password=generate_password_hash('Pa55word!', 'pbkdf2:sha256:500'))])
+        website.db.session.commit()
+        yield app
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def test_hash_method_gets_its_default_cost(app):
+    assert hashmethod() == 'pbkdf2:sha256:1000'
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256'
+    assert hashmethod().startswith('pbkdf2:sha256:')
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    assert hashmethod() == 'scrypt:32768:8:1'
+
+
+def test_needsrehash_compares_method_and_cost(app):
+    assert needsrehash(generate_password_hash('x', 'pbkdf2:sha256:500'))
+    assert needsrehash(generate_password_hash('x', 'scrypt'))
+    assert not needsrehash(hashpassword('x'))
+
+
+def test_login_rehashes_to_configured_cost(app):
+    client = app.test_client()
+    resp = client.post('/login', data={'username': 'wardj', 'password': 'Pa55word!'})
+    assert resp.status_code == 302 and resp.headers['Location'].endswith('/')
+
+    stored = website.db.session.get(m.User, 1).password
+    assert stored.startswith('pbkdf2:sha256:1000$')
+    assert check_password_hash(stored, 'Pa55word!')
+
+
+def test_wrong_password_does_not_rehash(app):
+    client = app.test_client()
+    resp = client.post('/login', data={'username': 'wardj', 'password': 'wrong'})
+    assert resp.headers['Location'].endswith('/login')
+    assert website.db.session.get(m.User, 1).password.startswith('pbkdf2:sha256:500$')
+
+
+def test_pool_caps_work_in_flight_and_times_out():
+    pool = PasswordPool(workers=1, queue_timeout=0.1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'done'
+
+    results = []
+    worker = threading.Thread(target=lambda: results.append(pool.run(slow)))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(PasswordPoolBusy):
+        pool.run(lambda: 'queued')
+    release.set()
+    worker.join()
+    assert results == ['done']
+    assert pool.run(lambda: 'next') == 'next'
+    pool.shutdown()
+
+
+def test_busy_pool_returns_503_with_retry_after(app, monkeypatch):
+    def busy(*args):
+        raise PasswordPoolBusy('busy')
+
+    monkeypatch.setattr(website.auth, 'verifypassword', busy)
+    resp = app.test_client().post('/login', data={'username': 'wardj', 'password': 'Pa55word!'})
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '1'
@@ -0,0 +1,123 @@
+# Name      : test_querybudget
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test the number of SQL statements each view runs against a real in memory db using pytest
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+ADMIN, CONTENG, FIELD = 1, 2, 3
+
+# (user, url): most statements one request may run once the per worker caches are warm, counting the BEGIN of its
+# transaction and the user loader's read of the users version stamp, with the stamps reread on every request. every
+# page runs the same number of statements whatever the number of rows, an N+1 shows up as a count that grows with
+# the data.
+QUERY_BUDGETS = {
+    (ADMIN, '/'): 3,
+    (CONTENG, '/'): 3,
+    (FIELD, '/'): 3,
+    (FIELD, '/assets'): 3,
+    (FIELD, '/sites'): 3,
+    (ADMIN, '/inspadmin'): 3,
+    (ADMIN, '/useradmin'): 4,
+    (ADMIN, '/cspadmin'): 3,
+    (FIELD, '/inspection'): 3,
+    (FIELD, '/assets/lookup?class=C5&q=asset'): 3,
+    (FIELD, '/assets/lookup?not_class=C5&q=bay'): 3,
+}
+
+
+@contextmanager
+def countqueries(engine):
+    '''context manager collecting every statement sent to the driver while it is open'''
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+
+
+def _seed(db, m, insertrecords, assets):
+    db.session.add_all([m.Role(role_name=role, role_description=role.title())
+                        for role in ('ADMIN', 'CONTENG', 'FIELD')])
+    db.session.add_all([m.Condition(condition_code=str(c), condition_description=f'Grade {c}') for c in range(1, 6)])
+    db.session.add_all([m.Assetclass(class_id='C5', class_description='Lifting Chain'),
+                        m.Assetclass(class_id='H1', class_description='Hoist'),
+                        m.Assetstatus(status_id='AC', status_description='Active')])
+    db.session.add_all([m.Site(id=100000 + s, site_no=100000 + s, description=f'Site {s}') for s in range(assets // 4)])
+    db.session.add_all([m.User(username=role.lower(), first_name='Jo', surname='Ward', user_role=role,
+                               password=generate_password_hash('Pa55word!', 'pbkdf2:sha256:1'))
+                        for role in ('ADMIN', 'CONTENG', 'FIELD')])
+    db.session.add_all([m.Asset(equip_no=100000000000 + i, description=f'Asset {i}', location_on_site='Bay',
+                                site_no=100000 + i % (assets // 4), equip_status='AC',
+                                equip_class='C5' if i % 2 else 'H1') for i in range(assets)])
+    db.session.flush()
+    insertrecords([{'equip_no': 100000000000 + i % assets, 'condition_code': str(i % 5 + 1),
+                    'lc_health_score': 60 + i % 40, 'asset_passed': bool(i % 3), 'user_id': i % 3 + 1,
+                    'insp_date': datetime(2025, 1, 1) + timedelta(hours=i)} for i in range(assets * 3)])
+    db.session.commit()
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """factory for the full app from create_app on a fresh in memory db holding a given number of assets"""
+    # imported here as test_config re-imports the module, create_app reads whichever one is current
+    import config
+    monkeypatch.setattr(config.Config, 'SECRET_KEY', 'secret')
+    monkeypatch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+    monkeypatch.setattr(config.Config, 'METRICS_ENABLED', False, raising=False)
+    # every request rereads the version stamps, the worst case rather than whatever the last few seconds read
+    monkeypatch.setattr(config.Config, 'VERSION_CHECK_SECONDS', 0, raising=False)
+
+    def build(assets):
+        from website import create_app, db
+        from website import models as m
+        from website.importer import insertrecords
+        app = create_app()
+        # the context is only held while seeding. requests then push their own as they do in production, so the
+        # user loader and the transaction each request opens are counted
+        with app.app_context():
+            db.create_all()
+            _seed(db, m, insertrecords, assets)
+        return app, db
+
+    yield build
+
+
+def _count(app, db, user_id, url):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'], session['_fresh'] = str(user_id), True
+    # the first request fills the user and reference caches, the second shows the steady state
+    assert client.get(url).status_code == 200
+    with app.app_context():
+        engine = db.engine
+    with countqueries(engine) as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return statements
+
+
+@pytest.mark.parametrize('user_id, url', list(QUERY_BUDGETS))
+def test_view_stays_within_query_budget(site, user_id, url):
+    app, db = site(40)
+    statements = _count(app, db, user_id, url)
+    assert len(statements) <= QUERY_BUDGETS[(user_id, url)], '\n'.join(statements)
+
+
+@pytest.mark.parametrize('user_id, url', list(QUERY_BUDGETS))
+def test_view_queries_do_not_grow_with_rows(site, user_id, url):
+    small_app, small_db = site(8)
+    small = len(_count(small_app, small_db, user_id, url))
+    large_app, large_db = site(80)
+    assert len(_count(large_app, large_db, user_id, url)) == small
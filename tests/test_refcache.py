@@ -0,0 +1,117 @@
+# Name      : test_refcache
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test refcache.py and dataversion.py using pytest
+
+import pytest
+from flask import Flask
+from sqlalchemy import event, text
+
+import website
+from website import models as m
+from website.dataversion import bumpversion, getversion, REFERENCE_SCOPE
+from website.refcache import ReferenceCache, conditions, roles, invalidatereference
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an in memory db holding the reference tables"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([m.Role(role_name='ADMIN', role_description='Administrator'),
+                                    m.Condition(condition_code='1', condition_description='Good')])
+        website.db.session.commit()
+        yield app
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def test_reference_rows_cached_until_version_moves(app):
+    calls = []
+    # rereads the stamp on every get
+    cache = ReferenceCache(interval=0)
+
+    def loader():
+        calls.append(1)
+        return [('1', 'Good')]
+
+    with app.test_request_context('/'):
+        assert cache.get('conditions', loader) == (('1', 'Good'),)
+        assert cache.get('conditions', loader) == (('1', 'Good'),)
+    assert len(calls) == 1
+
+    with app.test_request_context('/'):
+        invalidatereference()
+        website.db.session.commit()
+    with app.test_request_context('/'):
+        cache.get('conditions', loader)
+    assert len(calls) == 2
+
+
+def test_other_worker_sees_changes_without_restart(app):
+    """a raw SQL change made by another worker shows up once that worker bumps the version stamp"""
+    with app.test_request_context('/'):
+        assert [c.condition_code for c in conditions()] == ['1']
+
+    website.db.session.execute(text("INSERT INTO condition VALUES ('2', 'Fair')"))
+    website.db.session.commit()
+    with app.test_request_context('/'):
+        assert [c.condition_code for c in conditions()] == ['1']
+
+    # the other worker's cache object is a separate instance, only the shared version row links them
+    other_worker = ReferenceCache()
+    with app.test_request_context('/'):
+        invalidatereference()
+        website.db.session.commit()
+        assert other_worker.get('conditions', lambda: [('x', 'y')]) == (('x', 'y'),)
+    with app.test_request_context('/'):
+        assert [c.condition_code for c in conditions()] == ['1', '2']
+
+
+def test_orm_writes_bump_the_version(app):
+    with app.test_request_context('/'):
+        assert [r.role_name for r in roles()] == ['ADMIN']
+        before = getversion(REFERENCE_SCOPE)
+
+    website.db.session.add(m.Role(role_name='FIELD', role_description='Field'))
+    website.db.session.commit()
+
+    with app.test_request_context('/'):
+        assert getversion(REFERENCE_SCOPE) == before + 1
+        assert [r.role_name for r in roles()] == ['ADMIN', 'FIELD']
+
+
+def test_version_is_reread_every_few_seconds(app):
+    """a hit sends no query, another worker's change is picked up once the interval has passed"""
+    now, calls, statements = [0.0], [], []
+    cache = ReferenceCache(interval=5, clock=lambda: now[0])
+
+    def loader():
+        calls.append(1)
+        return [('1', 'Good')]
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    cache.get('conditions', loader)
+    event.listen(website.db.engine, 'before_cursor_execute', _record)
+    try:
+        cache.get('conditions', loader)
+    finally:
+        event.remove(website.db.engine, 'before_cursor_execute', _record)
+    assert statements == [] and len(calls) == 1
+
+    # another worker's change, made without this cache knowing
+    bumpversion(REFERENCE_SCOPE)
+    website.db.session.commit()
+    now[0] = 4
+    cache.get('conditions', loader)
+    assert len(calls) == 1
+    now[0] = 5
+    cache.get('conditions', loader)
+    assert len(calls) == 2
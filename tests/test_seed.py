@@ -0,0 +1,109 @@
+# Name      : test_seed
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test seed.py and the seed command using pytest
+
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import func, inspect, select
+
+import website
+from website import models as m
+from website.commands import registercommands
+from website.counters import readcounters, INSPECTION_COUNTER
+from website.forecast import rebuildtrends
+from website.latestinspection import rebuildlatest
+from website.seed import seeddatabase
+
+END = datetime(2026, 10, 1)
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an empty in memory db, a cheap hash method and the CLI commands registered"""
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///:memory:', PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    website.db.init_app(app)
+    registercommands(app)
+    with app.app_context():
+        yield app
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def _inspections():
+    return website.db.session.execute(select(m.Inspection.equip_no, m.Inspection.condition_code,
+                                             m.Inspection.measure_mean_pitch_length, m.Inspection.insp_date,
+                                             m.Inspection.user_id).order_by(m.Inspection.id)).all()
+
+
+def test_seed_loads_a_consistent_dataset(app):
+    report = seeddatabase(inspections=3000, assets=200, sites=10, users=5, seed=7, end=END)
+    assert report.todict() == {'sites': 10, 'assets': 200, 'users': 7, 'inspections': 3000}
+
+    equip_nos = website.db.session.execute(select(func.min(m.Asset.equip_no), func.max(m.Asset.equip_no))).one()
+    assert all(len(str(equip_no)) == 12 for equip_no in equip_nos)
+    chains = m.Inspection.query.filter(m.Inspection.chain_pitch_length.is_not(None)).all()
+    assert chains and all(c.measure_mean_pitch_length >= c.chain_pitch_length for c in chains)
+    assert all(c.lc_health_score == pytest.approx(c.chain_pitch_length / c.measure_mean_pitch_length * 100)
+               for c in chains)
+    assert max(row.insp_date for row in _inspections()) < END
+
+    # the upkeep tables match what a rebuild from the history gives
+    assert readcounters()[INSPECTION_COUNTER] == 3000
+    latest = m.AssetLatestInspection.query.count()
+    trends = {t.equip_no: t.predicted_fail_date for t in m.AssetWearTrend.query}
+    assert rebuildlatest() == latest
+    assert rebuildtrends() == len(trends)
+    assert {t.equip_no: t.predicted_fail_date for t in m.AssetWearTrend.query} == trends
+
+
+def test_same_seed_gives_same_rows(app):
+    seeddatabase(inspections=500, assets=50, sites=5, users=3, seed=11, end=END)
+    first = _inspections()
+    website.db.drop_all()
+    seeddatabase(inspections=500, assets=50, sites=5, users=3, seed=11, end=END)
+    assert _inspections() == first
+
+
+def test_seed_command_refuses_a_database_with_assets(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['seed', '--inspections', '100', '--assets', '20', '--sites', '2', '--users', '2',
+                                 '--end-date', '2026-10-01'])
+    assert result.exit_code == 0, result.output
+    assert 'Seeded 2 sites, 20 assets, 4 users and 100 inspections' in result.output
+
+    result = runner.invoke(args=['seed', '--inspections', '100'])
+    assert result.exit_code != 0
+    assert 'already has assets' in result.output
+    assert m.Inspection.query.count() == 100
+
+
+def test_failed_load_leaves_the_tables_empty_for_another_run(app, monkeypatch):
+    seedmodule = seeddatabase.__globals__
+    batch = seedmodule['inspectionbatch']
+    calls = []
+
+    def failingbatch(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError('disk full')
+        return batch(*args)
+
+    monkeypatch.setitem(seedmodule, 'SEED_BATCH_SIZE', 100)
+    monkeypatch.setitem(seedmodule, 'inspectionbatch', failingbatch)
+    with pytest.raises(RuntimeError):
+        seeddatabase(inspections=300, assets=20, sites=2, users=2, seed=3, end=END)
+    # what the seed command does with the error
+    website.db.session.rollback()
+    assert (m.Site.query.count(), m.Asset.query.count(), m.User.query.count(), m.Inspection.query.count()) == \
+           (0, 0, 0, 0)
+    # the indexes dropped for the load come back with the rollback
+    indexes = {index['name'] for index in inspect(website.db.engine).get_indexes('inspection')}
+    assert {index.name for index in m.Inspection.__table__.indexes} <= indexes
+
+    monkeypatch.setitem(seedmodule, 'inspectionbatch', batch)
+    assert seeddatabase(inspections=300, assets=20, sites=2, users=2, seed=3, end=END).inspections == 300
@@ -0,0 +1,116 @@
+# Name      : test_sqlitetuning
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test sqlitetuning.py using pytest
+
+import threading
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+import website
+from website import models as m
+from website.sqlitetuning import tunesqlite
+
+WRITERS = 8
+READERS = 4
+INSERTS_PER_WRITER = 25
+
+
+@pytest.fixture
+def app(tmp_path):
+    """lite flask app on a database file so several connections share it like gunicorn workers would"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'tuning.db'}"
+    website.db.init_app(app)
+    tunesqlite(app)
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                                    m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                           user_role='FIELD')])
+        website.db.session.commit()
+    yield app
+    with app.app_context():
+        website.db.drop_all()
+        website.db.engine.dispose()
+
+
+def _inspection():
+    return m.Inspection(equip_no=100000000001, condition_code='1', user_id=1, asset_passed=True,
+                        insp_date=datetime(2025, 8, 1))
+
+
+def test_connect_pragmas_are_applied(app):
+    with app.app_context():
+        connection = website.db.session.connection()
+        assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+        assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+
+
+def test_get_requests_are_read_only(app):
+    with app.test_request_context('/', method='GET'):
+        assert website.db.session.execute(select(func.count(m.User.id))).scalar() == 1
+        website.db.session.add(_inspection())
+        with pytest.raises(OperationalError, match='readonly'):
+            website.db.session.commit()
+        website.db.session.rollback()
+        website.db.session.remove()
+
+    # the same pooled connection goes back to read write for a POST
+    with app.test_request_context('/', method='POST'):
+        website.db.session.add(_inspection())
+        website.db.session.commit()
+        website.db.session.remove()
+
+    with app.app_context():
+        assert website.db.session.execute(select(func.count(m.Inspection.id))).scalar() == 1
+
+
+def test_concurrent_writers_and_readers_do_not_lock(app):
+    """writers and readers on their own connections at once, like several workers, should never see
+    'database is locked'"""
+    errors = []
+    start = threading.Barrier(WRITERS + READERS)
+
+    def writer():
+        start.wait()
+        for _ in range(INSERTS_PER_WRITER):
+            with app.test_request_context('/inspection', method='POST'):
+                try:
+                    website.db.session.add(_inspection())
+                    website.db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                    website.db.session.rollback()
+                finally:
+                    website.db.session.remove()
+
+    def reader():
+        start.wait()
+        for _ in range(INSERTS_PER_WRITER):
+            with app.test_request_context('/', method='GET'):
+                try:
+                    website.db.session.execute(select(func.count(m.Inspection.id))).scalar()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    website.db.session.remove()
+
+    threads = [threading.Thread(target=writer) for _ in range(WRITERS)] + \
+              [threading.Thread(target=reader) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        assert website.db.session.execute(select(func.count(m.Inspection.id))).scalar() == \
+               WRITERS * INSERTS_PER_WRITER
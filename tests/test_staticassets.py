@@ -0,0 +1,87 @@
+# Name      : test_staticassets
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test staticassets.py using pytest
+
+import gzip
+import json
+
+import pytest
+from flask import Flask, render_template_string
+
+from website import staticassets
+from website.staticassets import buildassets, initassets, fingerprint
+
+
+@pytest.fixture
+def static(tmp_path):
+    """static folder holding a stylesheet that points at an image, a script and the image"""
+    folder = tmp_path / 'static'
+    (folder / 'img').mkdir(parents=True)
+    (folder / 'img' / 'bg.jpg').write_bytes(b'\xff\xd8 not really a jpeg')
+    (folder / 'style.css').write_text('body { background: url("img/bg.jpg"); }\n' + 'td { color: white; }\n' * 50)
+    (folder / 'index.js').write_text('function confirmAction() { return true; }\n' * 50)
+    return folder
+
+
+def test_build_fingerprints_rewrites_and_precompresses(static, monkeypatch):
+    monkeypatch.setattr(staticassets, 'brotli', None)
+    manifest = buildassets(str(static))
+
+    image = fingerprint('img/bg.jpg', (static / 'img' / 'bg.jpg').read_bytes())
+    assert manifest['img/bg.jpg'] == image
+    dist = static / 'dist'
+    css = (dist / manifest['style.css']).read_bytes()
+    # the stylesheet links the fingerprinted image, so a new image gives the stylesheet a new name as well
+    assert f'url("{image}")'.encode() in css
+    assert manifest['style.css'] == fingerprint('style.css', css)
+    assert gzip.decompress((dist / (manifest['style.css'] + '.gz')).read_bytes()) == css
+    assert gzip.decompress((dist / (manifest['index.js'] + '.gz')).read_bytes()) == (static / 'index.js').read_bytes()
+    # images are already compressed and there is no brotli module
+    assert not (dist / (image + '.gz')).exists() and not list(dist.rglob('*.br'))
+    assert json.loads((dist / 'manifest.json').read_text()) == manifest
+
+    # a rebuild gives the same names and clears out the files the last build left
+    (dist / 'stale.0123456789ab.js').write_text('old')
+    assert buildassets(str(static)) == manifest
+    assert not (dist / 'stale.0123456789ab.js').exists()
+
+
+def test_built_files_are_linked_and_served_immutable(static):
+    manifest = buildassets(str(static))
+    app = Flask(__name__, static_folder=str(static))
+    initassets(app)
+    client = app.test_client()
+
+    with app.test_request_context():
+        assert render_template_string("{{ url_for('static', filename='style.css') }}") == \
+               f"/static/dist/{manifest['style.css']}"
+        # a file the build has not seen keeps its own name
+        assert render_template_string("{{ url_for('static', filename='other.css') }}") == '/static/other.css'
+
+    url = f"/static/dist/{manifest['style.css']}"
+    plain = (static / 'dist' / manifest['style.css']).read_bytes()
+    response = client.get(url, headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and gzip.decompress(response.data) == plain
+    assert response.mimetype == 'text/css'
+    assert {'public', 'immutable', 'max-age=31536000'} <= {part.strip() for part in
+                                                           response.headers['Cache-Control'].split(',')}
+    assert 'Accept-Encoding' in response.headers['Vary']
+    response.close()
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers and response.data == plain
+    response.close()
+
+    # the source files are still served, revalidated as before
+    response = client.get('/static/style.css')
+    assert response.status_code == 200 and 'immutable' not in response.headers.get('Cache-Control', '')
+    response.close()
+    assert client.get('/static/dist/missing.css').status_code == 404
+
+
+def test_unbuilt_app_serves_the_source_files(static):
+    app = Flask(__name__, static_folder=str(static))
+    initassets(app)
+    with app.test_request_context():
+        assert render_template_string("{{ url_for('static', filename='style.css') }}") == '/static/style.css'
@@ -0,0 +1,121 @@
+# Name      : test_sync
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test sync.py and the inspection sync endpoint using pytest
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+
+import website
+from website import models as m
+from website.counters import readcounters, INSPECTION_COUNTER
+from website.sync import syncinspections
+from website.views import views
+
+CHAIN = 100000000001
+HOIST = 100000000002
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an in memory db holding one lifting chain and one hoist"""
+    app = Flask(__name__)
+    app.secret_key = 'secret'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        session = website.db.session
+        session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                         m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                user_role='FIELD'),
+                         m.User(username='smithk', first_name='Kim', surname='Smith', password='hashed',
+                                user_role='FIELD'),
+                         m.Site(site_no=123456, description='Calm Lands WPS'),
+                         m.Assetclass(class_id='C5', class_description='Lifting Chain'),
+                         m.Assetclass(class_id='H1', class_description='Hoist'),
+                         m.Assetstatus(status_id='AC', status_description='Active'),
+                         m.Asset(equip_no=CHAIN, description='Chain', location_on_site='Wet well',
+                                 site_no=123456, equip_status='AC', equip_class='C5'),
+                         m.Asset(equip_no=HOIST, description='Hoist', location_on_site='Dry well',
+                                 site_no=123456, equip_status='AC', equip_class='H1')])
+        session.add_all([m.Condition(condition_code=str(c), condition_description=f'Grade {c}') for c in range(1, 6)])
+        session.commit()
+        yield app
+        session.rollback()
+        website.db.drop_all()
+
+
+def _chain(key, measured=110):
+    return {'key': key, 'equip_no': CHAIN, 'condition_code': '1', 'chain_length': 10, 'chain_pitch_length': 100,
+            'measure_mean_pitch_length': measured, 'pitches_measured': 12, 'insp_date': '2025-08-01T09:30'}
+
+
+def test_batch_is_scored_and_reported_per_item(app):
+    results = syncinspections([_chain('a1'), {'key': 'a2', 'equip_no': HOIST, 'condition_code': '5'},
+                               {'key': 'a3', 'equip_no': CHAIN, 'condition_code': '1'},
+                               {'equip_no': HOIST, 'condition_code': '1'}], user_id=1)
+
+    assert [result['status'] for result in results] == ['created', 'created', 'rejected', 'rejected']
+    assert results[0]['lc_health_score'] == pytest.approx(100 / 110 * 100) and results[0]['asset_passed']
+    assert results[1]['asset_passed'] is False
+    assert results[2]['errors'] == ['lifting chain inspections require chain measurements']
+    assert 'key must be' in results[3]['errors'][0]
+
+    stored = website.db.session.get(m.Inspection, results[0]['id'])
+    assert (stored.client_key, stored.user_id, str(stored.insp_date)) == ('a1', 1, '2025-08-01 09:30:00')
+    assert website.db.session.get(m.AssetLatestInspection, CHAIN).inspection_id == results[0]['id']
+    assert readcounters()[INSPECTION_COUNTER] == 2
+
+
+def test_resubmitted_keys_are_skipped(app):
+    first = syncinspections([_chain('a1'), _chain('a2')], user_id=1)
+    again = syncinspections([_chain('a2', measured=130), _chain('a3'), _chain('a3')], user_id=1)
+
+    assert [result['status'] for result in again] == ['duplicate', 'created', 'duplicate']
+    assert again[0]['id'] == first[1]['id']
+    assert again[2]['id'] == again[1]['id']
+    assert m.Inspection.query.count() == 3
+    assert readcounters()[INSPECTION_COUNTER] == 3
+
+    # keys belong to the user that sent them
+    assert syncinspections([_chain('a1')], user_id=2)[0]['status'] == 'created'
+
+
+def test_key_stored_by_a_concurrent_sync_is_a_duplicate(app, monkeypatch):
+    other = syncinspections([_chain('a1', measured=130)], user_id=1)[0]
+    lookups = []
+    storedkeys = syncinspections.__globals__['storedkeys']
+
+    def racing(user_id, keys):
+        # the other sync commits after this one looked for its keys
+        lookups.append(keys)
+        return {} if len(lookups) == 1 else storedkeys(user_id, keys)
+
+    monkeypatch.setitem(syncinspections.__globals__, 'storedkeys', racing)
+    results = syncinspections([_chain('a1'), _chain('a2')], user_id=1)
+
+    assert [result['status'] for result in results] == ['duplicate', 'created']
+    assert results[0] == {'key': 'a1', 'status': 'duplicate', 'id': other['id']}
+    assert m.Inspection.query.count() == 2
+
+
+def test_sync_endpoint(app):
+    lm = LoginManager()
+    lm.init_app(app)
+    lm.user_loader(lambda uid: website.db.session.get(m.User, int(uid)))
+    app.register_blueprint(views)
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['_user_id'], s['_fresh'] = '1', True
+
+    resp = client.post('/inspection/sync', json={'inspections': [_chain('a1'), _chain('a1')]})
+    assert resp.status_code == 200
+    assert (resp.get_json()['created'], resp.get_json()['duplicate']) == (1, 1)
+
+    assert client.post('/inspection/sync', json={'inspections': 'a1'}).status_code == 400
+    assert client.post('/inspection/sync', json={'inspections': [_chain(str(i)) for i in range(501)]}) \
+        .status_code == 413
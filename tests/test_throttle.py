@@ -0,0 +1,134 @@
+# Name      : test_throttle
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test throttle.py and login throttling using pytest
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+
+import website
+from website import models as m
+from website.auth import auth
+from website.throttle import BucketLimit, MemoryBucketStore, SqliteBucketStore, LoginThrottle
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """lite flask app with the auth blueprint, tight login limits and an in memory db"""
+    app = Flask(__name__)
+    app.secret_key = 'testing'
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///:memory:', LOGIN_USER_ATTEMPTS=2, LOGIN_USER_WINDOW=60,
+                      LOGIN_IP_ATTEMPTS=3, LOGIN_IP_WINDOW=60)
+    website.db.init_app(app)
+    monkeypatch.setattr(website.auth, 'render_template', lambda template_name, **ctx: f'OK: {template_name}')
+
+    lm = LoginManager()
+    lm.init_app(app)
+    lm.user_loader(lambda uid: None)
+    app.register_blueprint(auth)
+
+    with app.app_context():
+        website.db.create_all()
+        yield app
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+@pytest.mark.parametrize('store_type', ['memory', 'sqlite'])
+def test_bucket_refills_at_its_rate(app, store_type):
+    clock = _Clock()
+    store = MemoryBucketStore(clock=clock) if store_type == 'memory' else SqliteBucketStore(60, clock=clock)
+    limit = BucketLimit(3, 30)
+
+    assert [store.take('k', limit)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = store.take('k', limit)
+    assert not allowed and retry_after == pytest.approx(10)
+
+    clock.now += 10
+    assert store.take('k', limit)[0]
+    assert not store.take('k', limit)[0]
+    assert store.take('other', limit)[0]
+
+
+def test_memory_store_is_bounded_and_expires():
+    clock = _Clock()
+    store = MemoryBucketStore(maxsize=2, clock=clock)
+    limit = BucketLimit(1, 10)
+    for key in ('a', 'b', 'c'):
+        store.take(key, limit)
+    assert len(store) == 2
+    assert store.take('a', limit)[0]
+
+    clock.now += 10
+    store.take('d', limit)
+    assert len(store) == 1
+
+
+def test_sqlite_store_prunes_refilled_buckets(app):
+    clock = _Clock()
+    store = SqliteBucketStore(60, prune_every=2, clock=clock)
+    store.take('old', BucketLimit(1, 60))
+    clock.now += 61
+    store.take('new', BucketLimit(1, 60))
+    assert [b.key for b in m.ThrottleBucket.query.all()] == ['new']
+
+
+def test_login_throttle_needs_both_buckets():
+    throttle = LoginThrottle(MemoryBucketStore(clock=_Clock()), BucketLimit(1, 60), BucketLimit(2, 60))
+    assert throttle.check('wardj', '10.0.0.1') is None
+    assert throttle.check(' WardJ ', '10.0.0.2') == 60
+    assert throttle.check('smithk', '10.0.0.1') is None
+    assert throttle.check('jonesa', '10.0.0.1') == 30
+
+
+def test_throttled_login_gets_429_before_hashing(app, monkeypatch):
+    verified = []
+    monkeypatch.setattr(website.auth, 'verifypassword', lambda stored, password: verified.append(password))
+    website.db.session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                                m.User(username='wardj', first_name='Jo', surname='Ward', user_role='FIELD',
+                                       password='hashed')])
+    website.db.session.commit()
+    client = app.test_client()
+
+    statuses = [client.post('/login', data={'username': 'wardj', 'password': 'guess'}).status_code
+                for _ in range(3)]
+    assert statuses == [302, 302, 429]
+    assert len(verified) == 2
+
+    resp = client.post('/login', data={'username': 'wardj', 'password': 'guess'})
+    assert resp.status_code == 429
+    assert int(resp.headers['Retry-After']) >= 1
+    assert len(verified) == 2
+
+
+@pytest.mark.parametrize('proxies, statuses', [(0, [200, 429, 429]), (1, [200, 200, 429])])
+def test_client_ip_behind_a_trusted_proxy(monkeypatch, proxies, statuses):
+    # imported here as test_config re-imports the module, create_app reads whichever one is current
+    import config
+    monkeypatch.setattr(config.Config, 'SECRET_KEY', 'secret')
+    monkeypatch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+    monkeypatch.setattr(config.Config, 'METRICS_ENABLED', False, raising=False)
+    monkeypatch.setattr(config.Config, 'LOGIN_IP_ATTEMPTS', 1)
+    monkeypatch.setattr(config.Config, 'PROXY_FIX_X_FOR', proxies, raising=False)
+    from website import create_app, db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+
+    # every request arrives from the proxy, only a trusted one's X-Forwarded-For gives each client its own bucket
+    assert [client.post('/login', data={'username': username, 'password': 'guess'},
+                        environ_base={'REMOTE_ADDR': '10.0.0.1'},
+                        headers={'X-Forwarded-For': forwarded}).status_code
+            for username, forwarded in (('wardj', '203.0.113.7'), ('smithk', '198.51.100.4'),
+                                        ('jonesa', '203.0.113.7'))] == statuses
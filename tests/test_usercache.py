@@ -0,0 +1,146 @@
+# Name      : test_usercache
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Test usercache.py using pytest
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+import website
+from website import models as m
+from website.dataversion import VersionCheck, USER_SCOPE
+from website.usercache import UserCache, SessionUser, loaduser, evictuser, usercache
+
+
+@pytest.fixture
+def app():
+    """lite flask app with an in memory db holding one field user"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    website.db.init_app(app)
+
+    with app.app_context():
+        website.db.create_all()
+        website.db.session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                                    m.Role(role_name='ADMIN', role_description='Administrator'),
+                                    m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                           user_role='FIELD')])
+        website.db.session.commit()
+        yield app
+        website.db.session.rollback()
+        website.db.drop_all()
+
+
+def test_loaduser_caches_a_slim_user(app):
+    first = loaduser('1')
+    second = loaduser('1')
+    assert isinstance(first, SessionUser)
+    assert second is first
+    assert (first.id, first.username, first.first_name, first.surname, first.user_role) == \
+           (1, 'wardj', 'Jo', 'Ward', 'FIELD')
+    assert not hasattr(first, 'password')
+    assert first.get_id() == '1' and first.is_authenticated
+    stats = usercache().stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_hit_sends_no_statements(app):
+    loaduser('1')
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(website.db.engine, 'before_cursor_execute', _record)
+    try:
+        assert loaduser('1').username == 'wardj'
+    finally:
+        event.remove(website.db.engine, 'before_cursor_execute', _record)
+    assert statements == []
+
+
+def test_evict_makes_role_change_apply_immediately(app):
+    assert loaduser('1').user_role == 'FIELD'
+    website.db.session.get(m.User, 1).user_role = 'ADMIN'
+    website.db.session.commit()
+    evictuser(1)
+    assert loaduser('1').user_role == 'ADMIN'
+
+
+def test_password_change_keeps_the_cached_user(app):
+    first = loaduser('1')
+    website.db.session.get(m.User, 1).password = 'rehashed'
+    website.db.session.commit()
+    assert loaduser('1') is first
+
+
+def test_deleted_user_is_not_loaded(app):
+    assert loaduser('1') is not None
+    website.db.session.delete(website.db.session.get(m.User, 1))
+    website.db.session.commit()
+    evictuser(1)
+    assert loaduser('1') is None
+    assert usercache().stats()['size'] == 0
+
+
+def test_entries_expire_and_least_recent_is_dropped():
+    now = [0.0]
+    cache = UserCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    calls = []
+
+    def loader(user_id):
+        calls.append(user_id)
+        return user_id
+
+    cache.get(1, loader)
+    cache.get(2, loader)
+    cache.get(1, loader)
+    cache.get(3, loader)
+    assert calls == [1, 2, 3]
+    cache.get(2, loader)
+    assert calls == [1, 2, 3, 2]
+
+    now[0] = 11
+    cache.get(2, loader)
+    assert calls == [1, 2, 3, 2, 2]
+    assert cache.stats()['hits'] == 1
+
+
+def test_change_in_one_worker_applies_in_another(tmp_path):
+    """two apps on one db file stand in for two workers, each with its own cache, the first rereading the users
+    version every 5 seconds of a fake clock"""
+    now = [0.0]
+    workers = []
+    for _ in range(2):
+        worker = Flask(__name__)
+        worker.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "shared.db"}'
+        website.db.init_app(worker)
+        workers.append(worker)
+    first, second = workers
+    with first.app_context():
+        website.db.create_all()
+        website.db.session.add_all([m.Role(role_name='FIELD', role_description='Field'),
+                                    m.Role(role_name='ADMIN', role_description='Administrator'),
+                                    m.User(username='wardj', first_name='Jo', surname='Ward', password='hashed',
+                                           user_role='ADMIN'),
+                                    m.User(username='hills', first_name='Sam', surname='Hill', password='hashed',
+                                           user_role='FIELD')])
+        website.db.session.commit()
+        first.extensions['user_cache'] = UserCache(versions=VersionCheck(USER_SCOPE, interval=5, clock=lambda: now[0]))
+        assert loaduser('1').user_role == 'ADMIN' and loaduser('2') is not None
+
+    with second.app_context():
+        website.db.session.get(m.User, 1).user_role = 'FIELD'
+        website.db.session.delete(website.db.session.get(m.User, 2))
+        website.db.session.commit()
+
+    with first.app_context():
+        # until the version is read again the cached copies are served without a query
+        now[0] = 4
+        assert loaduser('1').user_role == 'ADMIN'
+        now[0] = 5
+        assert loaduser('1').user_role == 'FIELD'
+        assert loaduser('2') is None
+        website.db.drop_all()
@@ -1,7 +1,7 @@
 # Name      : test_views
 # Author    : Patrick Cronin
 # Date      : 18/08/2025
-# Updated   : 18/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Test views.py using pytest
 
 import sys
@@ -94,8 +94,12 @@ def test_inspection_get_renders_template_with_minimal_lists(monkeypatch, views_w
     assert holder["template"] == "inspection.html"
     for i in ("min_length", "max_length", "min_pitch_length",
               "max_pitch_length", "min_pitches_measured",
-              "lifting_chain_list", "condition_list", "other_asset_list"):
+              "condition_list", "chain_lookup", "other_lookup"):
         assert i in holder["ctx"]
+    # the asset pickers page through the lookup endpoint rather than the page listing every asset
+    assert "lifting_chain_list" not in holder["ctx"] and "other_asset_list" not in holder["ctx"]
+    assert holder["ctx"]["chain_lookup"] == "/assets/lookup?class=C5"
+    assert holder["ctx"]["other_lookup"] == "/assets/lookup?not_class=C5"
 
 
 def test_inspection_post_missing_fields_redirects(monkeypatch, views_with_render_capture):
@@ -110,12 +114,12 @@ def test_inspection_post_missing_fields_redirects(monkeypatch, views_with_render
 def test_home_field_user_renders_template(monkeypatch, views_with_render_capture):
     views_mod, holder = views_with_render_capture
 
-    class _InspQuery:
-        def filter_by(self, **kwargs): return self
-        def all(self): return []
-    class _Inspection: pass
-    _Inspection.query = _InspQuery()
-    monkeypatch.setattr(views_mod, "Inspection", _Inspection, raising=True)
+    monkeypatch.setattr(views_mod, "db", types.SimpleNamespace(session=_SessionStub()), raising=True)
+    paged = {}
+    def _paginate(query, listing, args):
+        paged["listing"] = listing
+        return []
+    monkeypatch.setattr(views_mod, "paginate", _paginate, raising=True)
 
     app, client = _make_logged_in_app(views_mod, user_role="FIELD")
     resp = client.get("/")
@@ -123,4 +127,17 @@ def test_home_field_user_renders_template(monkeypatch, views_with_render_capture
     assert resp.status_code == 200
     assert holder["template"] == "home.html"
     assert "inspections" in holder["ctx"]
+    assert paged["listing"] is views_mod.INSPECTION_LISTING
     assert holder["ctx"]["inspections"] == []
+
+
+def test_home_admin_reads_counters(monkeypatch, views_with_render_capture):
+    views_mod, holder = views_with_render_capture
+    monkeypatch.setattr(views_mod, "readcounters",
+                        lambda: {"users": 6, "users:ADMIN": 1, "users:CONTENG": 2, "users:FIELD": 3}, raising=True)
+
+    app, client = _make_logged_in_app(views_mod, user_role="ADMIN")
+    resp = client.get("/")
+
+    assert resp.status_code == 200
+    assert holder["ctx"]["counts"] == (6, 1, 2, 3, 0)
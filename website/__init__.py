@@ -1,12 +1,13 @@
 # Name      : __init__
 # Author    : Patrick Cronin
 # Date      : 20/07/2025
-# Updated   : 18/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Initialisation of application.
 
 from flask import Flask
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.middleware.proxy_fix import ProxyFix
 from os import path
 import logging
 
@@ -20,7 +21,14 @@ def create_app():
         app.config.from_object('config.Config')
         db.init_app(app)
 
-        from .models import User, Role, Asset, Assetclass, Assetstatus, Site, Condition, Inspection
+        # request.remote_addr is then the client the proxies saw rather than the last proxy
+        if app.config.get('PROXY_FIX_X_FOR', 0) > 0:
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+        from .sqlitetuning import tunesqlite
+        tunesqlite(app)
+
+        from .models import Role, Asset, Assetclass, Assetstatus, Site, Condition, Inspection
     except Exception as e:
         logging.error(f'Error while creating app: {e}')
         raise
@@ -29,14 +37,31 @@ def create_app():
         from .csp import csp
         from .views import views
         from .auth import auth
+        from .api import api
 
         app.register_blueprint(views, url_prefix='/')
         app.register_blueprint(auth, url_prefix='/')
         app.register_blueprint(csp, url_prefix='/')
+        app.register_blueprint(api, url_prefix='/api/v1')
+
+        from .commands import registercommands
+        registercommands(app)
+
+        from .metrics import instrumentapp
+        instrumentapp(app)
+
+        from .staticassets import initassets
+        initassets(app)
+
+        # after_request hooks run last registered first, so the metrics hook times the compression too
+        from .compression import initcompression
+        initcompression(app)
 
         # with app.app_context():
         # db.create_all()
 
+        from .usercache import loaduser
+
         login_manager = LoginManager()
         login_manager.login_view = 'auth.login'
 
@@ -45,7 +70,8 @@ def create_app():
 
             @login_manager.user_loader
             def load_user(id):
-                return User.query.get(int(id))
+                # served from a per worker TTL/LRU cache, delete_user and update_role evict the user they change
+                return loaduser(id)
         except Exception as e:
             logging.error(f"Failed to load user{id}: {e}")
             return None
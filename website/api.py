@@ -0,0 +1,166 @@
+# Name      : api
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Read only JSON API for sites, assets and inspections with cursor pagination and conditional GETs.
+
+import hashlib
+import json
+import logging
+
+from flask import Blueprint, jsonify, request, url_for, Response
+from flask_login import current_user
+
+from . import db
+from .dataversion import getversions, SITE_SCOPE, ASSET_SCOPE, INSPECTION_SCOPE
+from .pagination import Listing, Sort, Filter, paginate, parsebool, parsestring, datefrom, dateto
+from .models import Site, Asset, AssetLatestInspection, Inspection
+
+API_VERSION = 'v1'
+
+api = Blueprint('api', __name__)
+
+
+class ApiResource:
+    """a listable resource, fields maps each selectable field to its column and the data version scopes it reads"""
+
+    def __init__(self, name, query, listing, fields, default_fields, scopes, role=None):
+        self.name = name
+        self.query = query
+        self.listing = listing
+        self.fields = fields
+        self.default_fields = default_fields
+        self.scopes = scopes
+        self.role = role
+
+    def selectfields(self, raw):
+        '''function to parse a comma separated fields parameter, raises ValueError naming any unknown fields'''
+        if not raw:
+            return list(self.default_fields)
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(f"unknown fields {', '.join(unknown)}, choose from {', '.join(self.fields)}")
+        return list(dict.fromkeys(names))
+
+    def scopesfor(self, names):
+        scopes = set(self.scopes)
+        for name in names:
+            scopes.update(self.fields[name][1])
+        return sorted(scopes)
+
+
+SITES = ApiResource(
+    'sites',
+    lambda: db.session.query(Site),
+    Listing(Site.id, sorts={'site_no': Sort(Site.site_no), 'description': Sort(Site.description)},
+            default_sort='site_no', filters={'site': Filter(Site.site_no)}),
+    fields={'id': (Site.id, ()), 'site_no': (Site.site_no, ()), 'description': (Site.description, ())},
+    default_fields=('id', 'site_no', 'description'),
+    scopes=(SITE_SCOPE,))
+
+ASSETS = ApiResource(
+    'assets',
+    lambda: db.session.query(Asset).outerjoin(Site, Asset.site_no == Site.site_no)
+    .outerjoin(AssetLatestInspection, Asset.equip_no == AssetLatestInspection.equip_no),
+    Listing(Asset.id, sorts={'equip_no': Sort(Asset.equip_no), 'description': Sort(Asset.description)},
+            default_sort='equip_no',
+            filters={'equip_no': Filter(Asset.equip_no), 'site': Filter(Asset.site_no),
+                     'class': Filter(Asset.equip_class, parse=parsestring),
+                     'status': Filter(Asset.equip_status, parse=parsestring)}),
+    fields={'id': (Asset.id, ()), 'equip_no': (Asset.equip_no, ()), 'description': (Asset.description, ()),
+            'location_on_site': (Asset.location_on_site, ()), 'site_no': (Asset.site_no, ()),
+            'site_description': (Site.description, (SITE_SCOPE,)), 'equip_class': (Asset.equip_class, ()),
+            'equip_status': (Asset.equip_status, ()),
+            'last_insp_date': (AssetLatestInspection.insp_date, (INSPECTION_SCOPE,)),
+            'last_health_score': (AssetLatestInspection.lc_health_score, (INSPECTION_SCOPE,)),
+            'last_passed': (AssetLatestInspection.asset_passed, (INSPECTION_SCOPE,))},
+    default_fields=('id', 'equip_no', 'description', 'location_on_site', 'site_no', 'equip_class', 'equip_status'),
+    scopes=(ASSET_SCOPE,))
+
+INSPECTIONS = ApiResource(
+    'inspections',
+    lambda: db.session.query(Inspection),
+    Listing(Inspection.id, sorts={'id': Sort(Inspection.id), 'insp_date': Sort(Inspection.insp_date)},
+            default_sort='id',
+            filters={'equip_no': Filter(Inspection.equip_no),
+                     'passed': Filter(Inspection.asset_passed, parse=parsebool),
+                     'date_from': datefrom(Inspection.insp_date), 'date_to': dateto(Inspection.insp_date)}),
+    fields={name: (getattr(Inspection, name), ()) for name in (
+        'id', 'equip_no', 'condition_code', 'chain_length', 'chain_pitch_length', 'measure_mean_pitch_length',
+        'pitches_measured', 'lc_health_score', 'asset_passed', 'insp_date', 'user_id')},
+    default_fields=('id', 'equip_no', 'condition_code', 'lc_health_score', 'asset_passed', 'insp_date', 'user_id'),
+    scopes=(INSPECTION_SCOPE,),
+    role='ADMIN')
+
+
+def _jsonvalue(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def resourcetag(resource, versions, args):
+    '''function to build the strong ETag for a listing from the data versions it reads and its query string.
+    the same versions and arguments always give the same body, so the tag is known before running the query.'''
+    payload = json.dumps([API_VERSION, resource.name, sorted(versions.items()), sorted(args.items(multi=True))],
+                         separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def listresource(resource):
+    '''function to answer a GET for a resource listing, a 304 when the client's ETag is still current'''
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'authentication required'}), 401
+    if resource.role and current_user.user_role.upper() != resource.role:
+        return jsonify({'error': f'{resource.role} role required'}), 403
+    try:
+        names = resource.selectfields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # one primary key read of the version stamps, a current client gets its 304 without the listing query
+        ETag = resourcetag(resource, getversions(resource.scopesfor(names)), request.args)
+        # a weak comparison as If-None-Match calls for, a gzipped body carries the same tag marked weak
+        if request.if_none_match.contains_weak(ETag):
+            NotModified = Response(status=304)
+            NotModified.set_etag(ETag)
+            NotModified.headers['Cache-Control'] = 'private, no-cache'
+            return NotModified
+
+        query = resource.query().with_entities(*[resource.fields[name][0].label(name) for name in names])
+        ResultPage = paginate(query, resource.listing, request.args)
+    except Exception as e:
+        logging.error(f'error listing {resource.name} for the api: {e}')
+        return jsonify({'error': f'An error occurred listing {resource.name}'}), 500
+
+    links = {}
+    endpoint = f'api.{resource.name}'
+    if ResultPage.has_next:
+        links['next'] = url_for(endpoint,
+                                **ResultPage.linkargs(cursor=ResultPage.next_cursor, fields=request.args.get('fields')))
+    if ResultPage.has_prev:
+        links['prev'] = url_for(endpoint,
+                                **ResultPage.linkargs(cursor=ResultPage.prev_cursor, fields=request.args.get('fields')))
+    Body = jsonify({'data': [{name: _jsonvalue(row._mapping[name]) for name in names} for row in ResultPage],
+                    'next_cursor': ResultPage.next_cursor, 'prev_cursor': ResultPage.prev_cursor, 'links': links})
+    Body.set_etag(ETag)
+    Body.headers['Cache-Control'] = 'private, no-cache'
+    return Body
+
+
+# blueprint route for the site listing
+@api.route('/sites')
+def sites():
+    return listresource(SITES)
+
+
+# blueprint route for the asset listing with each asset's latest inspection
+@api.route('/assets')
+def assets():
+    return listresource(ASSETS)
+
+
+# blueprint route for the inspection history, admin only like the inspection admin page
+@api.route('/inspections')
+def inspections():
+    return listresource(INSPECTIONS)
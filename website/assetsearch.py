@@ -0,0 +1,153 @@
+# Name      : assetsearch
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Full text and prefix search over assets with an SQLite FTS5 index kept in sync by triggers.
+
+import re
+
+from sqlalchemy import event, select, text
+
+from . import db
+from .pagination import Filter
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_SEARCH_TERMS = 8
+# bm25 weights of a match in equip_no, description, location_on_site and site_description, so an asset whose number
+# matches ranks above one that only mentions it in the site name
+RANK_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+_RANKED_SEARCH = (
+    'SELECT asset.id, asset.equip_no, asset.description, asset.location_on_site, asset.equip_class, asset.site_no, '
+    'asset_search.site_description FROM asset_search JOIN asset ON asset.id = asset_search.rowid '
+    f"WHERE asset_search MATCH :match ORDER BY bm25(asset_search, {', '.join(map(str, RANK_WEIGHTS))}), "
+    'asset.equip_no LIMIT :limit')
+_SEPARATORS = re.compile(r'[\W_]+')
+
+# the site description of the asset the search row belongs to, for the site triggers to refresh in place
+_SITE_DESCRIPTION = ("COALESCE((SELECT site.description FROM site JOIN asset ON asset.site_no = site.site_no "
+                     "WHERE asset.id = asset_search.rowid LIMIT 1), '')")
+_INSERT_ROW = ("INSERT INTO asset_search (rowid, equip_no, description, location_on_site, site_description) "
+               "VALUES (new.id, new.equip_no, new.description, new.location_on_site, "
+               "COALESCE((SELECT description FROM site WHERE site_no = new.site_no LIMIT 1), ''));")
+
+# rows are keyed by asset.id. the triggers sit in the database rather than on the models so bulk inserts, the seed
+# and anything else writing with plain SQL keep the index in step too
+SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS asset_search USING fts5("
+    "equip_no, description, location_on_site, site_description, tokenize = 'unicode61', "
+    "prefix = '1 2 3 4 5 6 7 8')",
+    f"CREATE TRIGGER IF NOT EXISTS asset_search_ai AFTER INSERT ON asset BEGIN {_INSERT_ROW} END",
+    "CREATE TRIGGER IF NOT EXISTS asset_search_ad AFTER DELETE ON asset BEGIN "
+    "DELETE FROM asset_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS asset_search_au AFTER UPDATE OF equip_no, description, location_on_site, site_no "
+    f"ON asset BEGIN DELETE FROM asset_search WHERE rowid = old.id; {_INSERT_ROW} END",
+    "CREATE TRIGGER IF NOT EXISTS site_search_ai AFTER INSERT ON site BEGIN "
+    f"UPDATE asset_search SET site_description = {_SITE_DESCRIPTION} "
+    "WHERE rowid IN (SELECT id FROM asset WHERE site_no = new.site_no); END",
+    "CREATE TRIGGER IF NOT EXISTS site_search_au AFTER UPDATE OF site_no, description ON site BEGIN "
+    f"UPDATE asset_search SET site_description = {_SITE_DESCRIPTION} "
+    "WHERE rowid IN (SELECT id FROM asset WHERE site_no IN (old.site_no, new.site_no)); END",
+    "CREATE TRIGGER IF NOT EXISTS site_search_ad AFTER DELETE ON site BEGIN "
+    f"UPDATE asset_search SET site_description = {_SITE_DESCRIPTION} "
+    "WHERE rowid IN (SELECT id FROM asset WHERE site_no = old.site_no); END",
+)
+
+
+def createsearch(connection):
+    '''function to create the search table and the triggers that keep it in step, if they are missing'''
+    for statement in SEARCH_DDL:
+        connection.execute(text(statement))
+
+
+def refreshsearch(connection):
+    '''function to rebuild every search row from the asset and site tables then merge the index b-trees'''
+    createsearch(connection)
+    connection.execute(text('DELETE FROM asset_search'))
+    connection.execute(text(
+        'INSERT INTO asset_search (rowid, equip_no, description, location_on_site, site_description) '
+        'SELECT asset.id, asset.equip_no, asset.description, asset.location_on_site, '
+        "COALESCE((SELECT description FROM site WHERE site.site_no = asset.site_no LIMIT 1), '') FROM asset"))
+    connection.execute(text("INSERT INTO asset_search (asset_search) VALUES ('optimize')"))
+
+
+def rebuildsearch():
+    '''function to rebuild the search index, returns the number of assets in it'''
+    refreshsearch(db.session.connection())
+    count = db.session.execute(text('SELECT COUNT(*) FROM asset_search')).scalar()
+    db.session.commit()
+    return count
+
+
+def searchterms(raw):
+    '''function to split free text in to lower case words the way the unicode61 tokenizer does'''
+    return _SEPARATORS.sub(' ', str(raw or '').lower()).split()
+
+
+def matchquery(raw):
+    '''function to turn free text in to an FTS5 query where every word must match as a prefix of some column,
+    returns None when there is nothing to search for. words are quoted so FTS5 operators in the text are literal.'''
+    terms = searchterms(raw)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def parsesearch(raw):
+    '''function to parse a search query string value for a listing filter'''
+    match = matchquery(raw)
+    if match is None:
+        raise ValueError(f'{raw} has nothing to search for')
+    return match
+
+
+def searchlimit(raw):
+    '''function to read the requested number of results, bounded by MAX_SEARCH_LIMIT'''
+    try:
+        limit = int(raw) if raw is not None else SEARCH_LIMIT
+    except (TypeError, ValueError):
+        return SEARCH_LIMIT
+    return max(1, min(limit, MAX_SEARCH_LIMIT))
+
+
+def matchingassets(match):
+    '''function returning a select of the ids of the assets matching an FTS5 query, for use in an IN filter'''
+    return select(text('rowid')).select_from(text('asset_search')) \
+        .where(text('asset_search MATCH :match').bindparams(match=match))
+
+
+def searchfilter(column):
+    '''function returning a listing filter that keeps the rows whose asset id, in column, matches the search text'''
+    return Filter(column, parse=parsesearch, op=lambda column, match: column.in_(matchingassets(match)))
+
+
+def searchassets(raw, limit=SEARCH_LIMIT):
+    '''function to return the best matches for free text, best first, as dicts of equip_no, description,
+    location_on_site, equip_class, site_no and site_description. assets where every word is whole, such as an exact
+    equip no, come first then those where the words only start a word, each ranked by bm25 in SQL. the prefix search
+    only runs when the whole words leave the page short.'''
+    terms = searchterms(raw)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return []
+    results = {}
+    for match in (' '.join(f'"{term}"' for term in terms), matchquery(raw)):
+        # a whole word match is a prefix match too, so up to limit rows of the second search are already held
+        for row in db.session.execute(text(_RANKED_SEARCH), {'match': match, 'limit': limit}):
+            if len(results) < limit:
+                results.setdefault(row.id, {key: value for key, value in row._mapping.items() if key != 'id'})
+        if len(results) >= limit:
+            break
+    return list(results.values())
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _schema_created(target, connection, tables=(), **kw):
+    # create_all builds the search table with the asset table, existing databases get it from the migration
+    if any(table.name == 'asset' for table in tables):
+        createsearch(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _schema_dropped(target, connection, tables=(), **kw):
+    if any(table.name == 'asset' for table in tables):
+        connection.execute(text('DROP TABLE IF EXISTS asset_search'))
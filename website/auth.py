@@ -1,17 +1,21 @@
 # Name      : auth
 # Author    : Patrick Cronin
 # Date      : 20/07/2025
-# Updated   : 17/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Define authentication for application
 
 from flask import Blueprint, render_template, request, flash, url_for
 from werkzeug.utils import redirect
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from .models import User, Role
 from . import db
 from .userrolewrappers import admin_required
+from .refcache import roles
+from .throttle import loginthrottle
+from .passwords import hashpassword, verifypassword, needsrehash, passwordpool, PasswordPoolBusy
+from .pagination import Listing, Sort, Filter, paginate, parsestring
 import logging
+import math
 
 MIN_USERNAME_LENGTH = 5
 MIN_FIRST_NAME_LENGTH = 2
@@ -22,6 +26,16 @@ PASSWORD_REGEX = r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?
 auth = Blueprint('auth', __name__)
 
 
+# upgrade a stored hash to the configured method and cost, a failure here must not stop the user logging in
+def rehash(user, password):
+    try:
+        user.password = hashpassword(password)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'Error rehashing password for {user.username}: {e}')
+
+
 # blueprint route for logging in to web application
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
@@ -29,6 +43,12 @@ def login():
         Username = request.form['username']
         Password = request.form['password']
 
+        # charged before the user lookup and any hashing so a flood of guesses costs next to nothing
+        RetryAfter = loginthrottle().check(Username, request.remote_addr)
+        if RetryAfter:
+            flash(f'Too many login attempts, try again in {RetryAfter} seconds.', category='error')
+            return render_template('login.html', user=current_user), 429, {'Retry-After': str(RetryAfter)}
+
         try:
             user = User.query.filter_by(username=Username).first()
         except Exception as e:
@@ -38,12 +58,19 @@ def login():
 
         if user:
             try:
-                if check_password_hash(user.password, Password):
+                if verifypassword(user.password, Password):
+                    if needsrehash(user.password):
+                        rehash(user, Password)
                     login_user(user, remember=True)
                     return redirect(url_for('views.home'))
                 else:
                     flash('Incorrect Password', category='error')
                     return redirect(url_for('auth.login'))
+            except PasswordPoolBusy as e:
+                logging.error(f'Error verifying password: {e}')
+                flash('Login is busy, try again in a few seconds.', category='error')
+                return render_template('login.html', user=current_user), 503, \
+                    {'Retry-After': str(math.ceil(passwordpool().queue_timeout))}
             except Exception as e:
                 logging.error(f'Error getting user: {e}')
                 flash('Login Failed, try again later', category='error')
@@ -94,7 +121,7 @@ def useradmin():
                 flash('Passwords do not match', category='error')
             else:
                 new_user = User(username=Username, first_name=FirstName, surname=Surname, user_role=UserRole,
-                                password=generate_password_hash(Password1, method='pbkdf2:sha256'))
+                                password=hashpassword(Password1))
                 db.session.add(new_user)
                 db.session.commit()
                 flash('Account created successfully', category='success')
@@ -103,9 +130,16 @@ def useradmin():
             logging.error(f'Error creating and validating user data: {e}')
             flash('Error creating and validating user data', category='error')
     try:
+        UserListing = Listing(User.id,
+                              sorts={'username': Sort(User.username),
+                                     'surname': Sort(User.surname),
+                                     'role': Sort(User.user_role)},
+                              default_sort='username',
+                              filters={'role': Filter(User.user_role, parse=parsestring)})
         UserList = db.session.query(User.id, User.username, User.first_name, User.surname, User.user_role,
-                                    Role.role_description).join(Role, User.user_role == Role.role_name).all()
-        RoleList = db.session.query(Role.role_name, Role.role_description).all()
+                                    Role.role_description).join(Role, User.user_role == Role.role_name)
+        UserList = paginate(UserList, UserListing, request.args)
+        RoleList = roles()
     except Exception as e:
         logging.error(f'Error getting user and role lists: {e}')
         flash('Error getting user and role lists', category='error')
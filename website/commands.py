@@ -0,0 +1,250 @@
+# Name      : commands
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Flask CLI commands for maintaining application data and building the static files.
+
+import logging
+import time
+
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+
+from . import db
+from .inspections import batchscore, PASS_SCORE_THRESHOLD, CONDITION_FAILURE_THRESHOLD
+from .counters import reconcilecounters
+from .importer import importinspections
+from .latestinspection import rebuildlatest, refreshlatest
+from .forecast import rebuildtrends, refreshtrends
+from .migrations import upgrade
+from .refcache import invalidatereference
+from .seed import seeddatabase
+from .assetsearch import rebuildsearch
+from .staticassets import buildassets, brotli
+from .dataversion import bumpversion, INSPECTION_SCOPE
+from .models import Inspection, User
+
+RESCORE_CHUNK_SIZE = 5000
+
+
+def rescoreinspections(chunk_size=RESCORE_CHUNK_SIZE, pass_threshold=None, condition_threshold=None, dry_run=False):
+    '''function to rescan the inspection table in primary key chunks and rewrite lc_health_score and asset_passed
+    where the current thresholds give a different result. Each chunk is scored in one vectorised call, written
+    with one executemany and committed, returns (scanned, changed). Other thresholds can only be tried with
+    dry_run, which counts the changes and writes nothing, new inspections are scored with the configured ones.'''
+    if not dry_run and (pass_threshold is not None or condition_threshold is not None):
+        raise ValueError('thresholds other than the configured ones can only be used for a dry run')
+    scanned, changed, last_id = 0, 0, 0
+    while True:
+        rows = db.session.execute(
+            select(Inspection.id, Inspection.equip_no, Inspection.measure_mean_pitch_length,
+                   Inspection.chain_pitch_length, Inspection.condition_code, Inspection.lc_health_score,
+                   Inspection.asset_passed)
+            .where(Inspection.id > last_id).order_by(Inspection.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        ids, equip_nos, measured, nominal, conditions, old_scores, old_passed = zip(*rows)
+        health_scores, passed = batchscore(measured, nominal, conditions, pass_threshold, condition_threshold)
+        old_scores = np.asarray(old_scores, dtype=float)
+        old_passed = np.asarray([p is not None and bool(p) for p in old_passed])
+
+        same_score = np.isclose(health_scores, old_scores, equal_nan=True)
+        different = ~same_score | (passed != old_passed)
+        updates = [{'id': ids[i],
+                    'lc_health_score': None if np.isnan(health_scores[i]) else float(health_scores[i]),
+                    'asset_passed': bool(passed[i])}
+                   for i in np.flatnonzero(different)]
+        if updates and not dry_run:
+            db.session.execute(update(Inspection), updates)
+            # bulk updates skip the model events, so refresh the latest inspections and trends of the assets touched
+            touched = [equip_nos[i] for i in np.flatnonzero(different)]
+            refreshlatest(db.session.connection(), touched)
+            refreshtrends(db.session.connection(), touched)
+            bumpversion(INSPECTION_SCOPE)
+        db.session.commit()
+
+        scanned += len(rows)
+        changed += len(updates)
+        last_id = ids[-1]
+    return scanned, changed
+
+
+@click.command('rescore')
+@click.option('--chunk-size', default=RESCORE_CHUNK_SIZE, show_default=True, help='Inspections scored per batch.')
+@click.option('--dry-run', is_flag=True, help='Count the inspections that would change without writing them.')
+@click.option('--pass-threshold', type=float, default=None,
+              help=f'Dry run only, health score pass threshold to try instead of PASS_SCORE_THRESHOLD '
+                   f'({PASS_SCORE_THRESHOLD}).')
+@click.option('--condition-threshold', type=float, default=None,
+              help=f'Dry run only, condition failure threshold to try instead of CONDITION_FAILURE_THRESHOLD '
+                   f'({CONDITION_FAILURE_THRESHOLD}).')
+@with_appcontext
+def rescorecommand(chunk_size, dry_run, pass_threshold, condition_threshold):
+    """Recalculate health scores and pass status for every inspection."""
+    if not dry_run and (pass_threshold is not None or condition_threshold is not None):
+        raise click.UsageError('--pass-threshold and --condition-threshold need --dry-run, change '
+                               'PASS_SCORE_THRESHOLD or CONDITION_FAILURE_THRESHOLD to rescore for real')
+    try:
+        scanned, changed = rescoreinspections(chunk_size, pass_threshold, condition_threshold, dry_run)
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error rescoring inspections: {e}')
+        raise click.ClickException(f'Rescoring failed: {e}')
+    if dry_run:
+        click.echo(f'Checked {scanned} inspections, {changed} would be updated. Nothing was written.')
+    else:
+        click.echo(f'Rescored {scanned} inspections, {changed} updated.')
+
+
+@click.command('import-inspections')
+@click.argument('csvfile', type=click.File('r', encoding='utf-8-sig', lazy=False))
+@click.option('--username', required=True, help='User the inspections are recorded against.')
+@with_appcontext
+def importcommand(csvfile, username):
+    """Bulk import inspections from a CSV file."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'User {username} not found')
+    report = importinspections(csvfile, user.id)
+    for error in report.errors:
+        click.echo(f"row {error['row']}: {'; '.join(error['errors'])}", err=True)
+    click.echo(f'Imported {report.inserted} inspections, {report.rejected} rejected.')
+    if report.error:
+        raise click.ClickException(report.error)
+
+
+@click.command('upgrade-db')
+@click.option('--target', type=int, default=None, help='Stop after this migration version.')
+@with_appcontext
+def upgradecommand(target):
+    """Create missing tables and apply pending schema migrations."""
+    try:
+        applied = upgrade(target)
+    except Exception as e:
+        raise click.ClickException(f'Upgrade failed: {e}')
+    for version, description in applied:
+        click.echo(f'Applied migration {version}: {description}')
+    click.echo('Database is up to date.' if applied else 'No migrations to apply.')
+
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcilecommand():
+    """Rebuild the dashboard counters from the user and inspection tables."""
+    try:
+        counters = reconcilecounters()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error reconciling dashboard counters: {e}')
+        raise click.ClickException(f'Reconcile failed: {e}')
+    for name, value in sorted(counters.items()):
+        click.echo(f'{name}: {value}')
+
+
+@click.command('rebuild-latest')
+@with_appcontext
+def rebuildlatestcommand():
+    """Rebuild the latest inspection of every asset from the inspection history."""
+    try:
+        count = rebuildlatest()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error rebuilding latest inspections: {e}')
+        raise click.ClickException(f'Rebuild failed: {e}')
+    click.echo(f'Latest inspection rebuilt for {count} assets.')
+
+
+@click.command('rebuild-forecasts')
+@with_appcontext
+def rebuildforecastscommand():
+    """Refit every asset's wear trend and predicted fail date from the inspection history."""
+    try:
+        count = rebuildtrends()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error rebuilding wear trends: {e}')
+        raise click.ClickException(f'Rebuild failed: {e}')
+    click.echo(f'Wear trends rebuilt for {count} assets.')
+
+
+@click.command('rebuild-search')
+@with_appcontext
+def rebuildsearchcommand():
+    """Rebuild the asset search index from the asset and site tables."""
+    try:
+        count = rebuildsearch()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error rebuilding asset search index: {e}')
+        raise click.ClickException(f'Rebuild failed: {e}')
+    click.echo(f'Search index rebuilt for {count} assets.')
+
+
+@click.command('build-assets')
+@with_appcontext
+def buildassetscommand():
+    """Write fingerprinted, precompressed copies of the static files for the app to serve."""
+    try:
+        manifest = buildassets(current_app.static_folder)
+    except Exception as e:
+        logging.error(f'error building static assets: {e}')
+        raise click.ClickException(f'Build failed: {e}')
+    encodings = 'gzip and brotli' if brotli is not None else 'gzip, install brotli for brotli too'
+    click.echo(f'Built {len(manifest)} static files with {encodings}. Restart the app to serve them.')
+
+
+@click.command('invalidate-reference')
+@with_appcontext
+def invalidatecommand():
+    """Tell every worker to reload the condition, asset class, asset status and role tables."""
+    invalidatereference()
+    db.session.commit()
+    click.echo('Reference data cache invalidated.')
+
+
+@click.command('seed')
+@click.option('--inspections', default=100000, show_default=True, help='Inspections to generate.')
+@click.option('--assets', default=5000, show_default=True, help='Assets to generate, about half lifting chains.')
+@click.option('--sites', default=200, show_default=True, help='Sites to spread the assets over.')
+@click.option('--users', default=50, show_default=True,
+              help='Field inspectors, an admin and a contract engineer are always added.')
+@click.option('--seed', default=0, show_default=True,
+              help='Random seed, the same seed and end date give the same data.')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Date of the newest inspections, defaults to today.')
+@click.option('--password', default='Seed-Pa55word', show_default=True, help='Password of every seeded user.')
+@with_appcontext
+def seedcommand(inspections, assets, sites, users, seed, end_date, password):
+    """Create the schema and load a synthetic dataset in to an empty database."""
+    if min(assets, sites, users) < 1 or inspections < 0:
+        raise click.ClickException('assets, sites and users must be at least 1')
+    started = time.perf_counter()
+    try:
+        report = seeddatabase(inspections, assets, sites, users, seed, end_date, password,
+                              progress=lambda done: click.echo(f'{done} inspections loaded', err=True))
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error seeding database: {e}')
+        raise click.ClickException(f'Seeding failed: {e}')
+    counts = report.todict()
+    click.echo(f"Seeded {counts['sites']} sites, {counts['assets']} assets, {counts['users']} users and "
+               f"{counts['inspections']} inspections in {time.perf_counter() - started:.1f}s.")
+
+
+def registercommands(app):
+    '''function to register the CLI commands with the flask app'''
+    app.cli.add_command(rescorecommand)
+    app.cli.add_command(importcommand)
+    app.cli.add_command(upgradecommand)
+    app.cli.add_command(reconcilecommand)
+    app.cli.add_command(invalidatecommand)
+    app.cli.add_command(rebuildlatestcommand)
+    app.cli.add_command(rebuildforecastscommand)
+    app.cli.add_command(rebuildsearchcommand)
+    app.cli.add_command(seedcommand)
+    app.cli.add_command(buildassetscommand)
@@ -0,0 +1,54 @@
+# Name      : compression
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Gzip dynamic html and json responses above a size threshold for clients that accept it.
+
+import gzip
+
+from flask import request
+
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+COMPRESS_MIMETYPES = ('text/html', 'application/json')
+
+
+def shouldcompress(response, min_bytes):
+    '''function to decide if a response is worth compressing. streamed and file responses are left alone as the body
+    would have to be read in to memory, as are ones already encoded such as the gzip export'''
+    if response.is_streamed or response.direct_passthrough:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES:
+        return False
+    return response.content_length is not None and response.content_length >= min_bytes
+
+
+def compressresponse(response, min_bytes=COMPRESS_MIN_BYTES, level=COMPRESS_LEVEL):
+    '''function to gzip a response body in place when the client accepts gzip'''
+    if not shouldcompress(response, min_bytes):
+        return response
+    # a cache must key the stored copy on the encoding asked for even when this client gets it plain
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    response.set_data(gzip.compress(response.get_data(), compresslevel=level))
+    response.headers['Content-Encoding'] = 'gzip'
+    # the compressed bytes differ from the ones a strong etag promises, a weak one still revalidates
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def initcompression(app):
+    '''function to compress the app's responses unless COMPRESS_ENABLED is off'''
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    min_bytes = app.config.get('COMPRESS_MIN_BYTES', COMPRESS_MIN_BYTES)
+    level = app.config.get('COMPRESS_LEVEL', COMPRESS_LEVEL)
+
+    @app.after_request
+    def _compress(response):
+        return compressresponse(response, min_bytes, level)
@@ -0,0 +1,77 @@
+# Name      : counters
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Dashboard counters kept up to date by SQLAlchemy events in the same transaction as the change.
+
+from sqlalchemy import event, func, insert, inspect, select, update
+
+from . import db
+from .models import DashboardCounter, Inspection, User
+
+USER_COUNTER = 'users'
+INSPECTION_COUNTER = 'inspections'
+ROLE_COUNTER_PREFIX = 'users:'
+
+
+def rolecounter(role):
+    return f'{ROLE_COUNTER_PREFIX}{role}'
+
+
+def bumpcounter(connection, name, delta):
+    '''function to add delta to a counter on the given connection, creating the counter if it does not exist'''
+    if not delta:
+        return
+    result = connection.execute(update(DashboardCounter).where(DashboardCounter.name == name)
+                                .values(value=DashboardCounter.value + delta))
+    if result.rowcount == 0:
+        connection.execute(insert(DashboardCounter).values(name=name, value=delta))
+
+
+def readcounters():
+    '''function to read every counter in one query, returns a dict of name to value'''
+    return dict(db.session.execute(select(DashboardCounter.name, DashboardCounter.value)).all())
+
+
+def reconcilecounters(commit=True):
+    '''function to rebuild every counter from the underlying tables, returns the new counters. commit=False leaves
+    the rebuild in the caller's transaction'''
+    counters = {USER_COUNTER: db.session.execute(select(func.count(User.id))).scalar(),
+                INSPECTION_COUNTER: db.session.execute(select(func.count(Inspection.id))).scalar()}
+    for role, count in db.session.execute(select(User.user_role, func.count(User.id)).group_by(User.user_role)):
+        counters[rolecounter(role)] = count
+    db.session.execute(DashboardCounter.__table__.delete())
+    db.session.execute(insert(DashboardCounter), [{'name': name, 'value': value} for name, value in counters.items()])
+    if commit:
+        db.session.commit()
+    return counters
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    bumpcounter(connection, USER_COUNTER, 1)
+    bumpcounter(connection, rolecounter(target.user_role), 1)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    bumpcounter(connection, USER_COUNTER, -1)
+    bumpcounter(connection, rolecounter(target.user_role), -1)
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    history = inspect(target).attrs.user_role.history
+    if history.deleted and history.added:
+        bumpcounter(connection, rolecounter(history.deleted[0]), -1)
+        bumpcounter(connection, rolecounter(history.added[0]), 1)
+
+
+@event.listens_for(Inspection, 'after_insert')
+def _inspection_inserted(mapper, connection, target):
+    bumpcounter(connection, INSPECTION_COUNTER, 1)
+
+
+@event.listens_for(Inspection, 'after_delete')
+def _inspection_deleted(mapper, connection, target):
+    bumpcounter(connection, INSPECTION_COUNTER, -1)
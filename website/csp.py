@@ -1,11 +1,15 @@
 # Name      : csp
 # Author    : Patrick Cronin
 # Date      : 21/07/2025
-# Updated   : 18/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Define and enforce CSP
 
+import logging
+
 from flask import Response, request, Blueprint
 
+from .cspreports import cspqueue, allowreport, parsereports, CSP_MAX_REPORT_BYTES
+
 CSP_POLICY = "default-src 'self'; script-src 'self';"
 
 csp = Blueprint('csp', __name__)
@@ -19,9 +23,19 @@ def after_request(response: Response):
     return response
 
 
-# blueprint route for content security policy reporting
+# blueprint route for content security policy reporting, reports are queued for a background thread to write in
+# batches so a page full of violations never holds up a worker
 @csp.route('/cspreport', methods=['POST'])
 def cspreport():
-    violations = request.get_json()
-    print('Violations:', violations)
+    if request.content_length is not None and request.content_length > CSP_MAX_REPORT_BYTES:
+        return "", 413
+    if not allowreport(request.remote_addr):
+        return "", 429
+    try:
+        # browsers send application/csp-report or application/reports+json, neither of which flask reads as json
+        Violations = parsereports(request.get_json(force=True, silent=True))
+        if Violations:
+            cspqueue().submit(Violations)
+    except Exception as e:
+        logging.error(f'error queuing csp report: {e}')
     return "", 204
@@ -0,0 +1,221 @@
+# Name      : cspreports
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Queue CSP violation reports and write them to the db in deduplicated batches from a background thread.
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit
+
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert
+
+from . import db
+from .models import CspViolation
+from .throttle import BucketLimit, MemoryBucketStore
+
+CSP_QUEUE_SIZE = 1000
+CSP_FLUSH_SECONDS = 5.0
+CSP_FLUSH_ROWS = 500
+CSP_MAX_REPORT_BYTES = 16 * 1024
+CSP_CLIENT_REPORTS = 30
+CSP_CLIENT_WINDOW = 60
+CSP_CLIENT_MAX_KEYS = 10000
+# the longest directive and uris kept, matching the csp_violation columns
+DIRECTIVE_LENGTH = 100
+URI_LENGTH = 500
+
+
+def normaliseuri(raw):
+    '''function to reduce a reported uri to scheme, host and path. the query string and fragment are dropped, every
+    page of a paged listing is one document and every cursor one more row otherwise'''
+    raw = str(raw or '').strip()
+    if not raw:
+        return ''
+    parts = urlsplit(raw)
+    if not parts.scheme or not parts.netloc:
+        # keywords such as inline, eval and data
+        return raw[:URI_LENGTH]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))[:URI_LENGTH]
+
+
+def parsereports(payload):
+    '''function to read the violations from a report body, either the report-uri form {"csp-report": {...}} or the
+    Reporting API list of {"type": "csp-violation", "body": {...}}. returns (directive, blocked_uri, document_uri)
+    tuples, anything unrecognised is skipped'''
+    if isinstance(payload, dict) and isinstance(payload.get('csp-report'), dict):
+        report = payload['csp-report']
+        entries = [(report.get('effective-directive') or report.get('violated-directive'),
+                    report.get('blocked-uri'), report.get('document-uri'))]
+    elif isinstance(payload, list):
+        entries = [(body.get('effectiveDirective'), body.get('blockedURL'), body.get('documentURL'))
+                   for body in (item.get('body') for item in payload
+                                if isinstance(item, dict) and item.get('type') == 'csp-violation')
+                   if isinstance(body, dict)]
+    else:
+        return []
+    violations = []
+    for directive, blocked_uri, document_uri in entries:
+        # older browsers report the whole directive, 'script-src 'self'', only its name groups reports
+        directive = str(directive or '').strip().split(' ')[0][:DIRECTIVE_LENGTH]
+        if directive:
+            violations.append((directive, normaliseuri(blocked_uri), normaliseuri(document_uri)))
+    return violations
+
+
+def writeviolations(rows):
+    '''function to add a batch of aggregated violations to the csp_violation table with one executemany, each row a
+    dict of directive, blocked_uri, document_uri, count, first_seen and last_seen'''
+    if not rows:
+        return
+    statement = insert(CspViolation)
+    statement = statement.on_conflict_do_update(
+        index_elements=['directive', 'blocked_uri', 'document_uri'],
+        set_={'count': CspViolation.count + statement.excluded.count, 'last_seen': statement.excluded.last_seen})
+    with db.engine.begin() as connection:
+        connection.execute(statement, rows)
+
+
+class CspReportQueue:
+    """bounded queue of violations drained by one background thread per worker. the thread counts repeats of the same
+    (directive, blocked uri, document uri) and writes them every flush_seconds, or sooner once flush_rows distinct
+    violations are waiting. a full queue drops reports rather than hold up the request."""
+
+    def __init__(self, app, maxsize=CSP_QUEUE_SIZE, flush_seconds=CSP_FLUSH_SECONDS, flush_rows=CSP_FLUSH_ROWS,
+                 writer=writeviolations):
+        self.app = app
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        self.writer = writer
+        self.received = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._registered = False
+        self._stopping = threading.Event()
+
+    def submit(self, violations):
+        '''function to queue violations for the next batch, returns False if the queue was full and some were dropped'''
+        self._ensurethread()
+        seen = datetime.now(timezone.utc).replace(tzinfo=None)
+        queued = 0
+        for violation in violations:
+            try:
+                self._queue.put_nowait((violation, seen))
+            except queue.Full:
+                break
+            queued += 1
+        # once the queue is full the rest of the report is dropped too, every one of them is counted
+        with self._lock:
+            self.received += len(violations)
+            self.dropped += len(violations) - queued
+        return queued == len(violations)
+
+    def _ensurethread(self):
+        # started on first use in each worker, a thread started before a fork is not running in the child
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='csp-reports', daemon=True)
+            self._thread.start()
+            if not self._registered:
+                # a clean shutdown writes the last batch rather than losing up to flush_seconds of reports
+                atexit.register(self.stop)
+                self._registered = True
+
+    def _run(self):
+        pending = {}
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            # None is the wake up stop() sends
+            if item is not None:
+                key, seen = item
+                count, first, _ = pending.get(key, (0, seen, seen))
+                pending[key] = (count + 1, first, seen)
+            drained = self._stopping.is_set() and self._queue.empty()
+            if pending and (drained or len(pending) >= self.flush_rows or time.monotonic() >= deadline):
+                self._flush(pending)
+                pending = {}
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+            if drained:
+                return
+
+    def _flush(self, pending):
+        rows = [{'directive': directive, 'blocked_uri': blocked_uri, 'document_uri': document_uri, 'count': count,
+                 'first_seen': first, 'last_seen': last}
+                for (directive, blocked_uri, document_uri), (count, first, last) in pending.items()]
+        try:
+            with self.app.app_context():
+                self.writer(rows)
+            with self._lock:
+                self.written += len(rows)
+        except Exception as e:
+            # the batch is lost rather than retried, a violation that keeps happening is reported again
+            logging.error(f'error writing {len(rows)} csp violations: {e}')
+            with self._lock:
+                self.failed += len(rows)
+
+    def stop(self, timeout=5.0):
+        '''function to write whatever is queued and stop the thread, used at exit and by the tests'''
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # the thread has plenty to take off the queue, it sees the stop between items
+            pass
+        thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {'received': self.received, 'dropped': self.dropped, 'written': self.written,
+                    'failed': self.failed, 'queued': self._queue.qsize()}
+
+
+def cspqueue():
+    '''function to return the CSP report queue for the current app, sized from the CSP_QUEUE_* settings'''
+    reports = current_app.extensions.get('csp_queue')
+    if reports is None:
+        config = current_app.config
+        reports = current_app.extensions.setdefault('csp_queue', CspReportQueue(
+            current_app._get_current_object(), config.get('CSP_QUEUE_SIZE', CSP_QUEUE_SIZE),
+            config.get('CSP_FLUSH_SECONDS', CSP_FLUSH_SECONDS), config.get('CSP_FLUSH_ROWS', CSP_FLUSH_ROWS)))
+    return reports
+
+
+def cspthrottle():
+    '''function to return the per client limit on CSP reports for the current app, (store, limit)'''
+    throttle = current_app.extensions.get('csp_throttle')
+    if throttle is None:
+        config = current_app.config
+        throttle = current_app.extensions.setdefault('csp_throttle', (
+            MemoryBucketStore(config.get('CSP_CLIENT_MAX_KEYS', CSP_CLIENT_MAX_KEYS)),
+            BucketLimit(config.get('CSP_CLIENT_REPORTS', CSP_CLIENT_REPORTS),
+                        config.get('CSP_CLIENT_WINDOW', CSP_CLIENT_WINDOW))))
+    return throttle
+
+
+def allowreport(client):
+    '''function to charge a report to the client's bucket, returns False once it has sent too many'''
+    store, limit = cspthrottle()
+    allowed, _ = store.take(f'csp:ip:{client}', limit)
+    return allowed
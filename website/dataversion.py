@@ -0,0 +1,97 @@
+# Name      : dataversion
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Shared version stamps for cached data so every worker can tell when its copy is stale.
+
+import threading
+import time
+
+from sqlalchemy import event, insert, inspect, select, update
+
+from . import db
+from .models import DataVersion, Site, Asset, Inspection, User
+
+REFERENCE_SCOPE = 'reference'
+SITE_SCOPE = 'sites'
+ASSET_SCOPE = 'assets'
+INSPECTION_SCOPE = 'inspections'
+USER_SCOPE = 'users'
+# the user columns the user cache copies, a change to any other one such as the password leaves it valid
+USER_CACHED_COLUMNS = ('username', 'first_name', 'surname', 'user_role')
+VERSION_CHECK_SECONDS = 2.0
+
+
+def getversion(scope):
+    '''function to read the version stamp for a scope with one primary key lookup, 0 if it has never been bumped'''
+    return db.session.execute(select(DataVersion.version).where(DataVersion.scope == scope)).scalar() or 0
+
+
+def getversions(scopes):
+    '''function to read the version stamps for several scopes in one query, returns a dict of scope to version'''
+    versions = dict(db.session.execute(select(DataVersion.scope, DataVersion.version)
+                                       .where(DataVersion.scope.in_(scopes))).all())
+    return {scope: versions.get(scope, 0) for scope in scopes}
+
+
+class VersionCheck:
+    """a scope's version stamp as this worker last read it, read again at most every interval seconds so a cache
+    hit costs no query. another worker's change is seen within the interval, this worker's own changes call expire()
+    so they are seen on the next read"""
+
+    def __init__(self, scope, interval=VERSION_CHECK_SECONDS, clock=time.monotonic):
+        self.scope = scope
+        self.interval = interval
+        self._clock = clock
+        self._version = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        now = self._clock()
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.interval:
+                return self._version
+        version = getversion(self.scope)
+        with self._lock:
+            self._version, self._checked = version, now
+        return version
+
+    def expire(self):
+        with self._lock:
+            self._checked = None
+
+
+def bumpversion(scope, connection=None):
+    '''function to move a scope on to a new version in the current transaction, caches built on the old version
+    are dropped by every worker once it commits'''
+    if connection is None:
+        connection = db.session.connection()
+    result = connection.execute(update(DataVersion).where(DataVersion.scope == scope)
+                                .values(version=DataVersion.version + 1))
+    if result.rowcount == 0:
+        connection.execute(insert(DataVersion).values(scope=scope, version=1))
+
+
+def _versionlistener(scope):
+    def changed(mapper, connection, target):
+        bumpversion(scope, connection)
+    return changed
+
+
+# ORM writes move the site, asset and inspection stamps on, bulk write paths call bumpversion themselves
+for _model, _scope in ((Site, SITE_SCOPE), (Asset, ASSET_SCOPE), (Inspection, INSPECTION_SCOPE)):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _versionlistener(_scope))
+
+
+@event.listens_for(User, 'after_update')
+def _userchanged(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in USER_CACHED_COLUMNS):
+        bumpversion(USER_SCOPE, connection)
+
+
+@event.listens_for(User, 'after_delete')
+def _userdeleted(mapper, connection, target):
+    bumpversion(USER_SCOPE, connection)
@@ -0,0 +1,96 @@
+# Name      : export
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Streaming CSV and JSONL export of the inspection history.
+
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+
+from . import db
+from .models import Asset, Site, User, Inspection, Condition
+
+EXPORT_YIELD_PER = 1000
+EXPORT_BUFFER_SIZE = 64 * 1024
+EXPORT_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+EXPORT_COLUMNS = (Inspection.id, Inspection.equip_no, Asset.description.label('asset_description'),
+                  Asset.equip_class, Site.site_no, Site.description.label('site_description'),
+                  Inspection.condition_code, Condition.condition_description, Inspection.chain_length,
+                  Inspection.chain_pitch_length, Inspection.measure_mean_pitch_length, Inspection.pitches_measured,
+                  Inspection.lc_health_score, Inspection.asset_passed, Inspection.insp_date, User.username,
+                  User.first_name, User.surname)
+
+
+def exportquery(date_from=None, date_to=None, site_no=None):
+    '''function to build the inspection history query with its asset, site, user and condition details.
+    outer joins are used so inspections are never dropped from the export because reference data is missing.'''
+    query = (select(*EXPORT_COLUMNS)
+             .outerjoin(Asset, Inspection.equip_no == Asset.equip_no)
+             .outerjoin(Site, Asset.site_no == Site.site_no)
+             .outerjoin(User, Inspection.user_id == User.id)
+             .outerjoin(Condition, Inspection.condition_code == Condition.condition_code))
+    if date_from is not None:
+        query = query.where(Inspection.insp_date >= date_from)
+    if date_to is not None:
+        query = query.where(Inspection.insp_date < date_to)
+    if site_no is not None:
+        query = query.where(Asset.site_no == site_no)
+    return query.order_by(Inspection.id)
+
+
+def exportrows(query):
+    '''function to stream rows from a server side cursor, only EXPORT_YIELD_PER rows are held at a time'''
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_YIELD_PER))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def _jsonvalue(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def exportlines(rows, export_format='csv'):
+    '''function to turn rows in to buffered chunks of CSV or JSONL text of roughly EXPORT_BUFFER_SIZE'''
+    names = [column.key for column in EXPORT_COLUMNS]
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+    for row in rows:
+        if export_format == 'csv':
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps({name: _jsonvalue(value) for name, value in zip(names, row)}))
+            buffer.write('\n')
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzipchunks(chunks):
+    '''function to gzip a stream of text chunks on the fly'''
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def exportstream(query, export_format='csv', compress=False):
+    '''function returning the byte stream for an export response'''
+    chunks = exportlines(exportrows(query), export_format)
+    if compress:
+        return gzipchunks(chunks)
+    return (chunk.encode() for chunk in chunks)
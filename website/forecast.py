@@ -0,0 +1,180 @@
+# Name      : forecast
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Per asset wear trend of health score over time and the date it will cross the pass threshold.
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import delete, event, func, select, true
+from sqlalchemy.dialects.sqlite import insert
+
+from . import db
+from .dataversion import bumpversion, INSPECTION_SCOPE
+from .inspections import PASS_SCORE_THRESHOLD
+from .latestinspection import changedequipnos
+from .models import Asset, AssetWearTrend, Inspection, Site
+
+FORECAST_MIN_POINTS = 2
+FORECAST_DAYS = 90
+MAX_FORECAST_DAYS = 3650
+MAX_CROSSING_DAYS = 36500
+SECONDS_PER_DAY = 86400.0
+SUM_COLUMNS = ('points', 'sum_t', 'sum_y', 'sum_tt', 'sum_ty')
+
+
+def fittrends(points, sum_t, sum_y, sum_tt, sum_ty):
+    '''function to solve the least squares line through each asset's (days, health score) points from their running
+    sums. returns (slopes in score per day, intercepts), NaN where there are too few points or they share one date.'''
+    points, sum_t, sum_y, sum_tt, sum_ty = (np.asarray(v, dtype=float) for v in (points, sum_t, sum_y, sum_tt, sum_ty))
+    denominator = points * sum_tt - sum_t * sum_t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        usable = (points >= FORECAST_MIN_POINTS) & (np.abs(denominator) > 1e-9)
+        slopes = np.where(usable, (points * sum_ty - sum_t * sum_y) / denominator, np.nan)
+        intercepts = np.where(usable, (sum_y - slopes * sum_t) / points, np.nan)
+    return slopes, intercepts
+
+
+def crossingdays(slopes, intercepts, threshold=None):
+    '''function to find the day each trend line falls to the pass threshold, NaN where the score is not falling'''
+    threshold = PASS_SCORE_THRESHOLD if threshold is None else threshold
+    slopes, intercepts = np.asarray(slopes, dtype=float), np.asarray(intercepts, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(slopes < 0, (threshold - intercepts) / slopes, np.nan)
+    # a wear rate close to zero puts the crossing centuries away, treat it as no forecast
+    return np.where(np.abs(days) <= MAX_CROSSING_DAYS, days, np.nan)
+
+
+def batchsums(connection, where):
+    '''function to total the regression sums of the scored inspections matching where, per asset, in one aggregate
+    query. t is measured in days from each asset's earliest matching inspection, which is returned as its origin.'''
+    origin = func.min(Inspection.insp_date).over(partition_by=Inspection.equip_no)
+    scored = select(Inspection.equip_no, Inspection.insp_date, Inspection.lc_health_score.label('score'),
+                    (func.julianday(Inspection.insp_date) - func.julianday(origin)).label('t')) \
+        .where(where, Inspection.lc_health_score.is_not(None), Inspection.insp_date.is_not(None)).subquery()
+    return connection.execute(select(scored.c.equip_no, func.min(scored.c.insp_date), func.count(),
+                                     func.sum(scored.c.t), func.sum(scored.c.score),
+                                     func.sum(scored.c.t * scored.c.t), func.sum(scored.c.t * scored.c.score))
+                              .group_by(scored.c.equip_no)).all()
+
+
+def mergesums(connection, deltas, sign=1):
+    '''function to add (sign=1) or take away (sign=-1) per asset regression sums from the stored trends and refit
+    them. deltas are (equip_no, origin, points, sum_t, sum_y, sum_tt, sum_ty) rows as batchsums returns. only the
+    trend rows of those assets are read and written, their inspection history is never rescanned.'''
+    if not deltas:
+        return
+    stored = {row[0]: (row[1], tuple(row[2:])) for row in connection.execute(
+        select(AssetWearTrend.equip_no, AssetWearTrend.origin, *[getattr(AssetWearTrend, c) for c in SUM_COLUMNS])
+        .where(AssetWearTrend.equip_no.in_({delta[0] for delta in deltas})))}
+
+    merged = {}
+    for equip_no, origin, n, st, sy, stt, sty in deltas:
+        base_origin, base = stored.get(equip_no, (origin, (0, 0.0, 0.0, 0.0, 0.0)))
+        # move the delta's t on to the stored origin: t' = t + d
+        d = (origin - base_origin).total_seconds() / SECONDS_PER_DAY
+        st, stt, sty = st + n * d, stt + 2 * d * st + n * d * d, sty + d * sy
+        sums = [b + sign * v for b, v in zip(base, (n, st, sy, stt, sty))]
+        stored[equip_no] = (base_origin, sums)
+        merged[equip_no] = (base_origin, sums)
+
+    gone = [equip_no for equip_no, (_, sums) in merged.items() if sums[0] <= 0]
+    if gone:
+        connection.execute(delete(AssetWearTrend).where(AssetWearTrend.equip_no.in_(gone)))
+    kept = [(equip_no, origin, sums) for equip_no, (origin, sums) in merged.items() if sums[0] > 0]
+    if not kept:
+        return
+
+    slopes, intercepts = fittrends(*zip(*[sums for _, _, sums in kept]))
+    days = crossingdays(slopes, intercepts)
+    statement = insert(AssetWearTrend)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[AssetWearTrend.equip_no],
+        set_={name: statement.excluded[name] for name in ('origin', *SUM_COLUMNS, 'slope', 'intercept',
+                                                          'predicted_fail_date')}), [
+        {'equip_no': equip_no, 'origin': origin, **dict(zip(SUM_COLUMNS, sums)),
+         'slope': None if np.isnan(slopes[i]) else float(slopes[i]),
+         'intercept': None if np.isnan(intercepts[i]) else float(intercepts[i]),
+         'predicted_fail_date': None if np.isnan(days[i]) else origin + timedelta(days=float(days[i]))}
+        for i, (equip_no, origin, sums) in enumerate(kept)])
+
+
+def recordtrends(connection, where):
+    '''function to add newly written inspections matching where, e.g. one id or an id range from a bulk insert, to
+    their assets' trends'''
+    mergesums(connection, batchsums(connection, where))
+
+
+def refreshtrends(connection, equip_nos=None):
+    '''function to refit the trends of the given assets, or every asset when equip_nos is None, from their whole
+    inspection history. used after bulk updates that change scores already counted in the sums.'''
+    clear = delete(AssetWearTrend)
+    where = true()
+    if equip_nos is not None:
+        equip_nos = list(set(equip_nos))
+        if not equip_nos:
+            return
+        clear = clear.where(AssetWearTrend.equip_no.in_(equip_nos))
+        where = Inspection.equip_no.in_(equip_nos)
+    connection.execute(clear)
+    mergesums(connection, batchsums(connection, where))
+
+
+def rebuildtrends(commit=True):
+    '''function to rebuild every asset's trend from the inspection history, returns the number of assets with one.
+    commit=False leaves the rebuild in the caller's transaction'''
+    refreshtrends(db.session.connection())
+    # the forecast and any page or API response cached on the inspections version show the predicted dates
+    bumpversion(INSPECTION_SCOPE)
+    count = db.session.execute(select(func.count()).select_from(AssetWearTrend)).scalar()
+    if commit:
+        db.session.commit()
+    return count
+
+
+def parsedays(raw):
+    '''function to parse a forecast horizon in days from a query string, clamped to 0 to MAX_FORECAST_DAYS'''
+    return min(max(int(raw), 0), MAX_FORECAST_DAYS)
+
+
+def duebefore(days, now=None):
+    '''function to return the latest predicted fail date that counts as due within days'''
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    return now + timedelta(days=days)
+
+
+def forecastquery():
+    '''function to build the forecast listing query, each asset with a wear trend heading for a fail date and its
+    site. trends with no wear or too few points have no predicted date and are left out'''
+    return db.session.query(AssetWearTrend.equip_no, AssetWearTrend.predicted_fail_date, AssetWearTrend.slope,
+                            AssetWearTrend.points, Asset.description, Site.description.label('site_desc')) \
+        .join(Asset, AssetWearTrend.equip_no == Asset.equip_no) \
+        .outerjoin(Site, Asset.site_no == Site.site_no) \
+        .filter(AssetWearTrend.predicted_fail_date.isnot(None))
+
+
+def duetofail(days=FORECAST_DAYS, now=None):
+    '''function to list the assets whose trend crosses the pass threshold within days, soonest first. a range scan
+    of the predicted_fail_date index, assets already past their predicted date are included.'''
+    return forecastquery().filter(AssetWearTrend.predicted_fail_date <= duebefore(days, now)) \
+        .order_by(AssetWearTrend.predicted_fail_date, AssetWearTrend.equip_no)
+
+
+@event.listens_for(Inspection, 'after_insert')
+def _inspection_inserted(mapper, connection, target):
+    # insp_date usually comes from the column default so the point is read back from what was stored
+    if target.lc_health_score is not None:
+        recordtrends(connection, Inspection.id == target.id)
+
+
+@event.listens_for(Inspection, 'after_update')
+def _inspection_updated(mapper, connection, target):
+    refreshtrends(connection, changedequipnos(target))
+
+
+@event.listens_for(Inspection, 'after_delete')
+def _inspection_deleted(mapper, connection, target):
+    if target.lc_health_score is not None and target.insp_date is not None:
+        mergesums(connection, [(target.equip_no, target.insp_date, 1, 0.0, float(target.lc_health_score), 0.0, 0.0)],
+                  sign=-1)
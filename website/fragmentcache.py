@@ -0,0 +1,86 @@
+# Name      : fragmentcache
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Bounded LRU cache of rendered template fragments keyed by the version stamps of the data they show.
+
+import sys
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from markupsafe import Markup
+
+from .dataversion import getversions
+
+FRAGMENT_CACHE_BYTES = 8 * 1024 * 1024
+
+
+class FragmentCache:
+    """least recently used rendered fragments, bounded by the memory their html holds rather than a count as an assets
+    page is a hundred times the size of a sites page. entries are keyed by the data version they were rendered from,
+    so a write never has to find them, they stop being asked for and age out."""
+
+    def __init__(self, maxbytes=FRAGMENT_CACHE_BYTES):
+        self.maxbytes = maxbytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        html = render()
+        size = sys.getsizeof(html)
+        # a fragment bigger than the whole cache would only push everything else out before being dropped itself
+        if size > self.maxbytes:
+            return html
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (html, size)
+            self.bytes += size
+            while self.bytes > self.maxbytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'bytes': self.bytes,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+def fragmentcache():
+    '''function to return the fragment cache for the current app, sized from FRAGMENT_CACHE_BYTES'''
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('fragment_cache', FragmentCache(
+            current_app.config.get('FRAGMENT_CACHE_BYTES', FRAGMENT_CACHE_BYTES)))
+    return cache
+
+
+def cachedfragment(name, scopes, args, render):
+    '''function to return the html render() builds for a fragment, rendering it only when the data in scopes has
+    moved on since it was last rendered with the same query string. a hit costs one read of the version stamps, or
+    nothing at all for a fragment with no scopes. render() must not depend on the user, only on args and the data.'''
+    versions = getversions(scopes) if scopes else {}
+    key = (name, tuple(versions[scope] for scope in scopes), tuple(sorted(args.items(multi=True))))
+    return Markup(fragmentcache().get(key, lambda: str(render())))
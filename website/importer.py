@@ -0,0 +1,214 @@
+# Name      : importer
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Streaming bulk import of inspections from CSV files.
+
+import csv
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from . import db
+from .counters import bumpcounter, INSPECTION_COUNTER
+from .dataversion import bumpversion, INSPECTION_SCOPE
+from .latestinspection import recordlatest
+from .forecast import recordtrends
+from .inspections import batchscore, MIN_CHAIN_LENGTH, MAX_CHAIN_LENGTH, MIN_PITCH_LENGTH, MAX_PITCH_LENGTH, \
+    MIN_PITCHES_MEASURED
+from .models import Asset, Inspection
+from .refcache import conditions
+
+IMPORT_CHUNK_SIZE = 2000
+IMPORT_COMMIT_ROWS = 50000
+LIFTING_CHAIN_CLASS = 'C5'
+CHAIN_FIELDS = ('chain_length', 'chain_pitch_length', 'measure_mean_pitch_length', 'pitches_measured')
+
+
+class ImportReport:
+    """counts and per-row errors from a bulk import"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+        self.error = None
+
+    def reject(self, row, errors):
+        self.rejected += 1
+        self.errors.append({'row': row, 'errors': errors})
+
+    def todict(self):
+        return {'inserted': self.inserted, 'rejected': self.rejected, 'errors': self.errors, 'error': self.error}
+
+
+def _number(fields, name, cast, errors):
+    raw = (fields.get(name) or '').strip()
+    if raw == '':
+        errors.append(f'{name} is required')
+        return None
+    try:
+        return cast(raw)
+    except ValueError:
+        errors.append(f'{name} must be a number')
+        return None
+
+
+def parseinspection(fields, condition_codes, default_date):
+    '''function to validate one inspection's raw fields against the inspection limits without touching the db.
+    returns (record, errors) where record is ready to insert once scored and user_id is set.'''
+    errors = []
+    record = {'equip_no': _number(fields, 'equip_no', int, errors)}
+
+    condition = (fields.get('condition_code') or '').strip()
+    if condition == '':
+        errors.append('condition_code is required')
+    elif condition not in condition_codes:
+        errors.append(f'condition_code {condition} does not exist')
+    record['condition_code'] = condition
+
+    if any((fields.get(name) or '').strip() for name in CHAIN_FIELDS):
+        chain_length = _number(fields, 'chain_length', float, errors)
+        pitch_length = _number(fields, 'chain_pitch_length', int, errors)
+        measured = _number(fields, 'measure_mean_pitch_length', int, errors)
+        pitches = _number(fields, 'pitches_measured', int, errors)
+        if chain_length is not None and not MIN_CHAIN_LENGTH <= chain_length <= MAX_CHAIN_LENGTH:
+            errors.append(f'chain_length must be between {MIN_CHAIN_LENGTH} and {MAX_CHAIN_LENGTH} m')
+        if pitch_length is not None and not MIN_PITCH_LENGTH <= pitch_length <= MAX_PITCH_LENGTH:
+            errors.append(f'chain_pitch_length must be between {MIN_PITCH_LENGTH} and {MAX_PITCH_LENGTH} mm')
+        if measured is not None and pitch_length is not None and measured < pitch_length:
+            errors.append('measure_mean_pitch_length must be greater than or equal to chain_pitch_length')
+        if pitches is not None and pitches < MIN_PITCHES_MEASURED:
+            errors.append(f'pitches_measured must be at least {MIN_PITCHES_MEASURED}')
+        record.update(chain_length=chain_length, chain_pitch_length=pitch_length,
+                      measure_mean_pitch_length=measured, pitches_measured=pitches)
+    else:
+        record.update(chain_length=None, chain_pitch_length=None, measure_mean_pitch_length=None,
+                      pitches_measured=None)
+
+    raw_date = (fields.get('insp_date') or '').strip()
+    if raw_date:
+        try:
+            record['insp_date'] = datetime.fromisoformat(raw_date)
+        except ValueError:
+            errors.append('insp_date must be an ISO date, e.g. 2025-08-01 or 2025-08-01T09:30')
+    else:
+        record['insp_date'] = default_date
+    return record, errors
+
+
+def assetclasses(equip_nos):
+    '''function to look up the asset class of each equip_no in one query'''
+    if not equip_nos:
+        return {}
+    return dict(db.session.execute(
+        select(Asset.equip_no, Asset.equip_class).where(Asset.equip_no.in_(set(equip_nos)))
+    ).all())
+
+
+def checkassets(candidates):
+    '''function to check candidate (row, record) pairs against the asset register.
+    returns (valid records, [(row, errors)]) where lifting chains must carry chain measurements.'''
+    classes = assetclasses([record['equip_no'] for _, record in candidates])
+    valid, rejected = [], []
+    for row, record in candidates:
+        equip_class = classes.get(record['equip_no'])
+        if equip_class is None:
+            rejected.append((row, [f"equip_no {record['equip_no']} does not exist"]))
+        elif equip_class == LIFTING_CHAIN_CLASS and record['measure_mean_pitch_length'] is None:
+            rejected.append((row, ['lifting chain inspections require chain measurements']))
+        else:
+            valid.append(record)
+    return valid, rejected
+
+
+def scorerecords(records):
+    '''function to fill in lc_health_score and asset_passed for a list of records in one vectorised call'''
+    if not records:
+        return records
+    health_scores, passed = batchscore([r['measure_mean_pitch_length'] for r in records],
+                                       [r['chain_pitch_length'] for r in records],
+                                       [r['condition_code'] for r in records])
+    for record, score, asset_passed in zip(records, health_scores, passed):
+        record['lc_health_score'] = None if np.isnan(score) else float(score)
+        record['asset_passed'] = bool(asset_passed)
+    return records
+
+
+def insertrecords(records, statement=None):
+    '''function to insert scored records with a single executemany in the current transaction, returns the number of
+    rows inserted. statement defaults to a plain insert, pass one with an on conflict clause to skip duplicates.
+    bulk inserts skip the model events so the dashboard counter, latest inspections, wear trends and data version
+    are updated here in the same transaction.'''
+    if not records:
+        return 0
+    # the new rows are the ones above the current highest id, so only they are read back for the upkeep
+    last_id = db.session.execute(select(func.coalesce(func.max(Inspection.id), 0))).scalar()
+    # executed on the connection, the ORM bulk insert would split the executemany wherever the NULL columns change
+    # between chain and other inspections
+    connection = db.session.connection()
+    if statement is None:
+        connection.execute(insert(Inspection), records)
+        inserted = len(records)
+    else:
+        connection.execute(statement, records)
+        inserted = db.session.execute(select(func.count()).where(Inspection.id > last_id)).scalar()
+    if inserted:
+        bumpcounter(connection, INSPECTION_COUNTER, inserted)
+        recordlatest(connection, Inspection.id > last_id)
+        recordtrends(connection, Inspection.id > last_id)
+        bumpversion(INSPECTION_SCOPE, connection)
+    return inserted
+
+
+def _flushchunk(candidates, user_id, report):
+    valid, rejected = checkassets(candidates)
+    for row, errors in rejected:
+        report.reject(row, errors)
+    for record in valid:
+        record['user_id'] = user_id
+    return insertrecords(scorerecords(valid))
+
+
+def importinspections(lines, user_id, chunk_size=IMPORT_CHUNK_SIZE, commit_rows=IMPORT_COMMIT_ROWS):
+    '''function to stream inspections from CSV text lines in to the inspection table.
+    rows are validated and scored a chunk at a time and inserted with one executemany per chunk, committing every
+    commit_rows rows so a large file is loaded in a few transactions without being held in memory.
+    If the db fails part way through, rows already committed stay and report.error says where it stopped.'''
+    report = ImportReport()
+    condition_codes = {condition.condition_code for condition in conditions()}
+    default_date = datetime.now(timezone.utc).replace(tzinfo=None)
+    reader = csv.DictReader(lines)
+
+    missing = {'equip_no', 'condition_code'} - set(reader.fieldnames or [])
+    if missing:
+        report.error = f"CSV is missing the {', '.join(sorted(missing))} column(s)."
+        return report
+
+    candidates, pending = [], 0
+    try:
+        for fields in reader:
+            # header is row 1 so data rows line up with the line numbers a spreadsheet shows
+            row = reader.line_num
+            record, errors = parseinspection(fields, condition_codes, default_date)
+            if errors:
+                report.reject(row, errors)
+                continue
+            candidates.append((row, record))
+            if len(candidates) >= chunk_size:
+                pending += _flushchunk(candidates, user_id, report)
+                candidates = []
+                if pending >= commit_rows:
+                    db.session.commit()
+                    report.inserted += pending
+                    pending = 0
+        pending += _flushchunk(candidates, user_id, report)
+        db.session.commit()
+        report.inserted += pending
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error importing inspections: {e}')
+        report.error = f'Import stopped at row {reader.line_num}, rows after the last commit were not saved.'
+    return report
@@ -1,10 +1,11 @@
 # Name      : inspections
 # Author    : Patrick Cronin
 # Date      : 14/08/2025
-# Updated   : 15/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Functions for lifting equipment inspections, calculation of health score for lifting chains and pass status.
 
 import logging
+import numpy as np
 from flask import flash
 
 PASS_SCORE_THRESHOLD = 80
@@ -68,3 +69,54 @@ def lcpass(condition_pass, health_score):
         flash('An error occurred while processing the lifting chain score', 'error')
         logging.error(f"An error occurred while processing the lifting chain score{e}")
         raise
+
+
+def batchconditionvalues(conditions):
+    '''function to convert condition codes to a float array, codes that are missing or not numeric become NaN'''
+    try:
+        return np.asarray(conditions, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    values = np.full(len(conditions), np.nan)
+    for i, condition in enumerate(conditions):
+        try:
+            values[i] = float(condition)
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+def batchconditioncheck(conditions, condition_threshold=None):
+    '''vectorised conditioncheck, returns a boolean array that is False where the condition score has failed.
+    conditions that are not numeric fail.'''
+    if condition_threshold is None:
+        condition_threshold = CONDITION_FAILURE_THRESHOLD
+    return batchconditionvalues(conditions) < condition_threshold
+
+
+def batchhealthscore(measure_mean_pitch_lengths, chain_pitch_lengths):
+    '''vectorised lchealthscore, returns a float array of health scores. NaN where either length is missing or the
+    measured length is not positive, e.g. inspections of assets that are not lifting chains'''
+    measured = np.asarray(measure_mean_pitch_lengths, dtype=float)
+    nominal = np.asarray(chain_pitch_lengths, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        health_scores = (nominal / measured) * 100
+    health_scores[~(measured > 0)] = np.nan
+    return health_scores
+
+
+def batchlcpass(condition_passes, health_scores, pass_threshold=None):
+    '''vectorised lcpass, NaN health scores are judged on condition alone the same as other lifting assets'''
+    if pass_threshold is None:
+        pass_threshold = PASS_SCORE_THRESHOLD
+    health_scores = np.asarray(health_scores, dtype=float)
+    return np.asarray(condition_passes, dtype=bool) & ~(health_scores < pass_threshold)
+
+
+def batchscore(measure_mean_pitch_lengths, chain_pitch_lengths, conditions, pass_threshold=None,
+               condition_threshold=None):
+    '''function to score whole arrays of inspections in one call, returns (health scores, passed).
+    No flask coupling so it can run outside a request over a whole dataset.'''
+    health_scores = batchhealthscore(measure_mean_pitch_lengths, chain_pitch_lengths)
+    condition_passes = batchconditioncheck(conditions, condition_threshold)
+    return health_scores, batchlcpass(condition_passes, health_scores, pass_threshold)
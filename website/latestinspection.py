@@ -0,0 +1,90 @@
+# Name      : latestinspection
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Keep the newest inspection of every asset in asset_latest_inspection as inspections are written.
+
+from sqlalchemy import and_, delete, event, func, inspect, or_, select, true
+from sqlalchemy.dialects.sqlite import insert
+
+from . import db
+from .dataversion import bumpversion, INSPECTION_SCOPE
+from .models import AssetLatestInspection, Inspection
+
+LATEST_COLUMNS = ('equip_no', 'inspection_id', 'insp_date', 'lc_health_score', 'asset_passed')
+
+
+def _inspectioncolumns():
+    return (Inspection.equip_no, Inspection.id, Inspection.insp_date, Inspection.lc_health_score,
+            Inspection.asset_passed)
+
+
+def _ranked(where):
+    '''function to select the newest of the inspections matching where for each asset, newest meaning the latest
+    insp_date with the highest id breaking ties'''
+    rank = func.row_number().over(partition_by=Inspection.equip_no,
+                                  order_by=(Inspection.insp_date.desc(), Inspection.id.desc()))
+    ranked = select(*_inspectioncolumns(), rank.label('rank')).where(where).subquery()
+    return select(ranked.c.equip_no, ranked.c.id, ranked.c.insp_date, ranked.c.lc_health_score,
+                  ranked.c.asset_passed).where(ranked.c.rank == 1)
+
+
+def recordlatest(connection, where):
+    '''function to make newly written inspections matching where, e.g. one id or an id range from a bulk insert, the
+    latest for their asset unless the asset already has a newer one. only the new rows are read.'''
+    statement = insert(AssetLatestInspection).from_select(LATEST_COLUMNS, _ranked(where))
+    new, current = statement.excluded, AssetLatestInspection
+    newer = or_(func.coalesce(new.insp_date, '') > func.coalesce(current.insp_date, ''),
+                and_(func.coalesce(new.insp_date, '') == func.coalesce(current.insp_date, ''),
+                     new.inspection_id > current.inspection_id))
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[AssetLatestInspection.equip_no],
+        set_={name: new[name] for name in LATEST_COLUMNS[1:]},
+        where=newer))
+
+
+def refreshlatest(connection, equip_nos=None):
+    '''function to recalculate the latest inspection from the inspection history for the given assets, or every
+    asset when equip_nos is None. assets left with no inspections drop out of the table.'''
+    clear = delete(AssetLatestInspection)
+    where = true()
+    if equip_nos is not None:
+        equip_nos = list(set(equip_nos))
+        if not equip_nos:
+            return
+        clear = clear.where(AssetLatestInspection.equip_no.in_(equip_nos))
+        where = Inspection.equip_no.in_(equip_nos)
+    connection.execute(clear)
+    connection.execute(insert(AssetLatestInspection).from_select(LATEST_COLUMNS, _ranked(where)))
+
+
+def rebuildlatest(commit=True):
+    '''function to rebuild the whole table from the inspection history, returns the number of assets in it.
+    commit=False leaves the rebuild in the caller's transaction'''
+    refreshlatest(db.session.connection())
+    # the asset pages and API responses cached on the inspections version show the latest inspections
+    bumpversion(INSPECTION_SCOPE)
+    count = db.session.execute(select(func.count()).select_from(AssetLatestInspection)).scalar()
+    if commit:
+        db.session.commit()
+    return count
+
+
+@event.listens_for(Inspection, 'after_insert')
+def _inspection_inserted(mapper, connection, target):
+    recordlatest(connection, Inspection.id == target.id)
+
+
+def changedequipnos(target):
+    '''function to return the asset an updated inspection is on and, when the update moved it, the one it was on'''
+    return [target.equip_no, *inspect(target).attrs.equip_no.history.deleted]
+
+
+@event.listens_for(Inspection, 'after_update')
+def _inspection_updated(mapper, connection, target):
+    refreshlatest(connection, changedequipnos(target))
+
+
+@event.listens_for(Inspection, 'after_delete')
+def _inspection_deleted(mapper, connection, target):
+    refreshlatest(connection, [target.equip_no])
@@ -0,0 +1,382 @@
+# Name      : metrics
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Request latency, status code, SQL and connection pool metrics served at /metrics in Prometheus format.
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request, Response
+from sqlalchemy import event
+
+from . import db
+from .usercache import usercache
+from .fragmentcache import fragmentcache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_FLUSH_SECONDS = 5
+# totals of the workers that have exited, folded together so the directory does not grow with every worker started
+EXITED_FILE = 'metrics-exited.json'
+FOLD_LOCK = 'metrics-fold.lock'
+FOLD_LOCK_SECONDS = 60
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestMetrics:
+    """this worker's request and SQL totals per endpoint, cumulative since the worker started"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = {}
+        self.statements = {}
+
+    def observe(self, endpoint, method, status, seconds, statements=0, statement_seconds=0.0):
+        '''function to record one finished request'''
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            # per bucket counts then count and sum, buckets are made cumulative when rendered
+            counts = self.latency.setdefault(endpoint, [0] * (len(self.buckets) + 1) + [0.0])
+            index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+            counts[index] += 1
+            counts[-1] += seconds
+            sql = self.statements.setdefault(endpoint, [0, 0.0])
+            sql[0] += statements
+            sql[1] += statement_seconds
+
+    def snapshot(self):
+        '''function to copy the totals in to a JSON safe dict'''
+        with self._lock:
+            return {'buckets': list(self.buckets),
+                    'requests': [[*key, value] for key, value in self.requests.items()],
+                    'latency': {endpoint: list(counts) for endpoint, counts in self.latency.items()},
+                    'statements': {endpoint: list(sql) for endpoint, sql in self.statements.items()}}
+
+
+def poolstats(engine):
+    '''function to read the connection pool gauges of an engine, pools without a fixed size report what they can'''
+    pool = engine.pool
+    stats = {}
+    for name, method in (('db_pool_size', 'size'), ('db_pool_checked_out', 'checkedout'),
+                         ('db_pool_overflow', 'overflow'), ('db_pool_checked_in', 'checkedin')):
+        if hasattr(pool, method):
+            try:
+                stats[name] = getattr(pool, method)()
+            except Exception as e:
+                logging.error(f'error reading pool {method}: {e}')
+    # QueuePool counts overflow up from -size while the pool fills, only connections beyond the size are overflow
+    if 'db_pool_overflow' in stats:
+        stats['db_pool_overflow'] = max(stats['db_pool_overflow'], 0)
+    return stats
+
+
+def gaugesnapshot():
+    '''function to read this worker's point in time gauges, the pool and what the caches hold'''
+    gauges = {}
+    for engine in db.engines.values():
+        for name, value in poolstats(engine).items():
+            gauges[name] = gauges.get(name, 0) + value
+    gauges['user_cache_size'] = usercache().stats()['size']
+    stats = fragmentcache().stats()
+    gauges.update(fragment_cache_size=stats['size'], fragment_cache_bytes=stats['bytes'])
+    return gauges
+
+
+def countersnapshot():
+    '''function to read this worker's cache totals, cumulative since the worker started'''
+    users, fragments = usercache().stats(), fragmentcache().stats()
+    return {'user_cache_hits_total': users['hits'], 'user_cache_misses_total': users['misses'],
+            'fragment_cache_hits_total': fragments['hits'], 'fragment_cache_misses_total': fragments['misses'],
+            'fragment_cache_evictions_total': fragments['evictions']}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def writesnapshot(directory, snapshot):
+    '''function to publish a worker's snapshot for the other workers to merge, replaced atomically. the file is
+    named by pid and start time, a new worker given an exited one's pid must not overwrite its totals. a snapshot
+    with no pid is the exited workers' totals'''
+    name = f"metrics-{snapshot['pid']}-{snapshot['started']}.json" if 'pid' in snapshot else EXITED_FILE
+    path = os.path.join(directory, name)
+    temp = f'{path}.tmp'
+    with open(temp, 'w') as handle:
+        json.dump(snapshot, handle, separators=(',', ':'))
+    os.replace(temp, path)
+
+
+def readsnapshots(directory):
+    '''function to read every worker's published snapshot, unreadable files are skipped'''
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        try:
+            with open(path) as handle:
+                snapshot = json.load(handle)
+        except (OSError, ValueError) as e:
+            logging.error(f'error reading metrics snapshot {path}: {e}')
+            continue
+        snapshot['file'] = os.path.basename(path)
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def _latest(snapshots):
+    # a pid can belong to an exited worker and then a new one, only the latest started is running
+    latest = {}
+    for snapshot in snapshots:
+        if 'pid' in snapshot:
+            latest[snapshot['pid']] = max(latest.get(snapshot['pid'], 0), snapshot.get('started', 0))
+    return latest
+
+
+def _running(snapshot, latest):
+    pid = snapshot.get('pid')
+    return pid is None or (snapshot.get('started', 0) == latest[pid] and _alive(pid))
+
+
+def foldexited(directory):
+    '''function to add the snapshots of workers that have exited to the one file of exited totals and delete them,
+    so the directory holds a file per running worker plus that one however often workers are recycled. the file
+    lists what it has folded in, a snapshot left behind by a fold that stopped part way is not counted twice.'''
+    lock = os.path.join(directory, FOLD_LOCK)
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        # another worker is folding, or died doing it and left the lock behind
+        try:
+            if time.time() - os.path.getmtime(lock) > FOLD_LOCK_SECONDS:
+                os.remove(lock)
+        except OSError:
+            pass
+        return
+    try:
+        snapshots = readsnapshots(directory)
+        exited = next((snapshot for snapshot in snapshots if snapshot['file'] == EXITED_FILE), {})
+        done = set(exited.get('folded', []))
+        latest = _latest(snapshots)
+        folding = [snapshot for snapshot in snapshots
+                   if 'pid' in snapshot and snapshot['file'] not in done and not _running(snapshot, latest)]
+        if not folding:
+            return
+        merged = mergesnapshots([exited] + folding)
+        folded = [snapshot['file'] for snapshot in folding]
+        # still listed until its file is gone, in case deleting it failed last time
+        folded += [name for name in done if os.path.exists(os.path.join(directory, name))]
+        writesnapshot(directory, {'buckets': merged['buckets'],
+                                  'requests': [[*key, value] for key, value in merged['requests'].items()],
+                                  'latency': merged['latency'], 'statements': merged['statements'],
+                                  'counters': merged['counters'], 'folded': folded})
+        for name in folded:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    finally:
+        os.remove(lock)
+
+
+def mergesnapshots(snapshots):
+    '''function to add up worker snapshots. request, SQL and cache totals of workers that have exited are kept so
+    counters never go backwards, gauges only count workers that are still running.'''
+    buckets = snapshots[0].get('buckets', list(LATENCY_BUCKETS)) if snapshots else list(LATENCY_BUCKETS)
+    merged = {'buckets': buckets, 'requests': {}, 'latency': {}, 'statements': {}, 'counters': {}, 'gauges': {}}
+    latest = _latest(snapshots)
+    # snapshots already added to the exited totals, only still there if deleting them failed
+    folded = {name for snapshot in snapshots for name in snapshot.get('folded', [])}
+    for snapshot in snapshots:
+        if snapshot.get('file') in folded:
+            continue
+        for *key, value in snapshot.get('requests', []):
+            merged['requests'][tuple(key)] = merged['requests'].get(tuple(key), 0) + value
+        # a worker still running with other buckets after a config change is left out of the histogram
+        if snapshot.get('buckets', buckets) == buckets:
+            for endpoint, counts in snapshot.get('latency', {}).items():
+                current = merged['latency'].setdefault(endpoint, [0] * len(counts))
+                merged['latency'][endpoint] = [a + b for a, b in zip(current, counts)]
+        for endpoint, sql in snapshot.get('statements', {}).items():
+            current = merged['statements'].setdefault(endpoint, [0, 0.0])
+            merged['statements'][endpoint] = [current[0] + sql[0], current[1] + sql[1]]
+        for name, value in snapshot.get('counters', {}).items():
+            merged['counters'][name] = merged['counters'].get(name, 0) + value
+        if _running(snapshot, latest):
+            for name, value in snapshot.get('gauges', {}).items():
+                merged['gauges'][name] = merged['gauges'].get(name, 0) + value
+    return merged
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+GAUGE_HELP = {
+    'db_pool_size': 'Connections the pool keeps open',
+    'db_pool_checked_out': 'Connections currently checked out of the pool',
+    'db_pool_overflow': 'Connections open beyond the pool size',
+    'db_pool_checked_in': 'Idle connections in the pool',
+    'user_cache_size': 'Users held in the user caches',
+    'fragment_cache_size': 'Rendered fragments held in the fragment caches',
+    'fragment_cache_bytes': 'Bytes of html held in the fragment caches',
+}
+
+COUNTER_HELP = {
+    'user_cache_hits_total': 'User cache hits',
+    'user_cache_misses_total': 'User cache misses',
+    'fragment_cache_hits_total': 'Fragment cache hits',
+    'fragment_cache_misses_total': 'Fragment cache misses',
+    'fragment_cache_evictions_total': 'Fragments evicted to stay within the cache size',
+}
+
+
+def rendermetrics(merged):
+    '''function to render merged metrics in the Prometheus text exposition format'''
+    lines = ['# HELP http_requests_total Requests handled by endpoint, method and status code',
+             '# TYPE http_requests_total counter']
+    for (endpoint, method, status), value in sorted(merged['requests'].items()):
+        lines.append(f'http_requests_total{{endpoint="{_label(endpoint)}",method="{method}",status="{status}"}} '
+                     f'{value}')
+
+    lines += ['# HELP http_request_duration_seconds Request latency by endpoint',
+              '# TYPE http_request_duration_seconds histogram']
+    bounds = [_number(float(bound)) for bound in merged['buckets']] + ['+Inf']
+    for endpoint, counts in sorted(merged['latency'].items()):
+        name = _label(endpoint)
+        cumulative = 0
+        for bound, count in zip(bounds, counts[:-1]):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_sum{{endpoint="{name}"}} {_number(float(counts[-1]))}')
+        lines.append(f'http_request_duration_seconds_count{{endpoint="{name}"}} {cumulative}')
+
+    lines += ['# HELP db_statements_total SQL statements executed by endpoint',
+              '# TYPE db_statements_total counter']
+    lines += [f'db_statements_total{{endpoint="{_label(endpoint)}"}} {sql[0]}'
+              for endpoint, sql in sorted(merged['statements'].items())]
+    lines += ['# HELP db_statement_seconds_total Time spent executing SQL by endpoint',
+              '# TYPE db_statement_seconds_total counter']
+    lines += [f'db_statement_seconds_total{{endpoint="{_label(endpoint)}"}} {_number(float(sql[1]))}'
+              for endpoint, sql in sorted(merged['statements'].items())]
+
+    for name, value in sorted(merged.get('counters', {}).items()):
+        lines += [f'# HELP {name} {COUNTER_HELP.get(name, name)}', f'# TYPE {name} counter', f'{name} {value}']
+    for name, value in sorted(merged['gauges'].items()):
+        lines += [f'# HELP {name} {GAUGE_HELP.get(name, name)}', f'# TYPE {name} gauge', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+def requestmetrics():
+    '''function to return the request metrics of the current app'''
+    return current_app.extensions.setdefault('request_metrics', RequestMetrics())
+
+
+def workerstarted():
+    '''function to return when this worker started in milliseconds, read again after a fork'''
+    worker = current_app.extensions.get('metrics_worker')
+    if worker is None or worker[0] != os.getpid():
+        worker = current_app.extensions['metrics_worker'] = (os.getpid(), int(time.time() * 1000))
+    return worker[1]
+
+
+def workersnapshot():
+    '''function to build this worker's full snapshot, its totals plus its gauges'''
+    snapshot = requestmetrics().snapshot()
+    snapshot.update(pid=os.getpid(), started=workerstarted(), counters=countersnapshot(), gauges=gaugesnapshot())
+    return snapshot
+
+
+def publish(force=False):
+    '''function to write this worker's snapshot to METRICS_DIR, at most every METRICS_FLUSH_SECONDS unless forced'''
+    directory = current_app.config.get('METRICS_DIR')
+    if not directory:
+        return
+    state = current_app.extensions.setdefault('metrics_publish', {'at': 0.0, 'lock': threading.Lock()})
+    now = time.monotonic()
+    interval = current_app.config.get('METRICS_FLUSH_SECONDS', METRICS_FLUSH_SECONDS)
+    if not force and now - state['at'] < interval:
+        return
+    if not state['lock'].acquire(blocking=force):
+        return
+    try:
+        state['at'] = now
+        writesnapshot(directory, workersnapshot())
+    except OSError as e:
+        logging.error(f'error publishing metrics to {directory}: {e}')
+    finally:
+        state['lock'].release()
+
+
+def metrics():
+    '''view for /metrics, merges every worker's snapshot when METRICS_DIR is shared between them'''
+    try:
+        directory = current_app.config.get('METRICS_DIR')
+        if directory:
+            publish(force=True)
+            foldexited(directory)
+            snapshots = readsnapshots(directory)
+        else:
+            snapshots = [workersnapshot()]
+        return Response(rendermetrics(mergesnapshots(snapshots)), mimetype=CONTENT_TYPE)
+    except Exception as e:
+        logging.error(f'error rendering metrics: {e}')
+        return 'An error occurred rendering metrics', 500
+
+
+def instrumentengine(engine):
+    '''function to time every SQL statement and add it to the totals of the request running it'''
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_started', None)
+        if started is None or not has_request_context():
+            return
+        sql = g.setdefault('metrics_sql', [0, 0.0])
+        sql[0] += 1
+        sql[1] += time.perf_counter() - started
+
+
+def instrumentapp(app):
+    '''function to register the request hooks, the SQL timing and the /metrics endpoint when METRICS_ENABLED is on'''
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        instrumentengine(engine)
+
+    @app.before_request
+    def _startrequest():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _finishrequest(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            statements, statement_seconds = g.pop('metrics_sql', (0, 0.0))
+            requestmetrics().observe(request.endpoint or 'unmatched', request.method, response.status_code,
+                                     time.perf_counter() - started, statements, statement_seconds)
+            publish()
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,122 @@
+# Name      : migrations
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Versioned schema migrations so existing databases can be upgraded in place.
+
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, text
+
+from . import db
+from .counters import reconcilecounters
+from .latestinspection import refreshlatest
+from .forecast import refreshtrends
+from .assetsearch import refreshsearch
+from .models import Asset, Inspection, Site, User, DashboardCounter, DataVersion, ThrottleBucket, \
+    AssetLatestInspection, AssetWearTrend, CspViolation
+
+
+def _createindexes(connection, table, names):
+    for index in table.indexes:
+        if index.name in names:
+            index.create(connection, checkfirst=True)
+
+
+def _0001_hot_column_indexes(connection):
+    _createindexes(connection, Inspection.__table__, {'ix_inspection_insp_date', 'ix_inspection_equip_no_insp_date',
+                                                      'ix_inspection_user_id_insp_date',
+                                                      'ix_inspection_asset_passed_insp_date'})
+    _createindexes(connection, Asset.__table__, {'ix_asset_equip_class', 'ix_asset_site_no'})
+    _createindexes(connection, Site.__table__, {'ix_site_site_no'})
+    _createindexes(connection, User.__table__, {'ix_user_user_role'})
+
+
+def _0002_dashboard_counters(connection):
+    DashboardCounter.__table__.create(connection, checkfirst=True)
+
+
+def _0003_data_versions(connection):
+    DataVersion.__table__.create(connection, checkfirst=True)
+
+
+def _0004_throttle_buckets(connection):
+    ThrottleBucket.__table__.create(connection, checkfirst=True)
+
+
+def _0005_asset_latest_inspection(connection):
+    AssetLatestInspection.__table__.create(connection, checkfirst=True)
+    refreshlatest(connection)
+
+
+def _0006_asset_wear_trend(connection):
+    AssetWearTrend.__table__.create(connection, checkfirst=True)
+    refreshtrends(connection)
+
+
+def _0007_inspection_client_key(connection):
+    if 'client_key' not in {column['name'] for column in inspect(connection).get_columns('inspection')}:
+        connection.execute(text('ALTER TABLE inspection ADD COLUMN client_key VARCHAR(64)'))
+    _createindexes(connection, Inspection.__table__, {'ux_inspection_user_id_client_key'})
+
+
+def _0008_asset_search(connection):
+    refreshsearch(connection)
+
+
+def _0009_csp_violations(connection):
+    CspViolation.__table__.create(connection, checkfirst=True)
+
+
+# (version, description, migration), append new migrations to the end and never edit one that has shipped.
+# each migration must be safe to run against a database created by db.create_all() from the current models.
+MIGRATIONS = (
+    (1, 'Indexes for inspection, asset, site and user hot columns', _0001_hot_column_indexes),
+    (2, 'Dashboard counters table', _0002_dashboard_counters),
+    (3, 'Data version stamps table', _0003_data_versions),
+    (4, 'Login throttle buckets table', _0004_throttle_buckets),
+    (5, 'Latest inspection per asset table', _0005_asset_latest_inspection),
+    (6, 'Asset wear trend table', _0006_asset_wear_trend),
+    (7, 'Inspection client idempotency key', _0007_inspection_client_key),
+    (8, 'Asset full text search index', _0008_asset_search),
+    (9, 'CSP violation reports table', _0009_csp_violations),
+)
+
+
+def _ensureversiontable(connection):
+    connection.execute(text('CREATE TABLE IF NOT EXISTS schema_version ('
+                            'version INTEGER PRIMARY KEY, description VARCHAR(100) NOT NULL, '
+                            'applied_at DATETIME NOT NULL)'))
+
+
+def schemaversion(connection):
+    '''function to return the version of the most recent migration applied to the database, 0 if none'''
+    _ensureversiontable(connection)
+    return connection.execute(text('SELECT COALESCE(MAX(version), 0) FROM schema_version')).scalar()
+
+
+def upgrade(target=None):
+    '''function to create any missing tables then apply pending migrations up to target, each in its own
+    transaction. returns a list of the (version, description) applied.'''
+    db.create_all()
+    applied = []
+    with db.engine.begin() as connection:
+        current = schemaversion(connection)
+    for version, description, migration in MIGRATIONS:
+        if version <= current or (target is not None and version > target):
+            continue
+        try:
+            with db.engine.begin() as connection:
+                migration(connection)
+                connection.execute(text('INSERT INTO schema_version (version, description, applied_at) '
+                                        'VALUES (:version, :description, :applied_at)'),
+                                   {'version': version, 'description': description,
+                                    'applied_at': datetime.now(timezone.utc).replace(tzinfo=None)})
+        except Exception as e:
+            logging.error(f'error applying migration {version}: {e}')
+            raise
+        applied.append((version, description))
+    if any(version == 2 for version, _ in applied):
+        reconcilecounters()
+    return applied
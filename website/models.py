@@ -1,7 +1,7 @@
 # NAME: models
 # AUTHOR: Patrick Cronin
 # Date: 02/08/2025
-# Update: 18/08/2025
+# Update: 18/10/2026
 # Purpose: Define model for assets, asset class, asset status, condition, inspections, sites, users and roles
 from sqlalchemy import CheckConstraint
 
@@ -17,9 +17,9 @@ class Asset(db.Model):
     equip_no = db.Column(db.Integer, nullable=False, unique=True)
     description = db.Column(db.String(50), nullable=False)
     location_on_site = db.Column(db.String(50), nullable=False)
-    site_no = db.Column(db.Integer, db.ForeignKey('site.id'), nullable=False)
+    site_no = db.Column(db.Integer, db.ForeignKey('site.id'), nullable=False, index=True)
     equip_status = db.Column(db.String(2), db.ForeignKey('assetstatus.status_id'), nullable=False)
-    equip_class = db.Column(db.String(2), db.ForeignKey('assetclass.class_id'), nullable=False)
+    equip_class = db.Column(db.String(2), db.ForeignKey('assetclass.class_id'), nullable=False, index=True)
     inspections = db.relationship('Inspection', backref='asset', lazy=True)
     __table_args__ = (
         CheckConstraint('equip_no BETWEEN 100000000000 AND 999999999999999', name='equip_no_12_digits'),
@@ -30,7 +30,9 @@ class Asset(db.Model):
 class Inspection(db.Model):
     __tablename__ = 'inspection'
     id = db.Column(db.Integer, primary_key=True)
-    equip_no = db.Column(db.Integer, db.ForeignKey('asset.equip_no'), nullable=False)
+    # active_history loads the old equip_no before it is replaced so the update listeners know which asset an
+    # inspection was moved from
+    equip_no = db.mapped_column(db.Integer, db.ForeignKey('asset.equip_no'), nullable=False, active_history=True)
     condition_code = db.Column(db.String(2), db.ForeignKey('condition.condition_code'), nullable=False)
     chain_length = db.Column(db.Float)
     chain_pitch_length = db.Column(db.Integer)
@@ -38,8 +40,16 @@ class Inspection(db.Model):
     pitches_measured = db.Column(db.Integer)
     lc_health_score = db.Column(db.Integer)
     asset_passed = db.Column(db.Boolean)
-    insp_date = db.Column(db.DateTime(timezone=True), default=func.now())
+    insp_date = db.Column(db.DateTime(timezone=True), default=func.now(), index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # idempotency key sent by an offline client so a resubmitted inspection is only stored once
+    client_key = db.Column(db.String(64))
+    __table_args__ = (
+        db.Index('ux_inspection_user_id_client_key', 'user_id', 'client_key', unique=True),
+        db.Index('ix_inspection_equip_no_insp_date', 'equip_no', 'insp_date'),
+        db.Index('ix_inspection_user_id_insp_date', 'user_id', 'insp_date'),
+        db.Index('ix_inspection_asset_passed_insp_date', 'asset_passed', 'insp_date'),
+    )
 
 
 # class to define user model, tables, links and constraints.
@@ -50,7 +60,9 @@ class User(db.Model, UserMixin):
     first_name = db.Column(db.String(50), nullable=False)
     surname = db.Column(db.String(50), nullable=False)
     password = db.Column(db.String(255), nullable=False)
-    user_role = db.Column(db.String(10), db.ForeignKey('role.role_name'), nullable=False)
+    # active history keeps the old role on change so the role counters can move the user across
+    user_role = db.column_property(db.Column(db.String(10), db.ForeignKey('role.role_name'), nullable=False,
+                                             index=True), active_history=True)
     inspections = db.relationship('Inspection', backref='user', lazy=True)
 
 
@@ -58,7 +70,7 @@ class User(db.Model, UserMixin):
 class Site(db.Model):
     __tablename__ = 'site'
     id = db.Column(db.Integer, primary_key=True)
-    site_no = db.Column(db.Integer, nullable=False)
+    site_no = db.Column(db.Integer, nullable=False, index=True)
     description = db.Column(db.String(50), nullable=False)
     __table_args__ = (
         CheckConstraint('site_no BETWEEN 100000 and 999999', name='site_no_6_digits'),
@@ -96,3 +108,68 @@ class Role(db.Model):
     role_name = db.Column(db.String(10), primary_key=True)
     role_description = db.Column(db.String(50), nullable=False)
     users = db.relationship('User', backref='role', lazy=True)
+
+
+# class to define dashboard counter model, running totals kept up to date by the listeners in counters.py
+class DashboardCounter(db.Model):
+    __tablename__ = 'dashboard_counter'
+    name = db.Column(db.String(30), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+# class to define data version model, version stamps bumped on writes so every worker can see when cached data is stale
+class DataVersion(db.Model):
+    __tablename__ = 'data_version'
+    scope = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# class to define throttle bucket model, login token buckets shared by every worker when LOGIN_THROTTLE_STORE is sqlite
+class ThrottleBucket(db.Model):
+    __tablename__ = 'throttle_bucket'
+    key = db.Column(db.String(200), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated = db.Column(db.Float, nullable=False, index=True)
+
+
+# class to define asset latest inspection model, the newest inspection of each asset kept by latestinspection.py
+class AssetLatestInspection(db.Model):
+    __tablename__ = 'asset_latest_inspection'
+    equip_no = db.Column(db.Integer, db.ForeignKey('asset.equip_no'), primary_key=True)
+    inspection_id = db.Column(db.Integer, db.ForeignKey('inspection.id'), nullable=False)
+    insp_date = db.Column(db.DateTime(timezone=True), index=True)
+    lc_health_score = db.Column(db.Integer)
+    asset_passed = db.Column(db.Boolean, index=True)
+
+
+# class to define asset wear trend model, running regression sums of health score against inspection date per asset,
+# updated a point at a time by forecast.py with the date the trend crosses the pass threshold
+class AssetWearTrend(db.Model):
+    __tablename__ = 'asset_wear_trend'
+    equip_no = db.Column(db.Integer, db.ForeignKey('asset.equip_no'), primary_key=True)
+    origin = db.Column(db.DateTime(timezone=True), nullable=False)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    sum_t = db.Column(db.Float, nullable=False, default=0)
+    sum_y = db.Column(db.Float, nullable=False, default=0)
+    sum_tt = db.Column(db.Float, nullable=False, default=0)
+    sum_ty = db.Column(db.Float, nullable=False, default=0)
+    slope = db.Column(db.Float)
+    intercept = db.Column(db.Float)
+    predicted_fail_date = db.Column(db.DateTime(timezone=True), index=True)
+
+
+# class to define csp violation model, reports grouped by directive, blocked uri and page with how often each is seen
+class CspViolation(db.Model):
+    __tablename__ = 'csp_violation'
+    id = db.Column(db.Integer, primary_key=True)
+    directive = db.Column(db.String(100), nullable=False)
+    blocked_uri = db.Column(db.String(500), nullable=False)
+    document_uri = db.Column(db.String(500), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    first_seen = db.Column(db.DateTime, nullable=False)
+    last_seen = db.Column(db.DateTime, nullable=False, index=True)
+    __table_args__ = (
+        db.Index('ux_csp_violation_directive_blocked_document', 'directive', 'blocked_uri', 'document_uri',
+                 unique=True),
+        db.Index('ix_csp_violation_count', 'count'),
+    )
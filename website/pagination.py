@@ -0,0 +1,241 @@
+# Name      : pagination
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Keyset (cursor) pagination, sorting and filtering for list views.
+
+import base64
+import json
+import logging
+import operator
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import String, and_, cast, func, literal, or_
+from sqlalchemy.types import DateTime
+from werkzeug.datastructures import MultiDict
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Sort:
+    """sortable column for a listing, nullable columns are coalesced so keyset comparisons stay total"""
+
+    def __init__(self, column, nullable=False, sentinel=-1):
+        self.column = column
+        self.expression = func.coalesce(column, sentinel) if nullable else column
+        # sqlite keeps datetimes as text, func.now() defaults without microseconds and python values with them. a
+        # cursor holding a datetime is bound back with microseconds and never equals the stored text, so datetime
+        # sorts carry the stored text in the cursor and compare it as text, which still uses the column's index
+        self.astext = isinstance(column.type, DateTime)
+        self.value = cast(self.expression, String) if self.astext else self.expression
+
+    def bind(self, value):
+        '''function to return a cursor value ready to compare against the sort expression'''
+        if self.astext:
+            return literal(value if isinstance(value, str) else str(value), String)
+        return value
+
+
+class Filter:
+    """filter for a listing, raw query string values are parsed and compared against the column"""
+
+    def __init__(self, column, parse=int, op=operator.eq):
+        self.column = column
+        self.parse = parse
+        self.op = op
+
+    def apply(self, query, raw):
+        return query.filter(self.op(self.column, self.parse(raw)))
+
+
+class Listing:
+    """definition of the sorts and filters allowed on a list view, key is the unique column that breaks sort ties"""
+
+    def __init__(self, key, sorts, default_sort, default_order='asc', filters=None):
+        self.key = key
+        self.sorts = sorts
+        self.default_sort = default_sort
+        self.default_order = default_order
+        self.filters = filters or {}
+
+
+class Page:
+    """page of rows plus the cursors needed to move forwards and backwards"""
+
+    def __init__(self, rows, sort, order, args, next_cursor=None, prev_cursor=None):
+        self.rows = rows
+        self.sort = sort
+        self.order = order
+        self.args = args
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def linkargs(self, **overrides):
+        '''function to build the query string for a link from this page, keeping the active sort and filters'''
+        return dict(self.args, **overrides)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def parsebool(raw):
+    '''function to parse pass/fail style query string values'''
+    value = str(raw).strip().lower()
+    if value in ('1', 'true', 'yes', 'pass', 'passed'):
+        return True
+    if value in ('0', 'false', 'no', 'fail', 'failed'):
+        return False
+    raise ValueError(f'{raw} is not a pass/fail value')
+
+
+def parsedate(raw):
+    '''function to parse a YYYY-MM-DD query string value in to the start of that day'''
+    return datetime.combine(date.fromisoformat(str(raw).strip()), datetime.min.time())
+
+
+def parsedateto(raw):
+    '''function to parse an inclusive YYYY-MM-DD upper bound in to the start of the following day'''
+    return parsedate(raw) + timedelta(days=1)
+
+
+def parsestring(raw):
+    '''function to parse a plain text query string value'''
+    return str(raw).strip().upper()
+
+
+def datefrom(column):
+    return Filter(column, parse=parsedate, op=operator.ge)
+
+
+def dateto(column):
+    return Filter(column, parse=parsedateto, op=operator.lt)
+
+
+def _encodevalue(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decodevalue(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encodecursor(direction, sort, order, sort_value, key_value):
+    '''function to encode the position of a row in a listing as an opaque url safe token'''
+    payload = json.dumps([direction, sort, order, _encodevalue(sort_value), _encodevalue(key_value)],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decodecursor(token):
+    '''function to decode a cursor token, returns None when the token is not valid'''
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, sort, order, sort_value, key_value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev'):
+            return None
+        return direction, sort, order, _decodevalue(sort_value), _decodevalue(key_value)
+    except Exception as e:
+        logging.error(f'invalid pagination cursor: {e}')
+        return None
+
+
+def pagesize(args):
+    '''function to read the requested page size, bounded by MAX_PAGE_SIZE'''
+    try:
+        size = int(args.get('per_page', PAGE_SIZE))
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def listingargs(listing, args):
+    '''function to return only the query string arguments a listing reads, the first value of each, so unknown or
+    repeated arguments give the same page and the same cache key'''
+    names = ('sort', 'order', 'cursor', 'per_page', *listing.filters)
+    return MultiDict([(name, args[name]) for name in names if name in args])
+
+
+def applyfilters(query, listing, args):
+    '''function to apply any listing filters present in the query string, returns the query and the active filters'''
+    active = {}
+    for name, filt in listing.filters.items():
+        raw = args.get(name)
+        if raw is None or str(raw).strip() == '':
+            continue
+        try:
+            query = filt.apply(query, raw)
+            active[name] = raw
+        except (TypeError, ValueError) as e:
+            logging.error(f'ignoring invalid {name} filter: {e}')
+    return query, active
+
+
+def paginate(query, listing, args):
+    '''function to return a keyset paginated, sorted and filtered page of a query'''
+    sort = args.get('sort', listing.default_sort)
+    if sort not in listing.sorts:
+        sort = listing.default_sort
+    order = args.get('order', listing.default_order)
+    if order not in ('asc', 'desc'):
+        order = listing.default_order
+    size = pagesize(args)
+
+    query, active = applyfilters(query, listing, args)
+    sortby = listing.sorts[sort]
+    expression = sortby.expression
+    key = listing.key
+
+    direction = 'next'
+    cursor = decodecursor(args['cursor']) if args.get('cursor') else None
+    if cursor and cursor[1] == sort and cursor[2] == order:
+        direction, _, _, sort_value, key_value = cursor
+        sort_value = sortby.bind(sort_value)
+        # moving backwards walks the index the other way then flips the rows back
+        forwards = (order == 'asc') == (direction == 'next')
+        if forwards:
+            query = query.filter(or_(expression > sort_value, and_(expression == sort_value, key > key_value)))
+        else:
+            query = query.filter(or_(expression < sort_value, and_(expression == sort_value, key < key_value)))
+    else:
+        cursor = None
+        forwards = order == 'asc'
+
+    if forwards:
+        query = query.order_by(expression.asc(), key.asc())
+    else:
+        query = query.order_by(expression.desc(), key.desc())
+
+    rows = query.add_columns(sortby.value.label('page_sort'), key.label('page_key')).limit(size + 1).all()
+    more = len(rows) > size
+    rows = rows[:size]
+    if direction == 'prev':
+        rows.reverse()
+
+    next_cursor, prev_cursor = None, None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if more or direction == 'prev':
+            next_cursor = encodecursor('next', sort, order, last.page_sort, last.page_key)
+        if cursor is not None and (more or direction == 'next'):
+            prev_cursor = encodecursor('prev', sort, order, first.page_sort, first.page_key)
+
+    page_args = dict(active, sort=sort, order=order)
+    if size != PAGE_SIZE:
+        page_args['per_page'] = size
+    return Page(rows, sort, order, page_args, next_cursor, prev_cursor)
@@ -0,0 +1,86 @@
+# Name      : passwords
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Configurable password hashing run in a bounded thread pool so logins cannot pin every worker CPU.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256'
+PASSWORD_HASH_WORKERS = min(4, os.cpu_count() or 1)
+PASSWORD_QUEUE_TIMEOUT = 5.0
+SCRYPT_DEFAULTS = '32768:8:1'
+
+
+class PasswordPoolBusy(Exception):
+    """raised when a hash could not start within the queue timeout because every worker was busy"""
+
+
+class PasswordPool:
+    """thread pool for password hashing with a cap on work in flight and a timeout for waiting to start"""
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_timeout=PASSWORD_QUEUE_TIMEOUT):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordPoolBusy(f'no password worker free within {self.queue_timeout}s')
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def passwordpool():
+    '''function to return the password pool for the current app, sized from PASSWORD_HASH_WORKERS and
+    PASSWORD_QUEUE_TIMEOUT'''
+    pool = current_app.extensions.get('password_pool')
+    if pool is None:
+        pool = current_app.extensions.setdefault('password_pool', PasswordPool(
+            current_app.config.get('PASSWORD_HASH_WORKERS', PASSWORD_HASH_WORKERS),
+            current_app.config.get('PASSWORD_QUEUE_TIMEOUT', PASSWORD_QUEUE_TIMEOUT)))
+    return pool
+
+
+def hashmethod():
+    '''function to return the configured hash method with its cost parameters filled in, in the form werkzeug
+    writes at the start of a stored hash, e.g. pbkdf2:sha256:1000000 or scrypt:32768:8:1'''
+    method = current_app.config.get('PASSWORD_HASH_METHOD', PASSWORD_HASH_METHOD)
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        hash_name = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if parts[0] == 'scrypt' and len(parts) == 1:
+        return f'scrypt:{SCRYPT_DEFAULTS}'
+    return method
+
+
+def needsrehash(stored_hash):
+    '''function to tell whether a stored hash was made with a different method or cost to the configured one'''
+    return stored_hash.split('$', 1)[0] != hashmethod()
+
+
+def hashpassword(password):
+    '''function to hash a password with the configured method in the password pool'''
+    return passwordpool().run(generate_password_hash, password, hashmethod())
+
+
+def verifypassword(stored_hash, password):
+    '''function to check a password against its stored hash in the password pool, raises PasswordPoolBusy if it
+    could not start within the queue timeout'''
+    return passwordpool().run(check_password_hash, stored_hash, password)
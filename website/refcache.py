@@ -0,0 +1,96 @@
+# Name      : refcache
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Process wide cache for reference tables, invalidated across workers by a shared version stamp.
+
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from . import db
+from .dataversion import VersionCheck, bumpversion, REFERENCE_SCOPE, VERSION_CHECK_SECONDS
+from .models import Condition, Assetclass, Assetstatus, Role
+
+
+class ReferenceCache:
+    """rows from the reference tables, dropped whenever the shared version stamp moves on. the stamp is reread every
+    few seconds rather than on every get, so a hit costs no query"""
+
+    def __init__(self, scope=REFERENCE_SCOPE, interval=VERSION_CHECK_SECONDS, clock=time.monotonic):
+        self.scope = scope
+        self.versions = VersionCheck(scope, interval, clock)
+        self._version = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, loader):
+        version = self.versions.current()
+        with self._lock:
+            if version != self._version:
+                self._entries = {}
+                self._version = version
+            if name in self._entries:
+                return self._entries[name]
+        rows = tuple(loader())
+        with self._lock:
+            if self._version == version:
+                self._entries[name] = rows
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._version = None
+        self.versions.expire()
+
+
+def referencecache():
+    '''function to return the reference cache for the current app'''
+    cache = current_app.extensions.get('reference_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('reference_cache', ReferenceCache(
+            interval=current_app.config.get('VERSION_CHECK_SECONDS', VERSION_CHECK_SECONDS)))
+    return cache
+
+
+def conditions():
+    return referencecache().get('conditions', lambda: db.session.query(
+        Condition.condition_code, Condition.condition_description).order_by(Condition.condition_code).all())
+
+
+def assetclasses():
+    return referencecache().get('assetclasses', lambda: db.session.query(
+        Assetclass.class_id, Assetclass.class_description).order_by(Assetclass.class_id).all())
+
+
+def assetstatuses():
+    return referencecache().get('assetstatuses', lambda: db.session.query(
+        Assetstatus.status_id, Assetstatus.status_description).order_by(Assetstatus.status_id).all())
+
+
+def roles():
+    return referencecache().get('roles', lambda: db.session.query(
+        Role.role_name, Role.role_description).order_by(Role.role_name).all())
+
+
+def invalidatereference(connection=None):
+    '''function to mark the reference data as changed. call it from any write path that changes the condition,
+    asset class, asset status or role tables, other workers reload within VERSION_CHECK_SECONDS once it commits.'''
+    bumpversion(REFERENCE_SCOPE, connection)
+    referencecache().clear()
+
+
+def _reference_changed(mapper, connection, target):
+    bumpversion(REFERENCE_SCOPE, connection)
+    # this worker rereads the stamp next time rather than within VERSION_CHECK_SECONDS
+    if has_app_context():
+        referencecache().clear()
+
+
+# ORM writes to the reference tables invalidate automatically, raw SQL changes need invalidatereference()
+for _model in (Condition, Assetclass, Assetstatus, Role):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _reference_changed)
@@ -0,0 +1,209 @@
+# Name      : seed
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Reproducible synthetic dataset for load and scale testing, bulk loaded in to an empty database.
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.sqlite import insert as upsert
+
+from . import db
+from .counters import reconcilecounters
+from .dataversion import bumpversion, SITE_SCOPE, ASSET_SCOPE, INSPECTION_SCOPE
+from .forecast import rebuildtrends
+from .inspections import batchscore, MIN_PITCH_LENGTH, MAX_PITCH_LENGTH, MIN_PITCHES_MEASURED
+from .latestinspection import rebuildlatest
+from .migrations import upgrade
+from .models import Asset, Assetclass, Assetstatus, Condition, Inspection, Role, Site, User
+from .passwords import hashpassword
+from .refcache import invalidatereference
+
+SEED_BATCH_SIZE = 50000
+SEED_YEARS = 5
+FIRST_EQUIP_NO = 100000000000
+FIRST_SITE_NO = 100000
+LIFTING_CHAIN_CLASS = 'C5'
+
+ROLES = (('ADMIN', 'Administrator'), ('CONTENG', 'Contract Engineer'), ('FIELD', 'Field Inspector'))
+CONDITIONS = (('1', 'As new'), ('2', 'Good'), ('3', 'Fair'), ('4', 'Poor'), ('5', 'Unsafe, remove from service'))
+ASSET_CLASSES = (('C5', 'Lifting Chain'), ('H1', 'Hoist'), ('S1', 'Sling'), ('SH', 'Shackle'), ('LB', 'Lifting Beam'))
+ASSET_STATUSES = (('AC', 'Active'), ('IN', 'Inactive'), ('QU', 'Quarantined'))
+# share of assets in each class, lifting chains carry the pitch measurements so they are the bulk of the data
+CLASS_WEIGHTS = (0.5, 0.15, 0.15, 0.1, 0.1)
+STATUS_WEIGHTS = (0.9, 0.07, 0.03)
+PITCH_LENGTHS = (100, 125, 160, 200, 250, 320, 400, 500)
+
+
+class SeedReport:
+    """counts of what a seed run loaded"""
+
+    def __init__(self):
+        self.sites = 0
+        self.assets = 0
+        self.users = 0
+        self.inspections = 0
+
+    def todict(self):
+        return {'sites': self.sites, 'assets': self.assets, 'users': self.users, 'inspections': self.inspections}
+
+
+def seedreference():
+    '''function to load the roles, conditions, asset classes and statuses, rows that already exist are kept'''
+    connection = db.session.connection()
+    for model, columns, rows in ((Role, ('role_name', 'role_description'), ROLES),
+                                 (Condition, ('condition_code', 'condition_description'), CONDITIONS),
+                                 (Assetclass, ('class_id', 'class_description'), ASSET_CLASSES),
+                                 (Assetstatus, ('status_id', 'status_description'), ASSET_STATUSES)):
+        connection.execute(upsert(model).on_conflict_do_nothing(), [dict(zip(columns, row)) for row in rows])
+    invalidatereference(connection)
+
+
+def assetprofiles(rng, assets, start, end):
+    '''function to draw each asset's class, status, site offset, commissioning date and wear curve.
+    a chain's mean pitch stretches as nominal * (1 + rate * years ** shape), most chains take decades to reach the
+    25% stretch that fails the health score while a worn tail crosses it within the dataset.'''
+    span = (end - start).days
+    classes = rng.choice(len(ASSET_CLASSES), size=assets, p=CLASS_WEIGHTS)
+    return {
+        'class': classes,
+        'status': rng.choice(len(ASSET_STATUSES), size=assets, p=STATUS_WEIGHTS),
+        'commissioned': rng.integers(0, max(span // 2, 1), size=assets),
+        'pitch': rng.choice(PITCH_LENGTHS, size=assets),
+        'length': np.round(rng.uniform(1.0, 20.0, size=assets), 1),
+        'rate': rng.lognormal(np.log(0.02), 0.6, size=assets),
+        'shape': rng.uniform(1.1, 1.6, size=assets),
+    }
+
+
+def seedsites(rng, sites):
+    '''function to bulk insert sites numbered from FIRST_SITE_NO'''
+    site_nos = FIRST_SITE_NO + np.arange(sites)
+    areas = ('Pumping Station', 'Treatment Works', 'Reservoir', 'Depot', 'Dock', 'Substation')
+    picks = rng.integers(0, len(areas), size=sites)
+    db.session.execute(insert(Site), [{'id': int(site_no), 'site_no': int(site_no),
+                                       'description': f'{areas[pick]} {i + 1}'}
+                                      for i, (site_no, pick) in enumerate(zip(site_nos, picks))])
+    return sites
+
+
+def seedassets(rng, profiles, sites):
+    '''function to bulk insert assets with 12 digit equip_no numbered from FIRST_EQUIP_NO'''
+    assets = len(profiles['class'])
+    site_nos = FIRST_SITE_NO + rng.integers(0, sites, size=assets)
+    locations = ('Wet well', 'Dry well', 'Inlet works', 'Outlet chamber', 'Valve house', 'Plant room')
+    picks = rng.integers(0, len(locations), size=assets)
+    rows = []
+    for i in range(assets):
+        class_id, class_description = ASSET_CLASSES[profiles['class'][i]]
+        rows.append({'equip_no': FIRST_EQUIP_NO + i, 'description': f'{class_description} {i + 1}',
+                     'location_on_site': locations[picks[i]], 'site_no': int(site_nos[i]),
+                     'equip_status': ASSET_STATUSES[profiles['status'][i]][0], 'equip_class': class_id})
+        if len(rows) >= SEED_BATCH_SIZE:
+            db.session.connection().execute(insert(Asset), rows)
+            rows = []
+    if rows:
+        db.session.connection().execute(insert(Asset), rows)
+    return assets
+
+
+def seedusers(users, password):
+    '''function to insert an admin, a contract engineer and field inspectors sharing one password hash.
+    returns the ids of the field inspectors.'''
+    hashed = hashpassword(password)
+    rows = [{'username': 'admin', 'first_name': 'Ada', 'surname': 'Admin', 'user_role': 'ADMIN'},
+            {'username': 'conteng', 'first_name': 'Cal', 'surname': 'Engineer', 'user_role': 'CONTENG'}]
+    rows += [{'username': f'field{i + 1:04d}', 'first_name': 'Field', 'surname': f'Inspector {i + 1}',
+              'user_role': 'FIELD'} for i in range(users)]
+    db.session.execute(insert(User), [dict(row, password=hashed) for row in rows])
+    return list(db.session.execute(select(User.id).where(User.username.like('field%')).order_by(User.id)).scalars())
+
+
+def inspectionbatch(rng, profiles, field_ids, size, start, end):
+    '''function to generate and score one batch of inspections as insert ready dicts'''
+    assets = len(profiles['class'])
+    asset = rng.integers(0, assets, size=size)
+    commissioned = profiles['commissioned'][asset]
+    span = (end - start).days
+    day = commissioned + rng.random(size) * (span - commissioned)
+    years = (day - commissioned) / 365.25
+
+    chain = profiles['class'][asset] == 0
+    pitch = profiles['pitch'][asset]
+    stretch = profiles['rate'][asset] * years ** profiles['shape'][asset] + rng.normal(0, 0.004, size)
+    measured = np.maximum(np.rint(pitch * (1 + np.maximum(stretch, 0))), pitch)
+    # condition worsens with stretch, with the odd unsafe find on any class of asset
+    condition = np.clip(1 + np.floor(np.maximum(stretch, 0) / 0.08 + rng.random(size) * 1.6), 1, 4).astype(int)
+    condition[rng.random(size) < 0.01] = 5
+    condition = condition.astype(str)
+
+    scores, passed = batchscore(np.where(chain, measured, np.nan), np.where(chain, pitch, np.nan), condition)
+    users = rng.choice(field_ids, size=size)
+    pitches = rng.integers(MIN_PITCHES_MEASURED, MIN_PITCHES_MEASURED + 20, size=size)
+    seconds = np.rint(day * 86400).astype(np.int64)
+
+    rows = []
+    for i in range(size):
+        is_chain = bool(chain[i])
+        rows.append({'equip_no': FIRST_EQUIP_NO + int(asset[i]), 'condition_code': condition[i],
+                     'chain_length': float(profiles['length'][asset[i]]) if is_chain else None,
+                     'chain_pitch_length': int(pitch[i]) if is_chain else None,
+                     'measure_mean_pitch_length': int(measured[i]) if is_chain else None,
+                     'pitches_measured': int(pitches[i]) if is_chain else None,
+                     'lc_health_score': float(scores[i]) if is_chain else None,
+                     'asset_passed': bool(passed[i]), 'insp_date': start + timedelta(seconds=int(seconds[i])),
+                     'user_id': int(users[i])})
+    return rows
+
+
+def seeddatabase(inspections, assets, sites, users, seed=0, end=None, password='Seed-Pa55word', progress=None):
+    '''function to create the schema and bulk load a synthetic dataset in to an empty database.
+    the same seed and end date always give the same rows. inspections are generated and inserted a batch at a time
+    with one executemany each. everything after the schema upgrade is one transaction, committed at the very end, so
+    a run that fails and is rolled back leaves the tables empty. the bulk inserts skip the model events, so the
+    dashboard counters, latest inspections and wear trends are rebuilt once at the end and every data version moved
+    on.'''
+    if not MIN_PITCH_LENGTH <= min(PITCH_LENGTHS) <= max(PITCH_LENGTHS) <= MAX_PITCH_LENGTH:
+        raise ValueError('seed pitch lengths are outside the inspection limits')
+    upgrade()
+    if db.session.execute(select(func.count()).select_from(Asset)).scalar():
+        raise ValueError('the database already has assets, seed an empty database')
+
+    end = end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=round(365.25 * SEED_YEARS))
+    rng = np.random.default_rng(seed)
+    report = SeedReport()
+
+    seedreference()
+    profiles = assetprofiles(rng, assets, start, end)
+    report.sites = seedsites(rng, sites)
+    report.assets = seedassets(rng, profiles, sites)
+    field_ids = seedusers(users, password)
+    report.users = len(field_ids) + 2
+
+    # the table is empty, so its indexes are built once after the load rather than kept up to date row by row
+    indexes = list(Inspection.__table__.indexes)
+    connection = db.session.connection()
+    for index in indexes:
+        index.drop(connection, checkfirst=True)
+    while report.inspections < inspections:
+        size = min(SEED_BATCH_SIZE, inspections - report.inspections)
+        # executed on the connection so the batch goes to the driver as one executemany, the ORM bulk insert
+        # would split it wherever the NULL columns change between chain and other inspections
+        db.session.connection().execute(insert(Inspection), inspectionbatch(rng, profiles, field_ids, size, start, end))
+        report.inspections += size
+        if progress:
+            progress(report.inspections)
+    connection = db.session.connection()
+    for index in indexes:
+        index.create(connection)
+
+    reconcilecounters(commit=False)
+    rebuildlatest(commit=False)
+    rebuildtrends(commit=False)
+    for scope in (SITE_SCOPE, ASSET_SCOPE, INSPECTION_SCOPE):
+        bumpversion(scope)
+    db.session.commit()
+    return report
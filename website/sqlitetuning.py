@@ -0,0 +1,85 @@
+# Name      : sqlitetuning
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Production tuning for the SQLite engine so several workers can read and write without locking out.
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+from . import db
+
+# methods whose views only read, their transactions are opened read only so a stray write fails loudly
+READ_ONLY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# config key and default for each setting, every one can be overridden from the environment in config.Config
+SQLITE_DEFAULTS = {
+    'SQLITE_TUNING': True,
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_BUSY_TIMEOUT': 5000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_CACHE_SIZE': -64 * 1024,
+    'SQLITE_READ_ONLY_GET': True,
+}
+
+
+def sqlitesettings(config):
+    '''function to read the SQLite settings from an app config, falling back to SQLITE_DEFAULTS'''
+    return {key: config.get(key, default) for key, default in SQLITE_DEFAULTS.items()}
+
+
+def connectpragmas(settings):
+    '''function to build the pragma statements run on every new connection'''
+    return (f"PRAGMA journal_mode = {settings['SQLITE_JOURNAL_MODE']}",
+            f"PRAGMA synchronous = {settings['SQLITE_SYNCHRONOUS']}",
+            f"PRAGMA busy_timeout = {int(settings['SQLITE_BUSY_TIMEOUT'])}",
+            f"PRAGMA mmap_size = {int(settings['SQLITE_MMAP_SIZE'])}",
+            f"PRAGMA cache_size = {int(settings['SQLITE_CACHE_SIZE'])}")
+
+
+def readonlyrequest():
+    '''function to tell whether the current request should only read from the db'''
+    return has_request_context() and request.method in READ_ONLY_METHODS
+
+
+def tuneengine(engine, settings):
+    '''function to add the connect pragmas and read only GET transactions to a SQLite engine'''
+    pragmas = connectpragmas(settings)
+
+    @event.listens_for(engine, 'connect')
+    def _setpragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+        connection_record.info['query_only'] = False
+
+    if not settings['SQLITE_READ_ONLY_GET']:
+        return
+
+    @event.listens_for(engine, 'begin')
+    def _begin(connection):
+        # the driver only opens a transaction before a write, so reads in a GET would each see a different
+        # snapshot. open a deferred transaction up front instead, it takes no lock until it reads.
+        read_only = readonlyrequest()
+        info = connection.connection.info
+        if info.get('query_only') != read_only:
+            connection.exec_driver_sql(f"PRAGMA query_only = {'ON' if read_only else 'OFF'}")
+            info['query_only'] = read_only
+        if read_only:
+            connection.exec_driver_sql('BEGIN DEFERRED')
+
+
+def tunesqlite(app):
+    '''function to apply the SQLite production profile to the app's engines when SQLITE_TUNING is on'''
+    settings = sqlitesettings(app.config)
+    if not settings['SQLITE_TUNING']:
+        return
+    with app.app_context():
+        engines = db.engines.values()
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            tuneengine(engine, settings)
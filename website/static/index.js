@@ -0,0 +1,120 @@
+/*
+# Name      : index.js
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Client scripts for the site, confirmation prompts and typeahead asset pickers for the inspection page.
+ */
+
+// wait after the last key press before looking up, so typing a whole equip no makes one request not twelve
+const LOOKUP_DELAY_MS = 250;
+const LOOKUP_PAGE_SIZE = 20;
+
+function debounce(fn, delay) {
+    let timer = null;
+    return function (...args) {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn.apply(this, args), delay);
+    };
+}
+
+// turns a text input with a data-lookup url in to a typeahead, the input keeps the equip no the form posts
+function assetPicker(input) {
+    const results = document.getElementById(input.getAttribute('aria-controls'));
+    let controller = null;
+
+    function clear() {
+        results.replaceChildren();
+    }
+
+    function pick(asset) {
+        input.value = asset.equip_no;
+        clear();
+    }
+
+    function option(asset) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'list-group-item list-group-item-action';
+        button.textContent = [asset.equip_no, asset.description, asset.location_on_site, asset.site_description]
+            .filter(Boolean).join(' - ');
+        button.addEventListener('click', () => pick(asset));
+        return button;
+    }
+
+    function more(cursor) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'list-group-item list-group-item-action text-center font-weight-bold';
+        button.textContent = 'More results';
+        button.addEventListener('click', () => {
+            button.remove();
+            lookup(cursor);
+        });
+        return button;
+    }
+
+    async function lookup(cursor) {
+        const query = input.value.trim();
+        if (!query) {
+            clear();
+            return;
+        }
+        // a slower response to an earlier key press must not overwrite the newer one
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        const url = new URL(input.dataset.lookup, window.location.origin);
+        url.searchParams.set('q', query);
+        url.searchParams.set('per_page', LOOKUP_PAGE_SIZE);
+        if (cursor) {
+            url.searchParams.set('cursor', cursor);
+        }
+        try {
+            const response = await fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}});
+            if (!response.ok) {
+                throw new Error(`asset lookup returned ${response.status}`);
+            }
+            const page = await response.json();
+            if (!cursor) {
+                clear();
+            }
+            results.append(...page.results.map(option));
+            if (page.next_cursor) {
+                results.append(more(page.next_cursor));
+            }
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error(error);
+            }
+        }
+    }
+
+    input.addEventListener('input', debounce(() => lookup(null), LOOKUP_DELAY_MS));
+}
+
+// links and forms with a data-confirm message ask before going ahead, in place of inline onclick and onsubmit
+// handlers the content security policy would block
+function confirmAction(element) {
+    const type = element.tagName === 'FORM' ? 'submit' : 'click';
+    element.addEventListener(type, (event) => {
+        if (!confirm(element.dataset.confirm)) {
+            event.preventDefault();
+        }
+    });
+}
+
+function confirmRoleChange(select) {
+    select.addEventListener('change', () => {
+        if (confirm(`Are you sure you want to change the role to '${select.value}'?`)) {
+            select.form.submit();
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('a[data-confirm], form[data-confirm]').forEach(confirmAction);
+    document.querySelectorAll('select[data-confirm-role]').forEach(confirmRoleChange);
+    document.querySelectorAll('input[data-lookup]').forEach(assetPicker);
+});
@@ -0,0 +1,151 @@
+# Name      : staticassets
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Build fingerprinted, precompressed copies of the static files and serve them with immutable caching.
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt, a build without it falls back to the gzip variants only
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+# a fingerprinted file never changes, a new version gets a new name, so browsers may keep it for a year unchecked
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# most preferred first, served when the client accepts it and the build wrote it
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def fingerprint(name, content):
+    '''function to return the file name with a short hash of its content before the extension'''
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+
+def sourcefiles(static_folder):
+    '''function to list the static files to build as paths relative to the static folder, built output excluded'''
+    names = []
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        for file in files:
+            names.append(os.path.relpath(os.path.join(root, file), static_folder).replace(os.sep, '/'))
+    # stylesheets last so the images and fonts they point at already have their fingerprinted names
+    return sorted(names, key=lambda name: (name.endswith('.css'), name))
+
+
+def rewritecss(content, name, manifest):
+    '''function to point the url() references in a stylesheet at the fingerprinted files, so a changed image
+    changes the stylesheet's hash too'''
+    directory = posixpath.dirname(name)
+
+    def _replace(match):
+        quote, url = match.group(1), match.group(2)
+        if url.startswith(('/', '#', 'data:')) or '://' in url:
+            return match.group(0)
+        path, _, suffix = url.partition('?')
+        target = posixpath.normpath(posixpath.join(directory, path))
+        if target not in manifest:
+            return match.group(0)
+        # the built files keep the source layout, so the relative path between them is unchanged
+        hashed = posixpath.relpath(manifest[target], directory or '.')
+        return f"url({quote}{hashed}{'?' + suffix if suffix else ''}{quote})"
+
+    return _CSS_URL.sub(_replace, content.decode('utf-8')).encode('utf-8')
+
+
+def writefile(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as handle:
+        handle.write(content)
+
+
+def buildassets(static_folder):
+    '''function to write a fingerprinted copy of every static file to the dist folder with gzip and, when the
+    brotli module is installed, brotli variants of the text files beside it, then the manifest mapping each source
+    name to its built name. returns the manifest.'''
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for name in sourcefiles(static_folder):
+        with open(os.path.join(static_folder, name), 'rb') as handle:
+            content = handle.read()
+        if name.endswith('.css'):
+            content = rewritecss(content, name, manifest)
+        hashed = fingerprint(name, content)
+        path = os.path.join(dist, hashed)
+        writefile(path, content)
+        if name.endswith(COMPRESSIBLE):
+            # mtime=0 so the same source always builds the same bytes
+            variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(content, quality=11)
+            for suffix, compressed in variants.items():
+                if len(compressed) < len(content):
+                    writefile(path + suffix, compressed)
+        manifest[name] = hashed
+    writefile(os.path.join(dist, MANIFEST_FILE), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def readmanifest(static_folder):
+    '''function to read the manifest of the last build, empty when the assets have not been built'''
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_FILE), encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.error(f'error reading the static asset manifest, serving the source files: {e}')
+        return {}
+
+
+def _hashedurl(endpoint, values):
+    # url_for('static', filename='style.css') links to the built copy once there is one
+    if endpoint == 'static':
+        hashed = current_app.extensions['static_manifest'].get(values.get('filename'))
+        if hashed is not None:
+            values['filename'] = f'{DIST_DIR}/{hashed}'
+
+
+def sendstatic(filename):
+    '''function to serve a static file, built files are sent precompressed when the client accepts it and cached
+    as immutable'''
+    if not filename.startswith(f'{DIST_DIR}/'):
+        return current_app.send_static_file(filename)
+    folder = current_app.static_folder
+    encoding, suffix = None, ''
+    for candidate, candidate_suffix in ENCODINGS:
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(folder, filename + candidate_suffix)):
+            encoding, suffix = candidate, candidate_suffix
+            break
+    response = send_from_directory(folder, filename + suffix, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=ASSET_MAX_AGE)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+
+def initassets(app):
+    '''function to link templates to the built static files and serve them, falls back to the source files until
+    flask build-assets has been run'''
+    app.extensions['static_manifest'] = readmanifest(app.static_folder)
+    app.url_defaults(_hashedurl)
+    app.view_functions['static'] = sendstatic
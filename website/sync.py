@@ -0,0 +1,95 @@
+# Name      : sync
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Batch sync of inspections queued by offline clients, made idempotent by client keys.
+
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from . import db
+from .importer import parseinspection, checkassets, scorerecords, insertrecords
+from .models import Inspection
+from .refcache import conditions
+
+SYNC_MAX_ITEMS = 500
+CLIENT_KEY_LENGTH = 64
+
+
+def _fields(item):
+    # clients send JSON numbers, the parser works on the text a form or CSV would hold
+    return {name: '' if value is None else str(value) for name, value in item.items()}
+
+
+def _result(key, status, **extra):
+    return {'key': key, 'status': status, **extra}
+
+
+def storedkeys(user_id, keys):
+    '''function to look up which of a user's client keys are already stored, returns a dict of key to inspection id'''
+    if not keys:
+        return {}
+    return dict(db.session.execute(select(Inspection.client_key, Inspection.id)
+                                   .where(Inspection.user_id == user_id,
+                                          Inspection.client_key.in_(set(keys)))).all())
+
+
+def syncinspections(items, user_id):
+    '''function to store a batch of inspections queued by an offline client in one transaction.
+    each item is an inspection's fields plus a key unique to that inspection on the client. keys already stored for
+    the user, or repeated in the batch, are skipped as duplicates so a resubmitted batch is harmless. new items are
+    validated and scored in one pass and inserted with one executemany. returns a result per item in the order
+    sent with status created, duplicate or rejected.'''
+    results = [None] * len(items)
+    first = {}
+    for index, item in enumerate(items):
+        key = item.get('key') if isinstance(item, dict) else None
+        if not isinstance(key, str) or not key.strip() or len(key) > CLIENT_KEY_LENGTH:
+            results[index] = _result(key if isinstance(key, str) else None, 'rejected',
+                                     errors=[f'key must be a string of 1 to {CLIENT_KEY_LENGTH} characters'])
+        elif key in first:
+            results[index] = _result(key, 'duplicate')
+        else:
+            first[key] = index
+
+    stored = storedkeys(user_id, list(first))
+    condition_codes = {condition.condition_code for condition in conditions()}
+    default_date = datetime.now(timezone.utc).replace(tzinfo=None)
+    candidates = []
+    for key, index in first.items():
+        if key in stored:
+            results[index] = _result(key, 'duplicate', id=stored[key])
+            continue
+        record, errors = parseinspection(_fields(items[index]), condition_codes, default_date)
+        if errors:
+            results[index] = _result(key, 'rejected', errors=errors)
+            continue
+        record.update(client_key=key, user_id=user_id)
+        candidates.append((index, record))
+
+    valid, rejected = checkassets(candidates)
+    for index, errors in rejected:
+        results[index] = _result(items[index]['key'], 'rejected', errors=errors)
+
+    # a concurrent sync of the same key loses to the unique index instead of failing the batch. rows this insert
+    # wrote get ids above the last one stored before it, a key stored with a lower id was another sync's
+    last_id = db.session.execute(select(func.max(Inspection.id))).scalar() or 0
+    statement = insert(Inspection).on_conflict_do_nothing(index_elements=['user_id', 'client_key'])
+    insertrecords(scorerecords(valid), statement)
+    ids = storedkeys(user_id, [record['client_key'] for record in valid])
+    for record in valid:
+        key = record['client_key']
+        if key in ids and ids[key] > last_id:
+            results[first[key]] = _result(key, 'created', id=ids[key], lc_health_score=record['lc_health_score'],
+                                          asset_passed=record['asset_passed'])
+        else:
+            results[first[key]] = _result(key, 'duplicate', id=ids.get(key))
+    db.session.commit()
+
+    # repeats within the batch point at whatever happened to the first item with their key
+    for index, result in enumerate(results):
+        if result['status'] == 'duplicate' and 'id' not in result:
+            result['id'] = results[first[result['key']]].get('id')
+    return results
@@ -0,0 +1,151 @@
+# Name      : throttle
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Token bucket rate limiting for logins, in memory per worker or in SQLite shared by every worker.
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from . import db
+from .models import ThrottleBucket
+
+THROTTLE_MAX_KEYS = 10000
+THROTTLE_PRUNE_EVERY = 1000
+LOGIN_USER_ATTEMPTS = 5
+LOGIN_USER_WINDOW = 300
+LOGIN_IP_ATTEMPTS = 50
+LOGIN_IP_WINDOW = 300
+
+
+class BucketLimit:
+    """a bucket holding up to capacity tokens that refills completely over window seconds"""
+
+    def __init__(self, capacity, window):
+        self.capacity = capacity
+        self.window = window
+        self.rate = capacity / window
+
+    def refill(self, tokens, elapsed):
+        return min(self.capacity, tokens + max(elapsed, 0) * self.rate)
+
+    def retryafter(self, tokens, cost=1):
+        return (cost - tokens) / self.rate
+
+
+class MemoryBucketStore:
+    """token buckets for this worker only, the least recently used are dropped past maxsize and full ones expire"""
+
+    def __init__(self, maxsize=THROTTLE_MAX_KEYS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, cost=1):
+        '''function to take cost tokens from a bucket, returns (allowed, seconds until it would be allowed)'''
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            tokens, updated, _ = self._buckets.get(key, (limit.capacity, now, now))
+            tokens = limit.refill(tokens, now - updated)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            # the bucket is full again, and can be forgotten, once it has had window seconds to refill
+            self._buckets[key] = (tokens, now, now + limit.retryafter(tokens, limit.capacity))
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else limit.retryafter(tokens, cost)
+
+    def _expire(self, now):
+        while self._buckets:
+            key, (_, _, expires) = next(iter(self._buckets.items()))
+            if expires > now:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SqliteBucketStore:
+    """token buckets in the throttle_bucket table so every worker shares them, each take is one atomic update"""
+
+    def __init__(self, max_window, prune_every=THROTTLE_PRUNE_EVERY, clock=time.time):
+        self.max_window = max_window
+        self.prune_every = prune_every
+        self._clock = clock
+        self._takes = 0
+
+    def take(self, key, limit, cost=1):
+        now = self._clock()
+        refilled = ThrottleBucket.tokens + (now - ThrottleBucket.updated) * limit.rate
+        refilled = case((refilled > limit.capacity, limit.capacity), else_=refilled)
+        with db.engine.begin() as connection:
+            taken = connection.execute(update(ThrottleBucket)
+                                       .where(ThrottleBucket.key == key, refilled >= cost)
+                                       .values(tokens=refilled - cost, updated=now)).rowcount
+            if not taken:
+                taken = connection.execute(insert(ThrottleBucket)
+                                           .values(key=key, tokens=limit.capacity - cost, updated=now)
+                                           .on_conflict_do_nothing()).rowcount
+            if taken:
+                retry_after = 0.0
+            else:
+                tokens, updated = connection.execute(select(ThrottleBucket.tokens, ThrottleBucket.updated)
+                                                     .where(ThrottleBucket.key == key)).one()
+                retry_after = limit.retryafter(limit.refill(tokens, now - updated), cost)
+            self._takes += 1
+            if self._takes % self.prune_every == 0:
+                self.prune(connection, now - self.max_window)
+        return bool(taken), retry_after
+
+    @staticmethod
+    def prune(connection, before):
+        '''function to drop buckets untouched since before, they have refilled and behave the same as a missing row'''
+        connection.execute(delete(ThrottleBucket).where(ThrottleBucket.updated < before))
+
+
+class LoginThrottle:
+    """per username and per client IP buckets, an attempt needs a token from both"""
+
+    def __init__(self, store, user_limit, ip_limit):
+        self.store = store
+        self.user_limit = user_limit
+        self.ip_limit = ip_limit
+
+    def check(self, username, ip):
+        '''function to charge a login attempt, returns None if it may go ahead or the whole seconds to wait'''
+        waits = []
+        for key, limit in ((f'login:user:{(username or "").strip().lower()[:100]}', self.user_limit),
+                           (f'login:ip:{ip}', self.ip_limit)):
+            allowed, retry_after = self.store.take(key, limit)
+            if not allowed:
+                waits.append(retry_after)
+        return max(1, math.ceil(max(waits))) if waits else None
+
+
+def loginthrottle():
+    '''function to return the login throttle for the current app, configured from the LOGIN_THROTTLE_* and
+    LOGIN_USER_*/LOGIN_IP_* settings'''
+    throttle = current_app.extensions.get('login_throttle')
+    if throttle is None:
+        config = current_app.config
+        user_limit = BucketLimit(config.get('LOGIN_USER_ATTEMPTS', LOGIN_USER_ATTEMPTS),
+                                 config.get('LOGIN_USER_WINDOW', LOGIN_USER_WINDOW))
+        ip_limit = BucketLimit(config.get('LOGIN_IP_ATTEMPTS', LOGIN_IP_ATTEMPTS),
+                               config.get('LOGIN_IP_WINDOW', LOGIN_IP_WINDOW))
+        if config.get('LOGIN_THROTTLE_STORE', 'memory') == 'sqlite':
+            store = SqliteBucketStore(max(user_limit.window, ip_limit.window))
+        else:
+            store = MemoryBucketStore(config.get('LOGIN_THROTTLE_MAX_KEYS', THROTTLE_MAX_KEYS))
+        throttle = current_app.extensions.setdefault('login_throttle', LoginThrottle(store, user_limit, ip_limit))
+    return throttle
@@ -0,0 +1,114 @@
+# Name      : usercache
+# Author    : Patrick Cronin
+# Date      : 18/10/2026
+# Updated   : 18/10/2026
+# Purpose   : Bounded TTL/LRU cache of the logged in users so the user loader does not query the db every request.
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_login import UserMixin
+
+from . import db
+from .dataversion import VersionCheck, USER_SCOPE, VERSION_CHECK_SECONDS
+from .models import User
+
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 60
+
+
+class SessionUser(UserMixin):
+    """slim copy of a user with only the fields the views and templates read, safe to share between requests"""
+
+    def __init__(self, id, username, first_name, surname, user_role):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.surname = surname
+        self.user_role = user_role
+
+    def __repr__(self):
+        return f'<SessionUser {self.id} {self.username} {self.user_role}>'
+
+
+class UserCache:
+    """least recently used users, each kept for at most ttl seconds and only while the users version it was loaded
+    on is current. versions rereads that stamp every few seconds, so a role change or deletion committed by another
+    worker applies within VERSION_CHECK_SECONDS without a query on every request"""
+
+    def __init__(self, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, clock=time.monotonic, versions=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.versions = versions or VersionCheck(USER_SCOPE)
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, loader, version=0):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        user = loader(user_id)
+        if user is None:
+            self.evict(user_id)
+            return None
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, version, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return user
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries),
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+def usercache():
+    '''function to return the user cache for the current app, sized from USER_CACHE_SIZE and USER_CACHE_TTL'''
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        config = current_app.config
+        cache = current_app.extensions.setdefault('user_cache', UserCache(
+            config.get('USER_CACHE_SIZE', USER_CACHE_SIZE), config.get('USER_CACHE_TTL', USER_CACHE_TTL),
+            versions=VersionCheck(USER_SCOPE, config.get('VERSION_CHECK_SECONDS', VERSION_CHECK_SECONDS))))
+    return cache
+
+
+def _fetchuser(user_id):
+    row = db.session.query(User.id, User.username, User.first_name, User.surname, User.user_role) \
+        .filter(User.id == user_id).first()
+    return SessionUser(*row) if row is not None else None
+
+
+def loaduser(user_id):
+    '''function for the login manager user loader, returns a SessionUser or None if the user no longer exists'''
+    cache = usercache()
+    return cache.get(int(user_id), _fetchuser, cache.versions.current())
+
+
+def evictuser(user_id):
+    '''function to drop a user from this worker's cache once a change to them has committed, and reread the users
+    version next time, so this worker applies the change at once rather than within VERSION_CHECK_SECONDS'''
+    cache = usercache()
+    cache.evict(int(user_id))
+    cache.versions.expire()
@@ -1,24 +1,108 @@
 # Name      : views
 # Author    : Patrick Cronin
 # Date      : 20/07/2025
-# Updated   : 17/08/2025
+# Updated   : 18/10/2026
 # Purpose   : Define views for application
 
-from flask import Blueprint, render_template, flash, url_for, request
+import io
+import operator
+
+from flask import Blueprint, render_template, flash, url_for, request, jsonify, Response, stream_with_context
 from flask_login import current_user, login_required
+from werkzeug.datastructures import MultiDict
 from werkzeug.utils import redirect
 from sqlalchemy import select
 import logging
 
 from . import db
 from .userrolewrappers import admin_required
+from .counters import readcounters, rolecounter, USER_COUNTER, INSPECTION_COUNTER
+from .export import exportquery, exportstream, EXPORT_FORMATS
+from .importer import importinspections, LIFTING_CHAIN_CLASS
+from .sync import syncinspections, SYNC_MAX_ITEMS
+from .refcache import conditions, roles
+from .usercache import evictuser, usercache
+# imported for its model listeners, which keep asset_latest_inspection up to date on every write
+from . import latestinspection  # noqa: F401
+from .forecast import forecastquery, duebefore, parsedays, FORECAST_DAYS
+from .assetsearch import searchassets, searchlimit, searchfilter
+from .dataversion import REFERENCE_SCOPE, SITE_SCOPE, ASSET_SCOPE, INSPECTION_SCOPE
+from .fragmentcache import cachedfragment
+from .cspreports import cspqueue
+from .pagination import Listing, Sort, Filter, paginate, parsebool, parsestring, datefrom, dateto, parsedate, \
+    parsedateto, listingargs
 from .inspections import conditioncheck, lchealthscore, lcpass, MIN_CHAIN_LENGTH, MAX_CHAIN_LENGTH, MIN_PITCH_LENGTH, \
     MAX_PITCH_LENGTH, MIN_PITCHES_MEASURED
 
-from website.models import Site, Asset, Assetclass, Assetstatus, User, Role, Inspection, Condition as ConditionModel
+from website.models import Site, Asset, Assetclass, Assetstatus, User, Inspection, AssetLatestInspection, \
+    AssetWearTrend, CspViolation
 
 views = Blueprint('views', __name__)
 
+INSPECTION_LISTING = Listing(Inspection.id,
+                             sorts={'insp_date': Sort(Inspection.insp_date),
+                                    'id': Sort(Inspection.id),
+                                    'equip_no': Sort(Inspection.equip_no),
+                                    'lc_health_score': Sort(Inspection.lc_health_score, nullable=True)},
+                             default_sort='insp_date', default_order='desc',
+                             filters={'equip_no': Filter(Inspection.equip_no),
+                                      'site': Filter(Inspection.equip_no, op=lambda column, site: column.in_(
+                                          select(Asset.equip_no).where(Asset.site_no == site))),
+                                      'passed': Filter(Inspection.asset_passed, parse=parsebool),
+                                      'date_from': datefrom(Inspection.insp_date),
+                                      'date_to': dateto(Inspection.insp_date)})
+
+ASSET_LISTING = Listing(Asset.id,
+                        sorts={'equip_no': Sort(Asset.equip_no),
+                               'description': Sort(Asset.description),
+                               'site': Sort(Site.description)},
+                        default_sort='equip_no',
+                        filters={'equip_no': Filter(Asset.equip_no),
+                                 'site': Filter(Asset.site_no),
+                                 'class': Filter(Asset.equip_class, parse=parsestring),
+                                 'q': searchfilter(Asset.id)})
+
+# the inspection page's asset pickers, a page of assets of one class, or of every class but one, at a time
+LOOKUP_LISTING = Listing(Asset.id,
+                         sorts={'equip_no': Sort(Asset.equip_no)},
+                         default_sort='equip_no',
+                         filters={'class': Filter(Asset.equip_class, parse=parsestring),
+                                  'not_class': Filter(Asset.equip_class, parse=parsestring, op=operator.ne),
+                                  'q': searchfilter(Asset.id)})
+
+FORECAST_LISTING = Listing(AssetWearTrend.equip_no,
+                           sorts={'predicted_fail_date': Sort(AssetWearTrend.predicted_fail_date)},
+                           default_sort='predicted_fail_date',
+                           filters={'days': Filter(AssetWearTrend.predicted_fail_date, parse=parsedays,
+                                                   op=lambda column, days: column <= duebefore(days)),
+                                    'site': Filter(Asset.site_no)})
+
+SITE_LISTING = Listing(Site.id,
+                       sorts={'site_no': Sort(Site.site_no),
+                              'description': Sort(Site.description)},
+                       default_sort='site_no',
+                       filters={'site': Filter(Site.site_no)})
+
+CSP_LISTING = Listing(CspViolation.id,
+                      sorts={'count': Sort(CspViolation.count),
+                             'last_seen': Sort(CspViolation.last_seen)},
+                      default_sort='count',
+                      default_order='desc',
+                      filters={'directive': Filter(CspViolation.directive, parse=parsestring),
+                               'seen_from': datefrom(CspViolation.last_seen)})
+
+
+def pickedasset(equip_no, chain):
+    '''function to check the equip no typed or picked on the inspection page is an asset of the form's class, the
+    pickers are free text so the server can no longer rely on a closed drop down list'''
+    try:
+        EquipClass = db.session.execute(select(Asset.equip_class).where(Asset.equip_no == int(equip_no))).scalar()
+    except (TypeError, ValueError):
+        return False
+    if EquipClass is None:
+        return False
+    return (EquipClass == LIFTING_CHAIN_CLASS) == chain
+
 
 # flask blueprint view for home page
 @views.route('/')
@@ -26,14 +110,14 @@ views = Blueprint('views', __name__)
 def home():
     try:
         if current_user.user_role == 'ADMIN':
-            UserCount = User.query.count()
-            AdminCount = User.query.filter_by(user_role='ADMIN').count()
-            ContEngCount = User.query.filter_by(user_role='CONTENG').count()
-            FieldCount = User.query.filter_by(user_role='FIELD').count()
-            InspCount = Inspection.query.count()
-            Counts = (UserCount, AdminCount, ContEngCount, FieldCount, InspCount)
-            return render_template('home.html', user=current_user, counts=Counts)
+            # one read of the counters the model events keep up to date instead of five COUNT(*) queries
+            Counters = readcounters()
+            Counts = (Counters.get(USER_COUNTER, 0), Counters.get(rolecounter('ADMIN'), 0),
+                      Counters.get(rolecounter('CONTENG'), 0), Counters.get(rolecounter('FIELD'), 0),
+                      Counters.get(INSPECTION_COUNTER, 0))
+            return render_template('home.html', user=current_user, counts=Counts, usercachestats=usercache().stats())
         elif current_user.user_role == 'CONTENG':
+            # a page at a time, the failed history grows without bound and rendering all of it swelled the workers
             FailedInsps = db.session.query(Inspection.id, Inspection.equip_no, Inspection.user_id, Inspection.insp_date,
                                            Inspection.condition_code, Inspection.lc_health_score,
                                            Inspection.asset_passed,
@@ -44,11 +128,14 @@ def home():
                 Assetclass, Asset.equip_class == Assetclass.class_id).join(Site, Asset.site_no == Site.site_no).join(
                 User,
                 Inspection.user_id == User.id).filter(
-                Inspection.asset_passed.is_(False)).all()
-            print(FailedInsps)
+                Inspection.asset_passed.is_(False))
+            FailedInsps = paginate(FailedInsps, INSPECTION_LISTING, request.args)
             return render_template('home.html', user=current_user, failedinsps=FailedInsps)
         elif current_user.user_role == 'FIELD':
-            Inspections = Inspection.query.filter_by(user_id=current_user.id).all()
+            Inspections = db.session.query(Inspection.id, Inspection.equip_no, Inspection.condition_code,
+                                           Inspection.lc_health_score, Inspection.asset_passed,
+                                           Inspection.insp_date).filter(Inspection.user_id == current_user.id)
+            Inspections = paginate(Inspections, INSPECTION_LISTING, request.args)
             return render_template('home.html', user=current_user, inspections=Inspections)
     except Exception as e:
         logging.error(f'error rendering home page dashboard: {e}')
@@ -65,7 +152,9 @@ def home():
 @views.route('/faqs')
 def faqs():
     try:
-        return render_template('faqs.html', user=current_user)
+        # the faqs are the same whatever the query string, keying on it would let anyone fill the cache with copies
+        FaqsContent = cachedfragment('faqs', (), MultiDict(), lambda: render_template('_faqs_content.html'))
+        return render_template('faqs.html', user=current_user, faqs_content=FaqsContent)
     except Exception as e:
         logging.error(f'error rendering faqs page: {e}')
         return 'An error occurred rendering your faqs page', 500
@@ -76,18 +165,54 @@ def faqs():
 @login_required
 def sites():
     try:
-        SiteList = db.session.query(Site).all()
+        # the table is the same for every user, it is only queried and rendered again once the sites change. it is
+        # keyed on the arguments the listing reads, so made up ones can not fill the cache with copies of a page
+        SiteArgs = listingargs(SITE_LISTING, request.args)
+        SiteTable = cachedfragment('sites', (SITE_SCOPE,), SiteArgs, lambda: render_template(
+            '_sites_table.html', sites=paginate(db.session.query(Site.id, Site.site_no, Site.description),
+                                                SITE_LISTING, SiteArgs)))
     except Exception as e:
         logging.error(f'error retreving site list: {e}')
         flash('An error occurred retreving site list', 'error')
-        SiteList = []
+        SiteTable = render_template('_sites_table.html', sites=[])
     try:
-        return render_template('sites.html', user=current_user, sites=SiteList)
+        return render_template('sites.html', user=current_user, site_table=SiteTable)
     except Exception as e:
         logging.error(f'error rendering sites page: {e}')
         return 'An error occurred rendering your sites page', 500
 
 
+# blueprint route for ranked asset search by equip no, description, location or site, returns the best matches
+@views.route('/assets/search')
+@login_required
+def search_assets():
+    Query = request.args.get('q', '')
+    try:
+        Results = searchassets(Query, searchlimit(request.args.get('limit')))
+    except Exception as e:
+        logging.error(f'error searching assets: {e}')
+        return jsonify({'error': 'An error occurred searching assets'}), 500
+    return jsonify({'query': Query, 'results': Results})
+
+
+# blueprint route for the inspection page's typeahead asset pickers, a page of assets of one class at a time
+@views.route('/assets/lookup')
+@login_required
+def lookup_assets():
+    try:
+        AssetList = db.session.query(Asset.equip_no, Asset.description, Asset.location_on_site,
+                                     Site.description.label('site_description')) \
+            .outerjoin(Site, Asset.site_no == Site.site_no)
+        AssetList = paginate(AssetList, LOOKUP_LISTING, request.args)
+    except Exception as e:
+        logging.error(f'error looking up assets: {e}')
+        return jsonify({'error': 'An error occurred looking up assets'}), 500
+    return jsonify({'results': [{'equip_no': row.equip_no, 'description': row.description,
+                                 'location_on_site': row.location_on_site,
+                                 'site_description': row.site_description} for row in AssetList],
+                    'next_cursor': AssetList.next_cursor})
+
+
 # flask blueprint view for lifting assets
 @views.route('/assets')
 @login_required
@@ -95,21 +220,50 @@ def assets():
     try:
         AssetList = db.session.query(Asset.equip_no, Asset.description, Asset.location_on_site,
                                      Assetclass.class_description, Assetstatus.status_description,
-                                     Site.description.label('site_desc')).join(
+                                     Site.description.label('site_desc'), AssetLatestInspection.insp_date,
+                                     AssetLatestInspection.lc_health_score, AssetLatestInspection.asset_passed).join(
             Assetclass,
             Asset.equip_class == Assetclass.class_id).join(
-            Assetstatus, Asset.equip_status == Assetstatus.status_id).join(Site, Asset.site_no == Site.site_no).all()
+            Assetstatus, Asset.equip_status == Assetstatus.status_id).join(Site, Asset.site_no == Site.site_no) \
+            .outerjoin(AssetLatestInspection, Asset.equip_no == AssetLatestInspection.equip_no)
+        # the rows show the asset, its site, its class and status and its latest inspection, a change to any of them
+        # renders the table again
+        AssetArgs = listingargs(ASSET_LISTING, request.args)
+        AssetTable = cachedfragment('assets', (ASSET_SCOPE, SITE_SCOPE, INSPECTION_SCOPE, REFERENCE_SCOPE),
+                                    AssetArgs, lambda: render_template(
+                                        '_assets_table.html', assets=paginate(AssetList, ASSET_LISTING, AssetArgs)))
     except Exception as e:
         logging.error(f'error retreiving assets list: {e}')
         flash('An error occurred retreving assets list', 'error')
-        AssetList = []
+        AssetTable = render_template('_assets_table.html', assets=[])
     try:
-        return render_template('assets.html', user=current_user, assets=AssetList)
+        return render_template('assets.html', user=current_user, asset_table=AssetTable)
     except Exception as e:
         logging.error(f'error rendering assets page: {e}')
         return 'An error occurred rendering your assets page', 500
 
 
+# blueprint view for lifting chains forecast to fail their inspection within a number of days
+@views.route('/forecast')
+@login_required
+def forecast():
+    try:
+        ForecastArgs = request.args.to_dict()
+        # the filter form sends days= when the box is left empty
+        if not ForecastArgs.get('days', '').strip():
+            ForecastArgs['days'] = str(FORECAST_DAYS)
+        DueList = paginate(forecastquery(), FORECAST_LISTING, ForecastArgs)
+    except Exception as e:
+        logging.error(f'error retrieving forecast list: {e}')
+        flash('An error occurred retrieving the forecast list', 'error')
+        DueList = []
+    try:
+        return render_template('forecast.html', user=current_user, due=DueList)
+    except Exception as e:
+        logging.error(f'error rendering forecast page: {e}')
+        return 'An error occurred rendering your forecast page', 500
+
+
 # blueprint view for inspections (lifting chain and other lifting assets)
 @views.route('/inspection', methods=['GET', 'POST'])
 @login_required
@@ -125,6 +279,10 @@ def inspection():
                 flash('All fields are required.', 'error')
                 return redirect(url_for('views.inspection'))
 
+            if not pickedasset(EquipNo, chain=False):
+                flash('Select a lifting asset that is not a lifting chain.', 'error')
+                return redirect(url_for('views.inspection'))
+
             ConditionPass = conditioncheck(Condition)
             NewInspection = Inspection(equip_no=EquipNo,
                                        condition_code=Condition,
@@ -146,6 +304,10 @@ def inspection():
                 flash('All fields are required.', 'error')
                 return redirect(url_for('views.inspection'))
 
+            if not pickedasset(EquipNo, chain=True):
+                flash('Select a lifting chain.', 'error')
+                return redirect(url_for('views.inspection'))
+
             ConditionPass = conditioncheck(Condition)
             HealthScore = lchealthscore(MeasureMeanPitchLength, ChainPitchLength)
             HealthScorePass = lcpass(ConditionPass, HealthScore)
@@ -162,23 +324,61 @@ def inspection():
             db.session.commit()
             flash('Inspection has been created.', 'success')
     try:
-        LiftingChainList = db.session.query(Asset.equip_no, Asset.description).filter_by(equip_class='C5').all()
-        OtherAssetList = db.session.query(Asset.equip_no, Asset.description).filter(Asset.equip_class != 'C5').all()
-        ConditionList = db.session.query(ConditionModel).all()
+        ConditionList = conditions()
     except Exception as e:
         logging.error(f'error retrieving data for drop down for inspections: {e}')
-        LiftingChainList, OtherAssetList, ConditionList = [], [], []
+        ConditionList = []
     try:
+        # the asset pickers page through /assets/lookup as the user types rather than listing every asset here
         return render_template('inspection.html', user=current_user, min_length=MIN_CHAIN_LENGTH,
                                max_length=MAX_CHAIN_LENGTH, min_pitch_length=MIN_PITCH_LENGTH,
                                max_pitch_length=MAX_PITCH_LENGTH, min_pitches_measured=MIN_PITCHES_MEASURED,
-                               lifting_chain_list=LiftingChainList, condition_list=ConditionList,
-                               other_asset_list=OtherAssetList)
+                               condition_list=ConditionList,
+                               chain_lookup=url_for('views.lookup_assets', **{'class': LIFTING_CHAIN_CLASS}),
+                               other_lookup=url_for('views.lookup_assets', not_class=LIFTING_CHAIN_CLASS))
     except Exception as e:
         logging.error(f'error rendering inspection page: {e}')
         return 'An error occurred rendering your inspection page', 500
 
 
+# blueprint route for bulk upload of inspections from a CSV file, returns a per-row error report
+@views.route('/inspection/import', methods=['POST'])
+@login_required
+def import_insp():
+    Upload = request.files.get('file')
+    if Upload is None or not Upload.filename:
+        return jsonify({'error': 'A CSV file is required.'}), 400
+    try:
+        # read straight from the uploaded stream so the whole file is never held in memory
+        Report = importinspections(io.TextIOWrapper(Upload.stream, encoding='utf-8-sig', newline=''),
+                                   current_user.id)
+    except Exception as e:
+        logging.error(f'error importing inspections: {e}')
+        return jsonify({'error': 'An error occurred importing inspections'}), 500
+    return jsonify(Report.todict()), 200 if Report.error is None else 422
+
+
+# blueprint route for offline clients to sync a batch of queued inspections, returns a result per inspection
+@views.route('/inspection/sync', methods=['POST'])
+@login_required
+def sync_insp():
+    Body = request.get_json(silent=True)
+    Items = Body.get('inspections') if isinstance(Body, dict) else None
+    if not isinstance(Items, list) or not Items:
+        return jsonify({'error': 'A JSON body with a list of inspections is required.'}), 400
+    if len(Items) > SYNC_MAX_ITEMS:
+        return jsonify({'error': f'At most {SYNC_MAX_ITEMS} inspections can be synced at once.'}), 413
+    try:
+        Results = syncinspections(Items, current_user.id)
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'error syncing inspections: {e}')
+        return jsonify({'error': 'An error occurred syncing inspections, none were saved'}), 500
+    Totals = {status: sum(1 for Result in Results if Result['status'] == status)
+              for status in ('created', 'duplicate', 'rejected')}
+    return jsonify({**Totals, 'results': Results})
+
+
 # blueprint route for lifting chain inspection admin
 @views.route('/inspadmin', methods=['GET', 'POST'])
 @admin_required
@@ -187,7 +387,8 @@ def inspadmin():
         InspectionList = db.session.query(Inspection.id, Inspection.equip_no, Inspection.condition_code,
                                           Inspection.lc_health_score, Inspection.asset_passed, Inspection.insp_date,
                                           Inspection.user_id, User.first_name, User.surname, User.username).join(User,
-                                                                                                                 Inspection.user_id == User.id).all()
+                                                                                                                 Inspection.user_id == User.id)
+        InspectionList = paginate(InspectionList, INSPECTION_LISTING, request.args)
     except Exception as e:
         logging.error(f'error getting inspection list: {e}')
         InspectionList = []
@@ -198,6 +399,51 @@ def inspadmin():
         return 'An error occurred rendering your inspection page', 500
 
 
+# blueprint route for the CSP violations browsers have reported, most frequent first
+@views.route('/cspadmin')
+@admin_required
+def cspadmin():
+    try:
+        ViolationList = db.session.query(CspViolation.id, CspViolation.directive, CspViolation.blocked_uri,
+                                         CspViolation.document_uri, CspViolation.count, CspViolation.first_seen,
+                                         CspViolation.last_seen)
+        ViolationList = paginate(ViolationList, CSP_LISTING, request.args)
+    except Exception as e:
+        logging.error(f'error getting csp violation list: {e}')
+        ViolationList = []
+    try:
+        # this worker's queue only, each worker batches its own reports
+        return render_template('cspadmin.html', user=current_user, violations=ViolationList,
+                               queue_stats=cspqueue().stats())
+    except Exception as e:
+        logging.error(f'error rendering csp admin page: {e}')
+        return 'An error occurred rendering your csp admin page', 500
+
+
+# blueprint route for streaming export of the inspection history as CSV or JSONL
+@views.route('/inspadmin/export')
+@admin_required
+def export_insp():
+    ExportFormat = request.args.get('format', 'csv')
+    if ExportFormat not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        DateFrom = parsedate(request.args['date_from']) if request.args.get('date_from') else None
+        DateTo = parsedateto(request.args['date_to']) if request.args.get('date_to') else None
+        SiteNo = int(request.args['site']) if request.args.get('site') else None
+    except ValueError as e:
+        return jsonify({'error': f'invalid filter: {e}'}), 400
+
+    Compress = 'gzip' in request.accept_encodings
+    Stream = exportstream(exportquery(DateFrom, DateTo, SiteNo), ExportFormat, Compress)
+    ExportResponse = Response(stream_with_context(Stream), mimetype=EXPORT_FORMATS[ExportFormat])
+    ExportResponse.headers['Content-Disposition'] = f'attachment; filename=inspections.{ExportFormat}'
+    if Compress:
+        ExportResponse.headers['Content-Encoding'] = 'gzip'
+        ExportResponse.headers['Vary'] = 'Accept-Encoding'
+    return ExportResponse
+
+
 # blueprint route for admin deletion of inspections
 @views.route('/inspadmin/<int:id>', methods=['POST'])
 @admin_required
@@ -231,6 +477,7 @@ def delete_user(id):
         if DeleteUser:
             db.session.delete(DeleteUser)
             db.session.commit()
+            evictuser(id)
             flash('User has been successfully deleted', category='success')
         else:
             flash('Error user not found', category='error')
@@ -251,9 +498,7 @@ def delete_user(id):
 def update_role(id):
     try:
         NewRole = request.form.get('role')
-        RolesList = db.session.execute(
-            select(Role.role_name)
-        ).scalars().all()
+        RolesList = [role.role_name for role in roles()]
         if NewRole not in RolesList:
             flash('Role does not exist', category='error')
         else:
@@ -261,6 +506,7 @@ def update_role(id):
             if ChangingUser:
                 ChangingUser.user_role = NewRole
                 db.session.commit()
+                evictuser(id)
                 flash('Role has been successfully updated', category='success')
             else:
                 flash('User not found', category='error')